@@ -1 +1,5 @@
+import time
+
 __version__ = "8.3.14"
+# The time importing the package and its CLI is shown by "--version"
+IMPORT_START_TIME = time.perf_counter()
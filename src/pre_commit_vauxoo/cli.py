@@ -17,15 +17,21 @@ Why does this file exist, and why not put this in __main__?
 import contextlib
 import os
 import subprocess
-from importlib.metadata import version as version_meth
+import sys
+import time
 
 import click
 
-from pre_commit_vauxoo import pre_commit_vauxoo
+from pre_commit_vauxoo import IMPORT_START_TIME, logging_colored
+from pre_commit_vauxoo.constants import FIX_UNTIL_STABLE_MAX_RUNS, SCOPE_ALL, SCOPE_DIFF, SCOPE_LAST_COMMIT
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_START_TIME
 
 
 def source_variables():
     # Overwrite os.environ with variables.sh file only if it was not already defined
+    from pre_commit_vauxoo import pre_commit_vauxoo  # ruff: ignore[import-outside-top-level]
+
     try:
         repo_dirname = pre_commit_vauxoo.get_repo()
     except subprocess.CalledProcessError:
@@ -45,22 +51,15 @@ def env_clear():
         os.environ.update(old_environ)
 
 
-def monkey_patch_make_context():
-    """monkey patch to run source variables.sh before to parse the click.options"""
-    try:
-        # Fix DeprecationWarning: 'BaseCommand' is deprecated and will be removed in Click 9.0. Use 'Command' instead.
-        command = click.core.Command
-    except AttributeError:
-        command = click.core.BaseCommand
-
-    original_make_context = command.make_context
+class SourceVariablesCommand(click.Command):
+    """Command running source variables.sh before to parse the click.options"""
 
-    def custom_make_context(*args, **kwargs):
+    def make_context(self, *args, **kwargs):
+        # Configured when the command runs instead of at import time
+        logging_colored.setup_logger()
         with env_clear():
             source_variables()
-            return original_make_context(*args, **kwargs)
-
-    command.make_context = custom_make_context
+            return super().make_context(*args, **kwargs)
 
 
 def strcsv2tuple(strcsv, lower=False):
@@ -117,6 +116,8 @@ class CSVPath(click.Path):
         self.name += " CSV"
 
     def convert(self, value, param, ctx):
+        from pre_commit_vauxoo import pre_commit_vauxoo  # ruff: ignore[import-outside-top-level]
+
         values = ()
         repo_dirname = pre_commit_vauxoo.get_repo()
         for v in strcsv2tuple(value):
@@ -150,6 +151,20 @@ class CompatibilityVersionType(click.ParamType):
         return value
 
 
+class ShardType(click.ParamType):
+    name = "INDEX/TOTAL"
+
+    def convert(self, value, param, ctx):
+        if not value or isinstance(value, tuple):
+            return value
+        from pre_commit_vauxoo import sharding  # ruff: ignore[import-outside-top-level]
+
+        try:
+            return sharding.parse_shard(value)
+        except ValueError as shard_error:
+            self.fail(str(shard_error), param, ctx)
+
+
 def merge_tuples(ctx, param, value):
     """Convert (('value1', 'value2'), ('value3')) to ('value1', 'value2', 'value3')
     It is useful for csv separated by commas parameters but using multiple number of args
@@ -182,22 +197,17 @@ def precommit_hooks_type_callback(ctx, param, value):
 
 
 new_extra_kwargs = {}
-try:
-    if tuple(map(int, version_meth("click").split("."))) >= (7, 0):
-        # It is only compatible for click >= 7.0 but it is not a big deal if it is not enabled
-        # For record, dockerv image is using click 6.6 version
-        new_extra_kwargs["show_envvar"] = True
-except (TypeError, ValueError, AttributeError):  # ruff: ignore[try-except-pass]
-    pass
-
-monkey_patch_make_context()
-
+# It is only compatible for click >= 7.0 but it is not a big deal if it is not enabled
+# For record, dockerv image is using click 6.6 version
+# The parameter is checked instead of the click version since that importlib.metadata is slow to import
+if "show_envvar" in click.Option.__init__.__code__.co_varnames:
+    new_extra_kwargs["show_envvar"] = True
 
 _BASE_HOOK_TYPES = ["mandatory", "optional", "fix", "experimental"]
 PRECOMMIT_HOOKS_TYPE = _BASE_HOOK_TYPES + ["all"] + ["-%s" % i for i in _BASE_HOOK_TYPES]
 
 
-@click.command()
+@click.command(cls=SourceVariablesCommand)
 # click 6.6 used in dockerv doesn't support to use envvar for click.argument :(
 # More info https://github.com/pallets/click/issues/714 workaround using option instead.
 @click.option(
@@ -218,22 +228,59 @@ PRECOMMIT_HOOKS_TYPE = _BASE_HOOK_TYPES + ["all"] + ["-%s" % i for i in _BASE_HO
 @click.option(
     "--all",
     "scope",
-    flag_value=pre_commit_vauxoo.SCOPE_ALL,
+    flag_value=SCOPE_ALL,
     default=True,
     help="Run the hooks on the whole repository. It is the default one.",
 )
 @click.option(
     "--last-commit",
     "scope",
-    flag_value=pre_commit_vauxoo.SCOPE_LAST_COMMIT,
+    flag_value=SCOPE_LAST_COMMIT,
     help="Run the hooks only on the files added or modified by the last commit (HEAD).",
 )
 @click.option(
     "--diff",
     "scope",
-    flag_value=pre_commit_vauxoo.SCOPE_DIFF,
+    flag_value=SCOPE_DIFF,
     help="Run the hooks only on the files with changes not committed yet: staged, unstaged and untracked ones.",
 )
+@click.option(
+    "--since",
+    metavar="REF",
+    is_flag=False,
+    flag_value="",
+    default=None,
+    help="Run the hooks only on the files added or modified by the commits since the branch diverged from REF "
+    "(e.g. the files of a pull request). Without REF it uses the stable branch of '--odoo-version' "
+    "(e.g. 'origin/17.0').",
+)
+@click.option(
+    "--changed-modules",
+    is_flag=True,
+    default=False,
+    help="Run the hooks on all the files of the Odoo modules with files of the scope "
+    "('--diff' by default, '--last-commit' or '--since') instead of only these files. "
+    "The uninstallable modules are not checked.",
+)
+@click.option(
+    "--dependents-depth",
+    envvar="PRECOMMIT_DEPENDENTS_DEPTH",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Run the hooks on the modules depending on the modules changed too (it enables '--changed-modules'). "
+    "1 adds the modules depending directly on them, 2 adds the modules depending on those ones too and so on."
+    "\f\nThe 'depends' of the manifests are cached into '.config/.cache' until they change.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--files-from",
+    type=click.File("rb"),
+    default=None,
+    help="Run the hooks only on the files listed into this file ('-' reads them from stdin) "
+    "separated by NUL characters (e.g. 'git ls-files -z') or new lines. It has precedence over the "
+    "paths and the scope.",
+)
 @click.option(
     "--no-overwrite",
     envvar="PRECOMMIT_NO_OVERWRITE_CONFIG_FILES",
@@ -258,6 +305,125 @@ PRECOMMIT_HOOKS_TYPE = _BASE_HOOK_TYPES + ["all"] + ["-%s" % i for i in _BASE_HO
     "\f\n*If it is disabled (by default), exit_code will be 0 (successful) even if 'optional' fails.",
     **new_extra_kwargs,
 )
+@click.option(
+    "--parallel-stages",
+    envvar="PRECOMMIT_PARALLEL_STAGES",
+    type=click.BOOL,
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="Run the 'mandatory' and 'optional' precommit-hooks-type at the same time."
+    "\f\nThe 'fix' one (if enabled) still runs first since it changes the files."
+    "\f\nThe output of each one is buffered and printed in the usual order.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--fail-fast",
+    envvar="PRECOMMIT_FAIL_FAST",
+    type=click.BOOL,
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="Stop after the first precommit-hooks-type affecting the exit_code failed "
+    "(e.g. 'fix' reformatted files or 'mandatory' failed)."
+    "\f\nThe next ones (and the ones running at the same time using '--parallel-stages') "
+    "are cancelled and shown as 'Cancelled' in the summary.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--ruff-single-pass",
+    "use_ruff_single_pass",
+    envvar="PRECOMMIT_RUFF_SINGLE_PASS",
+    type=click.BOOL,
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="Run ruff-odoo once for the 'mandatory' and 'optional' precommit-hooks-type "
+    "(including the experimental checks) instead of once per configuration file."
+    "\f\nEach error is reported by the checks whose configuration selects it. "
+    "The 'fix' one still runs its own ruff-odoo hook since it changes the files."
+    "\f\nIf it can not run (e.g. the hooks are not installed yet or a setting has a different value "
+    "for rules of several of them) the ruff-odoo hooks run as usual.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--pylint-single-pass",
+    "use_pylint_single_pass",
+    envvar="PRECOMMIT_PYLINT_SINGLE_PASS",
+    type=click.BOOL,
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="Run pylint-odoo once for the 'mandatory' and 'optional' precommit-hooks-type "
+    "enabling the messages of both instead of once per configuration file."
+    "\f\nEach message is reported by the checks whose configuration enables it "
+    "(including PYLINT_DISABLE_CHECKS) and it uses the jobs of the pylint-odoo hooks."
+    "\f\nIf it can not run (e.g. the hooks are not installed yet or an option has a different value "
+    "for messages of both) the pylint-odoo hooks run as usual.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--fix-until-stable",
+    "fix_until_stable",
+    envvar="PRECOMMIT_FIX_UNTIL_STABLE",
+    type=click.BOOL,
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="Run the 'fix' precommit-hooks-type again only for the files changed by the previous run "
+    "until they do not change (%d runs at most) since that the output of a fixer could be reformatted "
+    "by another one."
+    "\f\nThe 'mandatory' and 'optional' checks run for the content already fixed "
+    "(they are not cancelled by the fail fast option unless a run failed with files it did not change) "
+    "so a single run leaves the files fixed. "
+    "The autofix checks are still shown as reformatted." % FIX_UNTIL_STABLE_MAX_RUNS,
+    **new_extra_kwargs,
+)
+@click.option(
+    "--results-cache",
+    "use_results_cache",
+    envvar="PRECOMMIT_RESULTS_CACHE",
+    type=click.BOOL,
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="Skip the files that already passed each precommit-hooks-type in a previous run."
+    "\f\nThe files are identified by the git blob SHA of their content and the one of the files of their "
+    "Odoo module (so all the files of a module are checked again if any of them changed). "
+    "The cache is discarded if the configuration files or the pre-commit-vauxoo version change.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--shard",
+    envvar="PRECOMMIT_SHARD",
+    type=ShardType(),
+    default=None,
+    help="Run only the part INDEX (starting at 1) of TOTAL parts of the files to check "
+    "in order to split them across TOTAL parallel CI jobs, e.g. '--shard 2/3'."
+    "\f\nThe files of the same Odoo module are kept together and the parts are balanced "
+    "using the size of the files.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--trace-file",
+    envvar="PRECOMMIT_TRACE_FILE",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write a timeline of the run to this file using the Chrome trace-event format."
+    "\f\nOpen it using https://ui.perfetto.dev or chrome://tracing to check the time spent "
+    "by the git commands, the configuration files rendering, the hooks installation and each hook.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--watch",
+    type=click.BOOL,
+    default=False,
+    is_flag=True,
+    show_default=True,
+    help="Keep running and check again the files of '--diff' each time they are saved. Stop it using Ctrl+C."
+    "\f\nThe configuration files are rendered and the hooks installed only once at the beginning.",
+    **new_extra_kwargs,
+)
 @click.option(
     "--exclude-autofix",
     "-x",
@@ -346,6 +512,28 @@ PRECOMMIT_HOOKS_TYPE = _BASE_HOOK_TYPES + ["all"] + ["-%s" % i for i in _BASE_HO
     "\f\nNow your command 'git commit' will run 'pre-commit-vauxoo --diff' before to commit",
     **new_extra_kwargs,
 )
+@click.option(
+    "--serve",
+    type=click.BOOL,
+    is_flag=True,
+    default=False,
+    help="Run a pre-commit-vauxoo daemon for the current repository listening on a unix socket into a private "
+    "folder of the user"
+    "\f\nWhile it is running the next commands of the repository (and the git hook) are run by the daemon "
+    "avoiding the python startup and the imports and keeping in memory the index of the Odoo modules, the "
+    "fingerprints and the compiled templates of the configuration files. Stop it using Ctrl+C."
+    "\f\nSet PRECOMMIT_NO_DAEMON=1 to run a command without the daemon.",
+    **new_extra_kwargs,
+)
+@click.option(
+    "--explain-check",
+    type=str,
+    default=None,
+    metavar="NAME",
+    help="Show the ruff codes equivalent to the pylint check NAME (or the pylint checks of the ruff code NAME)"
+    "\f\nIt is the same mapping used to disable from ruff the checks of PYLINT_DISABLE_CHECKS.",
+    **new_extra_kwargs,
+)
 @click.option(
     "--version",
     type=click.BOOL,
@@ -422,8 +610,33 @@ or non-backward-compatible fixes (especially for XML, Python, and JS files).""",
 )
 def main(*args, **kwargs):
     """pre-commit-vauxoo run pre-commit with custom validations and configuration files"""
+    # The modules of the package are imported only by the options using them so the CLI starts fast
+    from pre_commit_vauxoo import pre_commit_vauxoo  # ruff: ignore[import-outside-top-level]
+
     version = kwargs.pop("version", None)
+    serve = kwargs.pop("serve", None)
+    explain_check = kwargs.pop("explain_check", None)
     if version:
+        pre_commit_vauxoo.show_version(import_seconds=IMPORT_SECONDS)
+        return
+    if explain_check:
+        sys.exit(0 if pre_commit_vauxoo.show_explain_check(explain_check) else 1)
+    if serve:
+        from pre_commit_vauxoo import daemon  # ruff: ignore[import-outside-top-level]
+
         pre_commit_vauxoo.show_version()
+        daemon.serve(pre_commit_vauxoo.get_repo(), pre_commit_vauxoo.main, pre_commit_vauxoo.warm_up)
         return
+    if kwargs.get("files_from") is not None:
+        from pre_commit_vauxoo import pre_commit_files  # ruff: ignore[import-outside-top-level]
+
+        # Read here since that the file (e.g. stdin) can not be sent to the daemon
+        kwargs["files_from"] = tuple(pre_commit_files.read_files_list(kwargs["files_from"].read()))
+    # The watch mode keeps running so it is not sent to the daemon
+    if not kwargs.get("watch"):
+        from pre_commit_vauxoo import daemon  # ruff: ignore[import-outside-top-level]
+
+        exit_code = daemon.request(kwargs)
+        if exit_code is not None:
+            sys.exit(exit_code)
     pre_commit_vauxoo.main(*args, **kwargs)
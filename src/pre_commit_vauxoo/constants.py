@@ -0,0 +1,18 @@
+"""Constants shared by the CLI, the hooks and pre_commit_vauxoo
+
+It does not import anything so the modules only needing them (e.g. the CLI options or the
+hooks of check_commit_msg) do not import the whole package stack.
+"""
+
+CFG_SUBFOLDER = ".config"
+# Subfolder of CFG_SUBFOLDER for the files generated by the tool itself (e.g. caches)
+# so they are not mixed with the rendered configuration files
+CFG_CACHE_SUBFOLDER = ".cache"
+# Runs of the autofix checks for "--fix-until-stable" e.g. fixers reformatting the output of each other forever
+FIX_UNTIL_STABLE_MAX_RUNS = 5
+
+# Scope of files to run the hooks on (--all, --last-commit and --diff)
+SCOPE_ALL = "all"
+SCOPE_LAST_COMMIT = "last-commit"
+SCOPE_DIFF = "diff"
+SCOPE_SINCE = "since"
@@ -0,0 +1,401 @@
+"""Persistent pre-commit-vauxoo process per repository ("--serve")
+
+The daemon imports the whole package stack once, keeps warm the state reused by the
+commands (the index of the Odoo modules, the fingerprints and the compiled templates of
+the configuration files) and listens on a unix socket into a private folder of the user
+(0700 and owned by the user). The CLI (and so the git hook running it) sends the parsed
+parameters to the daemon when it is running, together with its environment and its
+stdin, stdout and stderr file descriptors. So the CLI checks the owner and permissions
+of the folder and the user of the daemon (peer credentials) before sending anything,
+running the command itself if any check fails. The socket is found from the folder of
+the repository without running git so the CLI pays nothing if the daemon is not running.
+
+The daemon forks itself as soon as a client connects so a slow client never blocks the
+next ones. The child reads the request in its own process group, so it starts with
+everything already imported and warm and writes directly into the terminal of the
+client, and finally it replies the exit code to the client. The process group of the
+child is terminated if its client disconnects (e.g. Ctrl+C in the terminal). The
+children are reaped using SIGCHLD and the daemon refreshes its warm state after they
+finish (only the parts whose files were modified are computed again).
+
+If the daemon is not running (or it is running a different version of the package) the
+CLI runs the command itself as usual.
+"""
+
+import array
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import selectors
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+
+from . import __version__
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+SOCKET_DIRNAME = "pre-commit-vauxoo"
+# The max length of a unix socket path is 108 bytes in linux (104 in macos)
+MAX_SOCKET_PATH_LENGTH = 100
+# Seconds to wait for the request once the client is connected
+REQUEST_TIMEOUT = 10
+DISABLE_ENVVAR = "PRECOMMIT_NO_DAEMON"
+
+
+def is_private_dir(path):
+    """Return True if the path is a folder (not a symlink) owned by the user and only accessible by them"""
+    try:
+        path_stat = pathlib.Path(path).lstat()
+    except OSError:
+        return False
+    return stat.S_ISDIR(path_stat.st_mode) and path_stat.st_uid == os.getuid() and not path_stat.st_mode & 0o077
+
+
+def get_socket_dir(create=False):
+    """Get the private folder of the user for the sockets
+
+    It is a sub-folder of $XDG_RUNTIME_DIR if it is a private folder, otherwise a folder
+    unique for the user into the temporary folder.
+    Raise OSError if the folder is not private (e.g. created by another user)
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and is_private_dir(runtime_dir):
+        socket_dir = pathlib.Path(runtime_dir, SOCKET_DIRNAME)
+    else:
+        socket_dir = pathlib.Path(tempfile.gettempdir(), "%s-%s" % (SOCKET_DIRNAME, os.getuid()))
+    if create and not socket_dir.is_symlink() and not socket_dir.exists():
+        socket_dir.mkdir(0o700)
+    if not is_private_dir(socket_dir):
+        raise OSError("The folder %s is not owned by the user or it is accessible by other users" % socket_dir)
+    return socket_dir
+
+
+def get_repo_dir(path):
+    """Get the folder of the repository of path (the closest one with .git) or None if it is not into one
+
+    .git is a file for the worktrees and the submodules
+    """
+    path = pathlib.Path(path).resolve()
+    for repo_dir in (path, *path.parents):
+        if (repo_dir / ".git").exists():
+            return repo_dir
+    return None
+
+
+def get_socket_path(repo_dirname, create=False):
+    # A socket unique for the repository
+    repo_hash = hashlib.sha256(str(pathlib.Path(repo_dirname).resolve()).encode()).hexdigest()[:16]
+    socket_path = get_socket_dir(create=create) / ("%s.sock" % repo_hash)
+    if len(bytes(socket_path)) > MAX_SOCKET_PATH_LENGTH:
+        raise OSError("The socket path %s is too long" % socket_path)
+    return socket_path
+
+
+def get_peer_uid(conn):
+    """Get the user id of the process connected to the other side of the unix socket
+
+    Return None if the platform does not support to get it
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds_struct = struct.Struct("3i")
+    _pid, uid, _gid = creds_struct.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, creds_struct.size))
+    return uid
+
+
+def send_json(conn, data):
+    conn.sendall(json.dumps(data).encode() + b"\n")
+
+
+def recv_json(conn, fds_count=0):
+    """Receive a json line from the socket and the file descriptors sent with it"""
+    buff = b""
+    fds = []
+    while not buff.endswith(b"\n"):
+        if fds_count and not fds:
+            msg, ancdata, _flags, _addr = conn.recvmsg(65536, socket.CMSG_LEN(fds_count * array.array("i").itemsize))
+            for cmsg_level, cmsg_type, cmsg_data in ancdata:
+                if cmsg_level == socket.SOL_SOCKET and cmsg_type == socket.SCM_RIGHTS:
+                    fds_array = array.array("i")
+                    fds_array.frombytes(cmsg_data[: len(cmsg_data) - (len(cmsg_data) % fds_array.itemsize)])
+                    fds.extend(fds_array)
+        else:
+            msg = conn.recv(65536)
+        if not msg:
+            break
+        buff += msg
+    return (json.loads(buff) if buff else None), fds
+
+
+def connect():
+    """Connect to the daemon of the current repository
+
+    Return None if the daemon is not available or it is not safe to send it the request
+    """
+    if os.environ.get(DISABLE_ENVVAR) or not hasattr(socket, "AF_UNIX"):
+        return None
+    repo_dir = get_repo_dir(pathlib.Path.cwd())
+    if repo_dir is None:
+        return None
+    try:
+        socket_path = get_socket_path(repo_dir)
+    except OSError:
+        return None
+    if not socket_path.exists():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(str(socket_path))
+        if get_peer_uid(conn) != os.getuid():
+            # Never send the environment (e.g. tokens) to a process of another user
+            raise OSError("The daemon is not running with the current user")
+    except OSError:
+        # e.g. a socket file of a daemon not running anymore
+        conn.close()
+        return None
+    return conn
+
+
+def send_request(conn, params, fds):
+    """Send the request to the daemon and wait for the exit code of the command
+
+    Return None if the daemon did not start to run it so the caller runs it
+    """
+    data = {"version": __version__, "cwd": str(pathlib.Path.cwd()), "env": dict(os.environ), "params": params}
+    payload = json.dumps(data).encode() + b"\n"
+    with conn.makefile("rb") as conn_file:
+        try:
+            conn.sendmsg([payload], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))])
+            response = json.loads(conn_file.readline() or "null")
+            if not response or "running" not in response:
+                _logger.warning(
+                    "The pre-commit-vauxoo daemon could not run the command: %s", (response or {}).get("error")
+                )
+                return None
+            # The command is running so it is never run again by the caller from here
+            response = json.loads(conn_file.readline() or "null")
+        except KeyboardInterrupt:
+            # Closing the connection terminates the process group running the request
+            return 128 + signal.SIGINT
+        except (OSError, ValueError) as error:
+            _logger.warning("The pre-commit-vauxoo daemon could not run the command: %s", error)
+            return None
+    if not response or "exit_code" not in response:
+        _logger.error("The pre-commit-vauxoo daemon stopped before finishing the command")
+        return 1
+    return response["exit_code"]
+
+
+def request(params):
+    """Run the command in the daemon of the current repository
+
+    Return the exit code or None if the daemon is not available so the caller runs it
+    """
+    try:
+        fds = [sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()]
+    except (OSError, ValueError):
+        # e.g. the streams were replaced by objects without a real file descriptor
+        return None
+    conn = connect()
+    if conn is None:
+        return None
+    with conn:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        return send_request(conn, params, fds)
+
+
+def receive_request(conn):
+    """Receive the request of the client checking if the daemon can run it
+
+    Return a tuple (data, fds) or raise UserWarning with the reason to reject it
+    """
+    if get_peer_uid(conn) not in (None, os.getuid()):
+        raise UserWarning("The client is not running with the user of the daemon")
+    data, fds = recv_json(conn, fds_count=3)
+    if not data or len(fds) != 3:
+        raise UserWarning("Invalid request")
+    if data.get("version") != __version__:
+        raise UserWarning("The daemon is running version %s instead of %s" % (__version__, data.get("version")))
+    return data, fds
+
+
+def watch_client(conn, finished):
+    """Terminate the process group of the request if its client disconnects before it is finished"""
+    try:
+        while conn.recv(65536):
+            # The client does not send anything else so there is nothing to do with it
+            pass
+    except OSError:
+        pass
+    if not finished.is_set():
+        os.killpg(0, signal.SIGTERM)
+
+
+def run_child(run_meth, data, fds):
+    """Run the request in the forked process using the stdin, stdout and stderr of the client
+
+    Return the exit code of the command
+    """
+    try:
+        for target_fd, client_fd in zip((0, 1, 2), fds):
+            os.dup2(client_fd, target_fd)
+        os.chdir(data["cwd"])
+        os.environ.clear()
+        os.environ.update(data["env"])
+        _logger.info("Running in the pre-commit-vauxoo daemon (pid %s)", os.getppid())
+        # json converts the tuples to lists but the parameters are compared with tuples
+        params = {name: tuple(value) if isinstance(value, list) else value for name, value in data["params"].items()}
+        run_meth(**params)
+    except SystemExit as system_exit:
+        return system_exit.code if isinstance(system_exit.code, int) else int(bool(system_exit.code))
+    except BaseException:  # ruff: ignore[blind-except]
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def handle_request(conn, run_meth):
+    """Receive and run the request of the connection in the forked process (it never returns)"""
+    exit_code = 1
+    try:
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            data, fds = receive_request(conn)
+        except (OSError, ValueError, UserWarning) as error:
+            _logger.warning("Invalid request to the pre-commit-vauxoo daemon: %s", error)
+            send_json(conn, {"error": str(error)})
+            return
+        conn.settimeout(None)
+        send_json(conn, {"running": os.getpid()})
+        finished = threading.Event()
+        threading.Thread(target=watch_client, args=(conn, finished), daemon=True).start()
+        exit_code = run_child(run_meth, data, fds)
+        finished.set()
+        send_json(conn, {"exit_code": exit_code})
+    except OSError:
+        # The client disconnected
+        pass
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_code)
+
+
+def accept_request(server, selector, run_meth, children):
+    """Fork a child for the connection of a client handling everything of the request from there"""
+    conn, _addr = server.accept()
+    with conn:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if not pid:
+            # The child does not reap nor accept anything of the daemon
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            selector.close()
+            server.close()
+            os.setpgid(0, 0)
+            handle_request(conn, run_meth)
+    # Set it from both sides since that the child could be terminated before it sets it
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        # The child already set it (or it already exited)
+        pass
+    children.add(pid)
+
+
+def drain_pipe(pipe_fd):
+    try:
+        while os.read(pipe_fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def reap_children(children):
+    """Wait for the children finished returning True if any of them finished"""
+    reaped = False
+    for pid in list(children):
+        try:
+            finished_pid, _wait_status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            finished_pid = pid
+        if finished_pid:
+            children.discard(pid)
+            reaped = True
+    return reaped
+
+
+def warm_up(warm_meth, repo_dirname):
+    """Refresh the state inherited by the next children so they do not compute it again"""
+    if not warm_meth:
+        return
+    try:
+        warm_meth(repo_dirname)
+    except Exception as error:  # ruff: ignore[blind-except]
+        # The children compute it themselves
+        _logger.warning("Unable to warm up the pre-commit-vauxoo daemon: %s", error)
+
+
+def serve(repo_dirname, run_meth, warm_meth=None):
+    """Listen for the requests of the repository running them with run_meth(**params)
+
+    warm_meth(repo_dirname) loads the state reused by run_meth before forking each request
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        raise UserWarning("The pre-commit-vauxoo daemon needs the peer credentials of the unix sockets")
+    socket_path = get_socket_path(repo_dirname, create=True)
+    if socket_path.exists():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            try:
+                conn.connect(str(socket_path))
+            except OSError:
+                # Stale socket file of a daemon not running anymore
+                socket_path.unlink()
+            else:
+                raise UserWarning("The pre-commit-vauxoo daemon is already running at %s" % socket_path)
+    warm_up(warm_meth, repo_dirname)
+    # SIGTERM (e.g. kill) cleans the socket file the same way than Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    # SIGCHLD wakes up the selector using the pipe to reap the children
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda _signum, _frame: None)
+    # The pids of the children running a request
+    children = set()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server, selectors.DefaultSelector() as selector:
+        server.bind(str(socket_path))
+        server.listen()
+        selector.register(server, selectors.EVENT_READ)
+        selector.register(wakeup_read, selectors.EVENT_READ)
+        _logger.info("pre-commit-vauxoo daemon listening on %s (pid %s)", socket_path, os.getpid())
+        try:
+            while True:
+                for key, _events in selector.select():
+                    if key.fileobj is server:
+                        accept_request(server, selector, run_meth, children)
+                    else:
+                        drain_pipe(wakeup_read)
+                if reap_children(children):
+                    # The files could be modified by the requests finished (e.g. the autofixes)
+                    warm_up(warm_meth, repo_dirname)
+        except KeyboardInterrupt:
+            _logger.info("Stopping pre-commit-vauxoo daemon")
+        finally:
+            socket_path.unlink()
+            signal.set_wakeup_fd(-1)
+            os.close(wakeup_read)
+            os.close(wakeup_write)
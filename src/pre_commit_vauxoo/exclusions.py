@@ -0,0 +1,74 @@
+"""Paths excluded from the checks (EXCLUDE_LINT, EXCLUDE_AUTOFIX and the uninstallable modules)
+
+pre-commit searches the "exclude" regex of the configuration files in the path (relative to
+the repository) of each file for each hook. A plain alternation of hundreds of paths
+(e.g. the uninstallable modules) tries each one of them in each position of each path, so:
+
+- The regex rendered in the configuration files is trie-shaped: the common prefixes of
+  the paths are matched only once (e.g. "module_(?:a/|b/)" instead of "module_a/|module_b/").
+- The files excluded from lint are dropped in python before running the stages when the
+  files to check are known (e.g. "--diff"), so pre-commit does not search them at all.
+
+Both match exactly the same files as the alternation: a path is excluded if it contains
+one of the excluded paths.
+"""
+
+import os
+import pathlib
+import re
+
+
+def get_exclude_paths(exclude_paths):
+    """The excluded paths without empty and redundant ones sorted
+
+    A path containing another one is redundant since that every file containing it contains the other one too
+    """
+    paths = sorted({exclude_path.strip() for exclude_path in exclude_paths if exclude_path and exclude_path.strip()})
+    return [path for path in paths if not any(other != path and other in path for other in paths)]
+
+
+def build_trie(paths):
+    trie = {}
+    for path in paths:
+        node = trie
+        for char in path:
+            node = node.setdefault(char, {})
+        # The end of a path. It has no other children since that the redundant paths were removed
+        node[""] = {}
+    return trie
+
+
+def trie_to_regex(node):
+    if "" in node:
+        return ""
+    branches = []
+    for char, child in sorted(node.items()):
+        # The chains of nodes with only one child are joined in the same branch
+        chunk = char
+        while len(child) == 1 and "" not in child:
+            ((next_char, child),) = child.items()
+            chunk += next_char
+        branches.append(re.escape(chunk) + trie_to_regex(child))
+    return branches[0] if len(branches) == 1 else "(?:%s)" % "|".join(branches)
+
+
+def get_exclude_regex(exclude_paths):
+    """Trie-shaped regex matching the files containing one of exclude_paths or "" if there are not paths
+
+    The characters are escaped so it can be used in the verbose "(?x)" regex of the configuration files
+    """
+    paths = get_exclude_paths(exclude_paths)
+    return trie_to_regex(build_trie(paths)) if paths else ""
+
+
+def filter_files(repo_dirname, files, exclude_paths):
+    """Return a tuple (files, excluded) splitting the files by the exclude_paths matched by pre-commit"""
+    exclude_regex = get_exclude_regex(exclude_paths)
+    if not exclude_regex:
+        return list(files), []
+    exclude_search = re.compile(exclude_regex).search
+    kept, excluded = [], []
+    for fname in files:
+        relpath = pathlib.Path(os.path.relpath(os.path.abspath(fname), repo_dirname)).as_posix()
+        (excluded if exclude_search(relpath) else kept).append(fname)
+    return kept, excluded
@@ -7,7 +7,7 @@ import re
 import subprocess
 import sys
 
-from pre_commit_vauxoo.pre_commit_vauxoo import get_repo
+from pre_commit_vauxoo.constants import CFG_CACHE_SUBFOLDER, CFG_SUBFOLDER
 
 ALLOWED_TAGS = {
     "ADD": "adding new modules or new major features",
@@ -43,7 +43,15 @@ def split_targets(raw_value):
 
 
 def get_repo_root_modules(repo_root):
-    return {
+    """Root directories and names of the Odoo modules of the index (nested addons roots too)"""
+    # Imported only if there are targets to validate since that the hook runs for each commit
+    from pre_commit_vauxoo import odoo_modules  # ruff: ignore[import-outside-top-level]
+
+    cfg_dir = os.path.join(repo_root, CFG_SUBFOLDER)
+    # The index is saved only if pre-commit-vauxoo already created its folder
+    cache_dir = os.path.join(cfg_dir, CFG_CACHE_SUBFOLDER) if os.path.isdir(cfg_dir) else None
+    modules_index = odoo_modules.get_modules_index(repo_root, cache_dir=cache_dir)
+    return {module["name"] for module in modules_index.values()} | {
         entry
         for entry in os.listdir(repo_root)
         if pathlib.Path(os.path.join(repo_root, entry)).is_dir() and not entry.startswith(".")
@@ -58,7 +66,7 @@ def target_exists(repo_root, target, repo_root_modules):
     return pathlib.Path(os.path.join(repo_root, target)).is_file()
 
 
-def validate_commit_message_header(header, repo_root=None):
+def validate_commit_message_header(header, repo_root=None, repo_root_modules=None):
     header = header.strip()
     if not header:
         return ["Commit message header is empty."]
@@ -96,13 +104,14 @@ def validate_commit_message_header(header, repo_root=None):
         errors.append("Commit summary cannot be empty.")
 
     if repo_root and modules:
-        repo_root_modules = get_repo_root_modules(repo_root)
+        if repo_root_modules is None:
+            repo_root_modules = get_repo_root_modules(repo_root)
         invalid_modules = [module for module in modules if not target_exists(repo_root, module, repo_root_modules)]
         if invalid_modules:
             errors.append(
                 "Unknown module or file target(s): %s. "
                 "Use one or more targets separated by ',' or '/'. "
-                "Each target must be '*', an existing root module directory, "
+                "Each target must be '*', an existing module or root directory, "
                 "or an existing file path in the repository." % ", ".join(invalid_modules)
             )
     return errors
@@ -113,6 +122,8 @@ def check_commit_msg_file(commit_msg_file, repo_root=None):
         header = commit_msg_fd.readline()
 
     if repo_root is None:
+        from pre_commit_vauxoo.pre_commit_vauxoo import get_repo  # ruff: ignore[import-outside-top-level]
+
         repo_root = get_repo()
 
     errors = validate_commit_message_header(header, repo_root=repo_root)
@@ -141,14 +152,16 @@ def get_git_remotes_with_urls():
     return remotes
 
 
-def resolve_commit_message_base_ref(version):
-    if not version:
-        return ""
+def get_stable_base_ref(version):
+    """Stable ref of the version without printing anything (e.g. used by "--since" too)
 
+    The remotes with "dev" in their URL are skipped and "origin" is preferred over the other remotes
+    Return a tuple (base_ref, remote_url) where remote_url is None for the local branch
+    and base_ref is empty if the ref was not found
+    """
     remote_candidates = []
     for remote_name, remote_url in get_git_remotes_with_urls().items():
         if "dev" in remote_url.lower():
-            print(f"Skipping remote {remote_name} because its URL contains 'dev': {remote_url}")
             continue
         remote_ref = f"refs/remotes/{remote_name}/{version}"
         if git_ref_exists(remote_ref):
@@ -156,16 +169,29 @@ def resolve_commit_message_base_ref(version):
 
     if remote_candidates:
         _, _remote_name, base_ref, remote_url = min(remote_candidates)
-        print(f"Using stable remote ref {base_ref} from {remote_url}")
-        return base_ref
+        return base_ref, remote_url
 
-    local_ref = f"refs/heads/{version}"
-    if git_ref_exists(local_ref):
-        print(f"Using local stable ref {version} for commit message validation")
-        return version
+    if git_ref_exists(f"refs/heads/{version}"):
+        return version, None
+    return "", None
 
-    print(f"Skipping commit message validation because stable ref {version} was not found")
-    return ""
+
+def resolve_commit_message_base_ref(version):
+    if not version:
+        return ""
+
+    for remote_name, remote_url in get_git_remotes_with_urls().items():
+        if "dev" in remote_url.lower():
+            print(f"Skipping remote {remote_name} because its URL contains 'dev': {remote_url}")
+
+    base_ref, remote_url = get_stable_base_ref(version)
+    if remote_url:
+        print(f"Using stable remote ref {base_ref} from {remote_url}")
+    elif base_ref:
+        print(f"Using local stable ref {version} for commit message validation")
+    else:
+        print(f"Skipping commit message validation because stable ref {version} was not found")
+    return base_ref
 
 
 def get_invalid_commit_messages(base_ref, repo_root):
@@ -178,9 +204,11 @@ def get_invalid_commit_messages(base_ref, repo_root):
         return []
 
     invalid_commits = []
+    # The targets are the same for all the commits so the repository is scanned only once
+    repo_root_modules = get_repo_root_modules(repo_root)
     for line in git_log.splitlines():
         sha, subject = line.split("\t", 1)
-        errors = validate_commit_message_header(subject, repo_root=repo_root)
+        errors = validate_commit_message_header(subject, repo_root=repo_root, repo_root_modules=repo_root_modules)
         if errors:
             invalid_commits.append({"sha": sha, "subject": subject, "errors": errors})
     return invalid_commits
@@ -188,6 +216,8 @@ def get_invalid_commit_messages(base_ref, repo_root):
 
 def check_commit_messages_since_version(repo_root=None, version=None):
     if repo_root is None:
+        from pre_commit_vauxoo.pre_commit_vauxoo import get_repo  # ruff: ignore[import-outside-top-level]
+
         repo_root = get_repo()
     if version is None:
         version = os.environ.get("VERSION", "").strip()
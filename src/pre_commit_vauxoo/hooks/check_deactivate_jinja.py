@@ -8,9 +8,6 @@ import platform
 import re
 import sys
 
-from jinja2 import Environment, Template, meta
-from pgsanity import pgsanity
-
 # Based on https://git.vauxoo.com/deployv/deployv/blob/330144c3d7848a60ce/deployv/instance/instancev.py#L101
 INSTANCE_TYPES = ["test", "develop", "updates"]
 # Based on https://git.vauxoo.com/deployv/orchest/blob/0d2dfca2e1dd6d3268f149/orchestv/models/deploy_deploy.py#L1252
@@ -23,6 +20,9 @@ VALID_VARIABLES_CODE = (
 
 
 def check_json_variables(fname_deactivate):
+    # jinja2 is imported only for the .jinja files since that importing it is slow
+    from jinja2 import Environment, meta  # ruff: ignore[import-outside-top-level]
+
     env = Environment()
     deactivate_content = pathlib.Path(fname_deactivate).read_text()
     parsed_content = env.parse(deactivate_content)
@@ -39,6 +39,8 @@ def check_json_variables(fname_deactivate):
 def json2sql(fname_deactivate, instance_types=None):
     if instance_types is None:
         instance_types = INSTANCE_TYPES
+    from jinja2 import Template  # ruff: ignore[import-outside-top-level]
+
     deactivate_content = pathlib.Path(fname_deactivate).read_text()
     jinja_tmpl = Template(deactivate_content)
     res = True
@@ -72,6 +74,8 @@ def check_deactivate(fname_deactivate, instance_types=None):
     else:
         print(f"File extension {fname_deactivate} not supported")
         return False
+    from pgsanity import pgsanity  # ruff: ignore[import-outside-top-level]
+
     try:
         res, msg = pgsanity.check_string(sql)
     except OSError as oserr:
@@ -0,0 +1,204 @@
+"""Route the files to check to the hooks of the pre-commit configuration files
+
+pre-commit filters the files of each hook ("files", "exclude", "types", "types_or" and
+"exclude_types") only after starting, installing and checking the environments of the
+hooks. A commit changing only ".po" or ".md" files would start every stage just to
+report all their hooks as "(no files to check) Skipped".
+
+get_routing builds a table {hook_id: [files]} for each stage using the same filters as
+pre-commit, classifying each file once with the tags of identify (used by pre-commit
+too), so the stages without files for any of their hooks are not started at all.
+The stages with a hook running even without files ("always_run") are always started.
+
+The hooks of a remote repository take their filters from its manifest, so they are
+known only if pre-commit already cloned it (e.g. "pre-commit install-hooks"). If a
+hook can not be resolved the routing of its stage is unknown and the stage runs as usual.
+"""
+
+import contextlib
+import logging
+import pathlib
+import re
+import shutil
+import sys
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+MANIFEST_FILENAME = ".pre-commit-hooks.yaml"
+# The hook stage of "pre-commit run" ("commit" is its legacy name)
+RUN_HOOK_STAGES = {"pre-commit", "commit"}
+HOOK_DEFAULTS = {
+    "files": "",
+    "exclude": "^$",
+    "types": ["file"],
+    "types_or": [],
+    "exclude_types": [],
+    "always_run": False,
+    "stages": [],
+}
+
+
+class UnknownHook(Exception):
+    """The filters of the hook can not be resolved without running pre-commit"""
+
+
+def load_yaml(path):
+    """Content of the yaml file raising UnknownHook if it can not be read"""
+    # yaml is imported only if it is used since that importing it is slow
+    import yaml  # ruff: ignore[import-outside-top-level]
+
+    try:
+        with pathlib.Path(path).open(encoding="utf-8") as f_yaml:
+            return yaml.safe_load(f_yaml)
+    except (OSError, yaml.YAMLError) as error:
+        raise UnknownHook("Unable to read %s: %s" % (path, error)) from error
+
+
+def get_repo_path(pre_commit_home, repo, rev):
+    """Path of the repository already cloned by pre-commit or None
+
+    It reads the database of the pre-commit store in read-only mode, so it never clones it
+    """
+    db_path = pathlib.Path(pre_commit_home, "db.db")
+    if not db_path.is_file():
+        return None
+    # sqlite3 is imported only if it is used to keep the startup fast
+    import sqlite3  # ruff: ignore[import-outside-top-level]
+
+    try:
+        with contextlib.closing(sqlite3.connect("file:%s?mode=ro" % db_path, uri=True)) as db:
+            result = db.execute("SELECT path FROM repos WHERE repo = ? AND ref = ?", (repo, rev)).fetchone()
+    except sqlite3.Error:
+        return None
+    return result[0] if result and pathlib.Path(result[0]).is_dir() else None
+
+
+def get_hooks(pre_commit_cfg, pre_commit_home):
+    """Hooks of the configuration file with the filters of their manifests
+
+    Return a tuple (config, hooks) where hooks are the dicts of the hooks run by "pre-commit run"
+    Raise UnknownHook if a hook can not be resolved
+    """
+    config = load_yaml(pre_commit_cfg)
+    if not isinstance(config, dict):
+        raise UnknownHook("Invalid configuration file %s" % pre_commit_cfg)
+    return config, get_config_hooks(config, pre_commit_home)
+
+
+def get_config_hooks(config, pre_commit_home):
+    """Hooks of the configuration already loaded (see get_hooks)"""
+    hooks = []
+    for repo in config.get("repos") or []:
+        manifest_hooks = {}
+        if repo.get("repo") == "meta":
+            raise UnknownHook("The meta hooks are not supported")
+        if repo.get("repo") != "local":
+            repo_path = get_repo_path(pre_commit_home, repo.get("repo"), repo.get("rev"))
+            if not repo_path:
+                raise UnknownHook("The repository %s is not installed yet" % repo.get("repo"))
+            manifest_hooks = {
+                hook.get("id"): hook
+                for hook in load_yaml(pathlib.Path(repo_path, MANIFEST_FILENAME)) or []
+                if isinstance(hook, dict)
+            }
+        for config_hook in repo.get("hooks") or []:
+            if repo.get("repo") != "local" and config_hook.get("id") not in manifest_hooks:
+                raise UnknownHook("The hook %s is not in %s" % (config_hook.get("id"), repo.get("repo")))
+            hook = {**HOOK_DEFAULTS, **manifest_hooks.get(config_hook.get("id"), {}), **config_hook}
+            stages = hook["stages"] or config.get("default_stages") or RUN_HOOK_STAGES
+            if RUN_HOOK_STAGES & set(stages):
+                hooks.append(hook)
+    return hooks
+
+
+def get_hook_config(pre_commit_cfg, hook_id):
+    """The configuration file with only the repositories of the hook, so the other ones do not need to be resolved"""
+    config = load_yaml(pre_commit_cfg)
+    if not isinstance(config, dict):
+        raise UnknownHook("Invalid configuration file %s" % pre_commit_cfg)
+    repos = [
+        repo
+        for repo in config.get("repos") or []
+        if any(hook.get("id") == hook_id for hook in repo.get("hooks") or [])
+    ]
+    return dict(config, repos=repos)
+
+
+def get_hook_command(pre_commit_home, repo, rev, hook_id):
+    """Command of the python hook (e.g. ["/path/to/env/bin/ruff", "check", "--force-exclude"])
+
+    The executable is the one of the environment installed by pre-commit for the hook
+    """
+    repo_path = get_repo_path(pre_commit_home, repo, rev)
+    if not repo_path:
+        raise UnknownHook("The repository %s is not installed yet" % repo)
+    manifest = load_yaml(pathlib.Path(repo_path, MANIFEST_FILENAME)) or []
+    entry = next((hook.get("entry") for hook in manifest if hook.get("id") == hook_id), None)
+    if not entry:
+        raise UnknownHook("The hook %s is not in %s" % (hook_id, repo))
+    entry = entry.split()
+    for env_path in sorted(pathlib.Path(repo_path).glob("py_env-*")):
+        bin_path = env_path / ("Scripts" if sys.platform == "win32" else "bin")
+        executable = shutil.which(entry[0], path=str(bin_path))
+        if executable:
+            return [executable] + entry[1:]
+    raise UnknownHook("The environment of %s is not installed yet" % repo)
+
+
+def get_files_tags(repo_dirname, relpaths):
+    """identify tags of the files {relpath: tags} (the files not found are not checked by pre-commit)"""
+    # identify (a dependency of pre-commit) is imported only if it is used
+    from identify.identify import tags_from_path  # ruff: ignore[import-outside-top-level]
+
+    files_tags = {}
+    for relpath in relpaths:
+        path = pathlib.Path(repo_dirname, relpath)
+        if path.exists() or path.is_symlink():
+            files_tags[relpath] = tags_from_path(str(path))
+    return files_tags
+
+
+def filter_by_include_exclude(relpaths, include, exclude):
+    include_search, exclude_search = re.compile(include).search, re.compile(exclude).search
+    return [relpath for relpath in relpaths if include_search(relpath) and not exclude_search(relpath)]
+
+
+def route_files(config, hooks, files_tags):
+    """Files of each hook {hook_id: [relpath, ...]} filtered as pre-commit does"""
+    relpaths = filter_by_include_exclude(sorted(files_tags), config.get("files", ""), config.get("exclude", "^$"))
+    routing = {}
+    for hook in hooks:
+        types, types_or, exclude_types = set(hook["types"]), set(hook["types_or"]), set(hook["exclude_types"])
+        routing.setdefault(hook["id"], []).extend(
+            relpath
+            for relpath in filter_by_include_exclude(relpaths, hook["files"], hook["exclude"])
+            if files_tags[relpath] >= types
+            and (not types_or or files_tags[relpath] & types_or)
+            and not files_tags[relpath] & exclude_types
+        )
+    return routing
+
+
+def get_routing(repo_dirname, relpaths, pre_commit_cfgs, pre_commit_home):
+    """Routing table of the files of each stage {stage: {hook_id: [relpath, ...]}}
+
+    pre_commit_cfgs are the configuration files of the stages {stage: path}
+    The routing of a stage is None if it is unknown or one of its hooks runs even without files
+    (e.g. "always_run: true"), so the stage needs to run
+    """
+    files_tags = None
+    stages_routing = {}
+    for stage, pre_commit_cfg in pre_commit_cfgs.items():
+        try:
+            config, hooks = get_hooks(pre_commit_cfg, pre_commit_home)
+        except UnknownHook as error:
+            _logger.debug("Unknown files of the hooks of the %s checks: %s", stage, error)
+            stages_routing[stage] = None
+            continue
+        if any(hook["always_run"] for hook in hooks):
+            stages_routing[stage] = None
+            continue
+        if files_tags is None:
+            files_tags = get_files_tags(repo_dirname, relpaths)
+        stages_routing[stage] = route_files(config, hooks, files_tags)
+    return stages_routing
@@ -31,15 +31,27 @@ class ColoredFormatter(logging.Formatter):
 
 
 logger = logging.getLogger("pre-commit-vauxoo")
-logger.setLevel(logging.DEBUG)
 
-# create console handler with a higher log level
-ch = logging.StreamHandler()
-ch.setLevel(logging.DEBUG)
 
-ch.setFormatter(ColoredFormatter(FORMAT_STR))
+def setup_logger():
+    """Show the logs colored in the console
+
+    It is called by the entry points (e.g. the CLI) instead of at import time so importing
+    the package does not configure the logging of the process using it
+    """
+    if any(isinstance(handler.formatter, ColoredFormatter) for handler in logger.handlers):
+        return
+    logger.setLevel(logging.DEBUG)
+
+    # create console handler with a higher log level
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.DEBUG)
+
+    ch.setFormatter(ColoredFormatter(FORMAT_STR))
+
+    logger.addHandler(ch)
 
-logger.addHandler(ch)
 
 if __name__ == "__main__":
+    setup_logger()
     logger.info("testing....")
@@ -0,0 +1,190 @@
+"""Odoo modules of the repository used to expand the files to check to their whole modules
+
+pylint-odoo and the OCA hooks need the whole module to check it (e.g. the manifest keys,
+the xml ids or the files missing), so checking only the files changed could miss errors.
+
+The modules are found once per run using the index of get_modules_index shared with the
+other features knowing about modules (uninstallable modules, sharding and commit messages).
+"""
+
+import ast
+import collections
+import json
+import logging
+import pathlib
+import posixpath
+import subprocess
+import sys
+
+from . import tracing
+from .results_cache import get_files_stamp, make_cache_dir
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+MANIFEST_FILENAMES = ("__manifest__.py", "__openerp__.py")
+MODULES_INDEX_FILENAME = "modules-index.json"
+# The last index saved in each cache file {cache_path: (stamp, index)} so a process running
+# several commands (e.g. the daemon of "--serve") does not read the cache file again
+MODULES_INDEXES = {}
+
+
+def git_ls_files(repo_dirname, pathspecs):
+    """Files tracked and untracked (but not ignored) matching the pathspecs relative to the repository"""
+    output = subprocess.check_output(
+        ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard", "--", *pathspecs],
+        cwd=repo_dirname,
+        stderr=subprocess.PIPE,
+    )
+    return sorted({fname for fname in output.decode(sys.stdout.encoding).split("\0") if fname})
+
+
+def read_manifest(path):
+    """Content of the manifest or None if it could not be parsed"""
+    try:
+        with pathlib.Path(path).open() as manifest:
+            content = ast.literal_eval(manifest.read())
+    except (ValueError, TypeError, SyntaxError, OSError):
+        return None
+    return content if isinstance(content, dict) else None
+
+
+def index_manifest(module_dir, manifest_path, stamp):
+    """Entry of the modules index of the manifest (without the number of files)"""
+    manifest = read_manifest(manifest_path)
+    if manifest is None:
+        _logger.info("Unable to parse manifest at %s. Considering it installable without depends", manifest_path)
+        manifest = {}
+    depends = manifest.get("depends", [])
+    return {
+        "stamp": stamp,
+        "name": posixpath.basename(module_dir),
+        "path": module_dir,
+        "installable": bool(manifest.get("installable", True)),
+        "depends": [depend for depend in depends if isinstance(depend, str)] if isinstance(depends, list) else [],
+        "version": str(manifest.get("version", "")),
+    }
+
+
+@tracing.traced
+def get_modules_index(repo_dirname, cache_dir=None):
+    """Index of the Odoo modules of the repository: the directories with a manifest
+
+    Return a dict {module_dir: {"name", "path", "installable", "depends", "version", "files"}}
+    where module_dir (and "path") is relative to the repository separated by "/" so the modules
+    of nested addons roots (e.g. "addons/module") are indexed too and "files" is the number of
+    files of the module (without the files of its nested modules)
+    The index is saved in cache_dir and a manifest is parsed again only if its mtime or size changed
+    """
+    relpaths = git_ls_files(repo_dirname, [])
+    manifests = {}
+    for relpath in relpaths:
+        module_dir, filename = posixpath.split(relpath)
+        if module_dir and filename in MANIFEST_FILENAMES:
+            manifests.setdefault(module_dir, relpath)
+    files_count = collections.Counter(get_file_module(relpath, manifests) for relpath in relpaths)
+    cache_path = pathlib.Path(cache_dir, MODULES_INDEX_FILENAME) if cache_dir else None
+    cache = {}
+    if cache_path:
+        cache_stamp, cache = MODULES_INDEXES.get(str(cache_path), (None, {}))
+        if cache_stamp != get_files_stamp([cache_path]):
+            try:
+                cache = json.loads(cache_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                cache = {}
+    index = {}
+    for module_dir, manifest_relpath in sorted(manifests.items()):
+        manifest_path = pathlib.Path(repo_dirname, manifest_relpath)
+        try:
+            manifest_stat = manifest_path.stat()
+        except FileNotFoundError:
+            # Tracked but deleted from the working tree
+            continue
+        stamp = [manifest_stat.st_mtime_ns, manifest_stat.st_size]
+        cached = cache.get(module_dir)
+        # Only the manifests new or changed are parsed again (in the same thread since that ast
+        # is not thread-safe in some python versions, e.g. "AST constructor recursion depth mismatch")
+        entry = cached if cached and cached.get("stamp") == stamp else index_manifest(module_dir, manifest_path, stamp)
+        index[module_dir] = dict(entry, files=files_count[module_dir])
+    if cache_path and index != cache:
+        make_cache_dir(cache_path.parent)
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(index, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(cache_path)
+    if cache_path:
+        MODULES_INDEXES[str(cache_path)] = (get_files_stamp([cache_path]), index)
+    return index
+
+
+def get_uninstallable_module_dirs(modules_index):
+    """Modules with "installable": False as "module_dir/" to be excluded"""
+    return {
+        posixpath.join(module_dir, "") for module_dir, module in modules_index.items() if not module["installable"]
+    }
+
+
+def get_dependents(modules_index, modules, depth):
+    """Installable modules depending on the modules (directly or up to depth levels of dependencies)"""
+    dependents_by_name = {}
+    for module_dir, module in modules_index.items():
+        if not module["installable"]:
+            continue
+        for depend in module["depends"]:
+            dependents_by_name.setdefault(depend, set()).add(module_dir)
+    found = set(modules)
+    level_modules = set(modules)
+    for _level in range(depth):
+        level_modules = {
+            dependent
+            for module_dir in level_modules
+            for dependent in dependents_by_name.get(posixpath.basename(module_dir), ())
+        } - found
+        if not level_modules:
+            break
+        found |= level_modules
+    return found - set(modules)
+
+
+def get_file_module(relpath, module_dirs):
+    """Module containing the file (the nearest one for nested modules) or None"""
+    for parent in pathlib.PurePosixPath(relpath).parents:
+        if parent.as_posix() in module_dirs:
+            return parent.as_posix()
+    return None
+
+
+def expand_to_modules(repo_dirname, relpaths, modules_index, exclude_modules=(), dependents_depth=0):
+    """Replace the files of the modules by all the files of those modules
+
+    The files outside of a module are kept as is and the modules of exclude_modules
+    (e.g. the uninstallable ones "module/") are not checked at all
+    dependents_depth adds the modules depending on them up to that depth (1 only the direct ones)
+    since that a change of a field or a xml id could break them
+    Return a tuple (files, modules) relative to the repository
+    """
+    module_dirs = set(modules_index)
+    excluded = {exclude_module.rstrip("/") for exclude_module in exclude_modules}
+    modules = set()
+    files = set()
+    for relpath in relpaths:
+        module = get_file_module(relpath, module_dirs)
+        if module is None:
+            files.add(relpath)
+        elif module not in excluded:
+            modules.add(module)
+    if modules and dependents_depth:
+        dependents = get_dependents(modules_index, modules, dependents_depth) - excluded
+        if dependents:
+            _logger.info(
+                "Adding %d module(s) depending on the modules changed: %s",
+                len(dependents),
+                ", ".join(sorted(dependents)),
+            )
+        modules |= dependents
+    if modules:
+        files.update(
+            fname
+            for fname in git_ls_files(repo_dirname, sorted(modules))
+            # The files of a nested module are part of it and not of the parent module
+            if get_file_module(fname, module_dirs) in modules
+        )
+    return sorted(files), sorted(modules)
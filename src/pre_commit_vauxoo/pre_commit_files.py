@@ -0,0 +1,36 @@
+"""Run pre-commit reading the files to check from a NUL-separated file
+
+The files are added to the arguments of pre-commit into this process instead of the
+command line of a new one, so the number of files is not limited by the max length of
+the command line (pre-commit itself splits them running the hooks)
+
+Usage: python -m pre_commit_vauxoo.pre_commit_files FILES_LIST PRE_COMMIT_ARGS...
+e.g. python -m pre_commit_vauxoo.pre_commit_files /tmp/files run --color=always -c .pre-commit-config.yaml
+"""
+
+import os
+import sys
+
+
+def read_files_list(content):
+    """Paths of a list separated by NUL characters or by new lines if there are not NUL characters"""
+    if b"\0" in content:
+        fnames = content.split(b"\0")
+    else:
+        fnames = [fname.rstrip(b"\r") for fname in content.split(b"\n")]
+    return [os.fsdecode(fname) for fname in fnames if fname.strip()]
+
+
+def main(argv=None):
+    # Imported here since that read_files_list is used by the CLI too
+    from pre_commit.main import main as pre_commit_main  # ruff: ignore[import-outside-top-level]
+
+    argv = sys.argv[1:] if argv is None else argv
+    files_list_path, pre_commit_args = argv[0], argv[1:]
+    with open(files_list_path, "rb") as f_files:
+        files = read_files_list(f_files.read())
+    return pre_commit_main(pre_commit_args + ["--files", *files])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
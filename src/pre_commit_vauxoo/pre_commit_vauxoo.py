@@ -1,19 +1,34 @@
-import ast
-import glob
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import json
 import logging
 import math
 import os
 import pathlib
-import posixpath
 import re
 import shutil
+import signal
 import stat
 import subprocess
 import sys
-
-import copier
-
-from . import __version__, logging_colored
+import tempfile
+import threading
+import time
+
+# The modules of the features not used by every run (e.g. the watcher, the renderer or the single
+# passes) are imported by the functions using them so importing this one (e.g. by the CLI) is fast
+from . import __version__, exclusions, logging_colored, pylint_ruff, tracing
+from .constants import (
+    CFG_CACHE_SUBFOLDER,
+    CFG_SUBFOLDER,
+    FIX_UNTIL_STABLE_MAX_RUNS,
+    SCOPE_ALL,
+    SCOPE_DIFF,
+    SCOPE_LAST_COMMIT,
+    SCOPE_SINCE,
+)
 
 _logger = logging.getLogger("pre-commit-vauxoo")
 
@@ -24,19 +39,26 @@ re_export = re.compile(
     re.MULTILINE,
 )
 
-# Matches the "check-name,  # ruff CODE1,CODE2" annotations used in the .pylintrc*.jinja
-# templates to document the pylint checks migrated to ruff
-re_pylint_check_ruff_codes = re.compile(
-    r"^\s*(?P<check>[a-z][\w-]*),?\s+#\s*ruff\s+(?P<codes>[A-Z]+\d+(?:,[A-Z]+\d+)*)",
-    re.MULTILINE,
-)
-
-CFG_SUBFOLDER = ".config"
-
-# Scope of files to run the hooks on (--all, --last-commit and --diff)
-SCOPE_ALL = "all"
-SCOPE_LAST_COMMIT = "last-commit"
-SCOPE_DIFF = "diff"
+# Configuration files rendered in the root of the repository instead of CFG_SUBFOLDER:
+# .editorconfig because prettier (and most editors) always search for it there with no CLI
+# flag to override the path and .isort.cfg because the parameter config change the order
+# of third-party packages
+ROOT_CFG_FILES = (".editorconfig", ".isort.cfg")
+INSTALL_HOOKS_FINGERPRINTS_FILENAME = "install-hooks-fingerprints.json"
+CFG_FINGERPRINT_FILENAME = "cfg-fingerprint.json"
+# Subfolder of the per-user cache with the configuration files rendered by their fingerprint
+SHARED_CFG_SUBFOLDER = "cfg"
+# Number of sets of configuration files kept in the per-user cache
+SHARED_CFG_SETS_MAX = 32
+# The lists of files longer than it are sent to pre-commit using a file instead of the command line
+# e.g. the command line is limited to 32767 characters in windows and to ARG_MAX bytes in unix
+FILES_ARGV_MAX_LENGTH = 30000
+PRE_COMMIT_FILES_MODULE = "pre_commit_vauxoo.pre_commit_files"
+
+# The values reused by a process running several commands (e.g. the daemon of "--serve")
+# while the files they come from are not modified {path: (stamp, value)}
+TEMPLATES_DIGESTS = {}
+INSTALL_HOOKS_FINGERPRINTS = {}
 
 TOOLS_ORDER = (
     "prettier_matrix_value",
@@ -88,6 +110,7 @@ def get_is_ci():
     return (False, "")
 
 
+@tracing.traced
 def get_repo():
     repo_root = subprocess.check_output(["git", "rev-parse", "--show-toplevel"]).decode(sys.stdout.encoding).strip()
     repo_root = full_norm_path(repo_root.strip())
@@ -149,16 +172,54 @@ def get_diff_files(repo_dirname):
     return files
 
 
-def get_scope_files(scope, repo_dirname):
+def get_since_files(repo_dirname, since_ref):
+    """Files added or modified by the commits of HEAD since it diverged from since_ref
+
+    "REF...HEAD" compares the merge-base of both with HEAD in the same "git diff" call,
+    so the new commits of since_ref (e.g. the stable branch) are not reported
+    """
+    from .results_cache import git_z_output  # ruff: ignore[import-outside-top-level]
+
+    return git_z_output(["diff", "--name-only", "-z", "--diff-filter=d", "%s...HEAD" % since_ref], repo_dirname)
+
+
+def resolve_since_ref(since_ref, odoo_version):
+    """since_ref or the stable ref of the odoo_version if it is empty (e.g. "origin/17.0")"""
+    if since_ref:
+        return since_ref
+    if not odoo_version:
+        return ""
+    # Imported here since that it is only needed to find the stable ref
+    from .hooks.check_commit_msg import get_stable_base_ref  # ruff: ignore[import-outside-top-level]
+
+    base_ref, remote_url = get_stable_base_ref(odoo_version)
+    if base_ref and remote_url:
+        _logger.info("Using the stable ref %s from %s for '--since'", base_ref, remote_url)
+    elif base_ref:
+        _logger.info("Using the stable ref %s for '--since'", base_ref)
+    return base_ref
+
+
+def get_scope_files(scope, repo_dirname, since_ref=None):
     """Files to run the hooks on for the given scope, relative to the root of the repository
 
     The deleted files are excluded ("--diff-filter=d" and the untracked files always exist)
     since a file that is gone can not be checked at all
     """
-    get_files_meth = {SCOPE_LAST_COMMIT: get_last_commit_files, SCOPE_DIFF: get_diff_files}[scope]
+    get_files_meth = {
+        SCOPE_LAST_COMMIT: get_last_commit_files,
+        SCOPE_DIFF: get_diff_files,
+        SCOPE_SINCE: functools.partial(get_since_files, since_ref=since_ref),
+    }[scope]
     try:
         files = get_files_meth(repo_dirname)
     except subprocess.CalledProcessError as git_error:
+        if scope == SCOPE_SINCE:
+            # Running nothing would hide the errors of the branch so it is not a warning
+            raise UserWarning(
+                "Unable to get the files changed since '%s'. Does the ref exist? (e.g. 'git fetch' it) %s"
+                % (since_ref, (git_error.stderr or b"").decode(sys.stdout.encoding).strip())
+            ) from git_error
         # e.g. a repository without commits at all, so there is no HEAD to compare with
         _logger.warning("Unable to get the files for '--%s'. Is it a repository without commits?", scope)
         _logger.debug("git error: %s", (git_error.stderr or b"").decode(sys.stdout.encoding).strip())
@@ -166,6 +227,7 @@ def get_scope_files(scope, repo_dirname):
     return sorted(set(files))
 
 
+@tracing.traced
 def git_cwd():
     """When the command is invoked from a subdirectory, show
     the path of the current directory relative to the top-level
@@ -177,22 +239,18 @@ def git_cwd():
     return git_path_rel
 
 
-def get_uninstallable_modules(src_path) -> set:
+@tracing.traced
+def get_uninstallable_modules(src_path, modules_index=None) -> set:
     """Find all odoo modules that are set as not installable. They must have a key 'installable' with a False value
     in order to be considered not installable.
 
     :return: A set of strings, each one representing the relative path (from repo dir) to an uninstallable module.
     """
-    results = set()
-    for path in glob.glob(os.path.join(src_path, "*/__manifest__.py")):
-        with pathlib.Path(path).open() as manifest:
-            try:
-                if not ast.literal_eval(manifest.read()).get("installable", True):
-                    results.add(posixpath.join(pathlib.Path(os.path.relpath(path, start=src_path)).parent, ""))
-            except (ValueError, TypeError, SyntaxError, AttributeError):
-                _logger.info("Unable to parse manifest at %s. Considering it installable", path)
+    from . import odoo_modules  # ruff: ignore[import-outside-top-level]
 
-    return results
+    if modules_index is None:
+        modules_index = odoo_modules.get_modules_index(src_path)
+    return odoo_modules.get_uninstallable_module_dirs(modules_index)
 
 
 def parse_matrix_compatibility(matrix_compatibility_string, verbose=True):
@@ -246,31 +304,21 @@ def get_py_target_version(odoo_version_number):
     return DEFAULT_PY_TARGET_VERSION
 
 
-def extend_ruff_checks_from_pylint(precommit_config_dir, pylint_disable_checks, ruff_disable_checks, use_ruff):
+def extend_ruff_checks_from_pylint(pylint_disable_checks, ruff_disable_checks, use_ruff):
     """Extend ruff_disable_checks with the ruff equivalent of the PYLINT_DISABLE_CHECKS names
 
     The .pylintrc*.jinja templates document each pylint check migrated to ruff using a
-    "check-name,  # ruff CODE1,CODE2" comment so reuse those annotations to keep disabling
-    the same checks from ruff without needing to configure RUFF_DISABLE_CHECKS
+    "check-name,  # ruff CODE1,CODE2" comment so reuse those annotations (indexed by pylint_ruff)
+    to keep disabling the same checks from ruff without needing to configure RUFF_DISABLE_CHECKS
     """
     ruff_disable_checks = tuple(ruff_disable_checks or ())
     if not use_ruff or not pylint_disable_checks:
         return ruff_disable_checks
-    pylint2ruff = {}
-    for pylintrc_filename in (".pylintrc.jinja", ".pylintrc-optional.jinja"):
-        pylintrc_path = pathlib.Path(precommit_config_dir) / pylintrc_filename
-        if not pylintrc_path.is_file():
-            continue
-        for check_match in re_pylint_check_ruff_codes.finditer(pylintrc_path.read_text(encoding="utf-8")):
-            codes = pylint2ruff.get(check_match["check"], ())
-            pylint2ruff[check_match["check"]] = codes + tuple(
-                code for code in check_match["codes"].split(",") if code not in codes
-            )
     ruff_checks = ()
     for pylint_check in pylint_disable_checks:
         ruff_checks += tuple(
             code
-            for code in pylint2ruff.get(pylint_check, ())
+            for code in pylint_ruff.get_ruff_codes(pylint_check)
             if code not in ruff_disable_checks and code not in ruff_checks
         )
     if ruff_checks:
@@ -311,16 +359,10 @@ def copy_cfg_files(  # ruff: ignore[complex-structure]
 
     exclude_lint_regex = ""
     exclude_autofix_regex = ""
-    if exclude_lint:
-        exclude_lint_regex = "(%s)|" % "|".join([
-            re.escape(exclude_path.strip()) for exclude_path in exclude_lint if exclude_path and exclude_path.strip()
-        ])
-    if exclude_autofix:
-        exclude_autofix_regex = "(%s)|" % "|".join([
-            re.escape(exclude_path.strip())
-            for exclude_path in exclude_autofix
-            if exclude_path and exclude_path.strip()
-        ])
+    if exclude_lint and exclusions.get_exclude_paths(exclude_lint):
+        exclude_lint_regex = "(%s)|" % exclusions.get_exclude_regex(exclude_lint)
+    if exclude_autofix and exclusions.get_exclude_paths(exclude_autofix):
+        exclude_autofix_regex = "(%s)|" % exclusions.get_exclude_regex(exclude_autofix)
     _logger.info("Copying configuration files 'cp -rnT %s/ %s/", precommit_config_dir, cfg_dir)
     if no_overwrite:
         # Use the custom files defined in the repo
@@ -328,9 +370,7 @@ def copy_cfg_files(  # ruff: ignore[complex-structure]
         return
     matrix_compatibility = parse_matrix_compatibility(compatibility_version)
     use_ruff = (matrix_compatibility.get("black_autoflake_matrix_value") or 0) >= 30
-    ruff_disable_checks = extend_ruff_checks_from_pylint(
-        precommit_config_dir, pylint_disable_checks, ruff_disable_checks, use_ruff
-    )
+    ruff_disable_checks = extend_ruff_checks_from_pylint(pylint_disable_checks, ruff_disable_checks, use_ruff)
     odoo_version_number = parse_odoo_version_number(odoo_version)
     py_target_version = get_py_target_version(odoo_version_number)
     # python version for the .pylintrc* "py-version" option (e.g. "py310" -> "3.10")
@@ -351,26 +391,43 @@ def copy_cfg_files(  # ruff: ignore[complex-structure]
         "use_ruff": use_ruff,
     }
 
-    copier.run_copy(
-        src_path=precommit_config_dir,
-        dst_path=cfg_dir,
-        data=data,
-        unsafe=True,
-        defaults=True,
-        overwrite=not no_overwrite,
-        quiet=True,
-    )
-
-    # .editorconfig must live at the repo root because prettier (and most
-    # editors) always search for it there with no CLI flag to override the
-    # path.  Move it out of the hidden subfolder after copier places it.
-    if pathlib.Path(editorconfig_src := os.path.join(cfg_dir, ".editorconfig")).is_file():
-        shutil.move(editorconfig_src, os.path.join(repo_dirname, ".editorconfig"))
+    # The files are rendered again only if the inputs changed or the files rendered were modified
+    fingerprint_path = pathlib.Path(cfg_dir, CFG_CACHE_SUBFOLDER, CFG_FINGERPRINT_FILENAME)
+    fingerprint = get_cfg_fingerprint(precommit_config_dir, data)
+    try:
+        last_fingerprint = json.loads(fingerprint_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        last_fingerprint = {}
+    if last_fingerprint.get("key") == fingerprint and last_fingerprint.get("files") == get_cfg_files_stamps(
+        repo_dirname
+    ):
+        _logger.info("The configuration files are up to date. Skipping the rendering")
+    else:
+        from . import renderer  # ruff: ignore[import-outside-top-level]
+        from .results_cache import make_cache_dir  # ruff: ignore[import-outside-top-level]
+
+        make_cache_dir(fingerprint_path.parent)
+        root_cfg_files = {root_cfg_file: os.path.join(repo_dirname, root_cfg_file) for root_cfg_file in ROOT_CFG_FILES}
+        # Other repositories with the same inputs (e.g. same VERSION and LINT_COMPATIBILITY_VERSION)
+        # already rendered the same files so they are copied from the per-user cache
+        shared_dir = os.path.join(get_user_cache_dir(), SHARED_CFG_SUBFOLDER, fingerprint)
+        if os.path.isdir(shared_dir):
+            _logger.info("Using the configuration files rendered for the same inputs from %s", shared_dir)
+            os.utime(shared_dir)
+            cfg_files = renderer.sync_files(shared_dir, cfg_dir, dst_overrides=root_cfg_files)
+        else:
+            cfg_files = render_cfg_files(precommit_config_dir, cfg_dir, data, root_cfg_files, no_overwrite)
+            store_shared_cfg_files(shared_dir, cfg_files, cfg_dir, root_cfg_files)
+        _logger.info(
+            "Rendered %d configuration file(s): %d rewritten since their content changed",
+            len(cfg_files),
+            sum(cfg_files.values()),
+        )
 
-    # .isort.cfg must live at the repo root because the parameter config
-    # change the order of third-party packages
-    if pathlib.Path(isort_src := os.path.join(cfg_dir, ".isort.cfg")).is_file():
-        shutil.move(isort_src, os.path.join(repo_dirname, ".isort.cfg"))
+        fingerprint_path.write_text(
+            json.dumps({"key": fingerprint, "files": get_cfg_files_stamps(repo_dirname)}, indent=4, sort_keys=True),
+            encoding="utf-8",
+        )
 
     if exclude_autofix:
         _logger.info("Applying EXCLUDE_AUTOFIX=%s", exclude_autofix)
@@ -393,6 +450,137 @@ def copy_cfg_files(  # ruff: ignore[complex-structure]
         _logger.info("Enabling checks for Odoo Apps")
 
 
+def get_pre_commit_cfgs(cfg_dir):
+    """Paths to the pre-commit configuration files inside the hidden folder by precommit_hooks_type"""
+    return {
+        "mandatory": os.path.join(cfg_dir, ".pre-commit-config.yaml"),
+        "optional": os.path.join(cfg_dir, ".pre-commit-config-optional.yaml"),
+        "fix": os.path.join(cfg_dir, ".pre-commit-config-autofix.yaml"),
+    }
+
+
+def get_cfg_paths(repo_dirname):
+    """Paths of the configuration files rendered by copy_cfg_files"""
+    cfg_dir = pathlib.Path(repo_dirname) / CFG_SUBFOLDER
+    cfg_paths = [str(cfg_path) for cfg_path in cfg_dir.iterdir() if cfg_path.is_file()] if cfg_dir.is_dir() else []
+    return cfg_paths + [os.path.join(repo_dirname, root_cfg_file) for root_cfg_file in ROOT_CFG_FILES]
+
+
+def render_cfg_files(precommit_config_dir, cfg_dir, data, root_cfg_files, no_overwrite):
+    """Render the templates into cfg_dir (and root_cfg_files) returning a dict {path: rewritten}"""
+    from . import renderer  # ruff: ignore[import-outside-top-level]
+
+    if renderer.can_render(precommit_config_dir):
+        with tracing.span("renderer.render_templates"):
+            return renderer.render_templates(
+                precommit_config_dir,
+                cfg_dir,
+                data,
+                cache_dir=os.path.join(cfg_dir, CFG_CACHE_SUBFOLDER),
+                dst_overrides=root_cfg_files,
+            )
+    # copier is imported only if it is needed since that importing it is slow
+    import copier  # ruff: ignore[import-outside-top-level]
+
+    with tracing.span("copier.run_copy"), tempfile.TemporaryDirectory() as staging_dir:
+        copier.run_copy(
+            src_path=precommit_config_dir,
+            dst_path=staging_dir,
+            data=data,
+            unsafe=True,
+            defaults=True,
+            overwrite=not no_overwrite,
+            quiet=True,
+        )
+        return renderer.sync_files(staging_dir, cfg_dir, dst_overrides=root_cfg_files)
+
+
+def get_user_cache_dir():
+    """Per-user directory shared by all the repositories (e.g. ~/.cache/pre-commit-vauxoo)"""
+    if os.environ.get("PRECOMMIT_VAUXOO_CACHE_DIR"):
+        return os.environ["PRECOMMIT_VAUXOO_CACHE_DIR"]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "pre-commit-vauxoo")
+
+
+def store_shared_cfg_files(shared_dir, cfg_files, cfg_dir, root_cfg_files):
+    """Copy the configuration files rendered to the per-user cache to be used by the other repositories
+
+    The files are copied (not hardlinked) so editing them in a repository does not change the cache
+    The set is created in a temporary folder renamed at the end so it is never used half-written
+    """
+    shared_root = pathlib.Path(shared_dir).parent
+    root_cfg_names = {path: name for name, path in root_cfg_files.items()}
+    try:
+        shared_root.mkdir(exist_ok=True, parents=True)
+        tmp_dir = tempfile.mkdtemp(dir=shared_root, prefix=".tmp-")
+    except OSError as os_error:
+        _logger.info("Unable to store the configuration files in the per-user cache: %s", os_error)
+        return
+    try:
+        for cfg_file in cfg_files:
+            shared_file = pathlib.Path(tmp_dir, root_cfg_names.get(cfg_file) or os.path.relpath(cfg_file, cfg_dir))
+            shared_file.parent.mkdir(exist_ok=True, parents=True)
+            shutil.copy2(cfg_file, shared_file)
+        # It fails if another repository stored the same set meanwhile
+        os.rename(tmp_dir, shared_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    # Only the sets used recently are kept
+    shared_sets = sorted(
+        (entry for entry in os.scandir(shared_root) if entry.is_dir() and not entry.name.startswith(".")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for shared_set in shared_sets[SHARED_CFG_SETS_MAX:]:
+        shutil.rmtree(shared_set.path, ignore_errors=True)
+
+
+def get_templates_digest(precommit_config_dir):
+    """Hash of the templates of precommit_config_dir
+
+    It is computed again only if the mtime or size of a template changed since the last call
+    so a process running several commands (e.g. the daemon of "--serve") does not read them again
+    """
+    from .results_cache import get_files_stamp  # ruff: ignore[import-outside-top-level]
+
+    template_paths = sorted(path for path in pathlib.Path(precommit_config_dir).rglob("*") if path.is_file())
+    stamp = (tuple(template_paths), get_files_stamp(template_paths))
+    last_stamp, digest = TEMPLATES_DIGESTS.get(str(precommit_config_dir), (None, None))
+    if last_stamp == stamp:
+        return digest
+    templates_digest = hashlib.sha256()
+    for template_path in template_paths:
+        templates_digest.update(template_path.relative_to(precommit_config_dir).as_posix().encode() + b"\0")
+        templates_digest.update(template_path.read_bytes() + b"\0")
+    TEMPLATES_DIGESTS[str(precommit_config_dir)] = (stamp, templates_digest.hexdigest())
+    return templates_digest.hexdigest()
+
+
+def get_cfg_fingerprint(precommit_config_dir, data):
+    """Hash of the inputs of the configuration files: the data, the templates and the package version"""
+    fingerprint = hashlib.sha256(__version__.encode() + b"\0")
+    fingerprint.update(json.dumps(data, sort_keys=True, default=str).encode() + b"\0")
+    fingerprint.update(get_templates_digest(precommit_config_dir).encode())
+    return fingerprint.hexdigest()
+
+
+def get_cfg_files_stamps(repo_dirname):
+    """mtime and size of the configuration files rendered to detect if they were modified or removed"""
+    stamps = {}
+    for cfg_path in get_cfg_paths(repo_dirname):
+        try:
+            cfg_stat = os.stat(cfg_path)
+        except FileNotFoundError:
+            continue
+        stamps[pathlib.Path(os.path.relpath(cfg_path, repo_dirname)).as_posix()] = [
+            cfg_stat.st_mtime_ns,
+            cfg_stat.st_size,
+        ]
+    return stamps
+
+
 def envfile2envdict(repo_dirname, source_file="variables.sh", no_overwrite_environ=True):
     """Simulate load the Vauxoo standard file 'source variables.sh' command in python
     return dictionary {environment_variable: value}
@@ -415,10 +603,233 @@ def envfile2envdict(repo_dirname, source_file="variables.sh", no_overwrite_envir
     return envdict
 
 
-def subprocess_call(command, *args, **kwargs):
+def kill_process_group(process, signum=signal.SIGTERM):
+    """Send the signal to the process started with start_new_session=True and to its children
+    (e.g. the hooks run by pre-commit) since that they are in its process group
+    """
+    if not hasattr(os, "killpg"):
+        # There are no process groups (windows)
+        process.send_signal(signum)
+    elif process.poll() is None:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signum)
+
+
+def subprocess_call(command, *args, popen_callback=None, **kwargs):
+    """Same than subprocess.call but popen_callback(process) is called with the process started
+    (e.g. to kill it from other thread)
+    """
     cmd_str = " ".join(command)
     _logger.debug("Running command: %s", cmd_str)
-    return subprocess.call(command, *args, **kwargs)
+    span_name = "pre-commit run" if is_pre_commit_run(command) else " ".join(command[:2])
+    if "-c" in command[:-1]:
+        span_name += " " + os.path.basename(command[command.index("-c") + 1])
+    with tracing.span(span_name, cat="subprocess", args={"command": cmd_str[:1000]}):
+        if tracing.TRACER.enabled and is_pre_commit_run(command) and not args:
+            return tracing.call_with_hook_spans(
+                command,
+                stdout=kwargs.get("stdout"),
+                popen_callback=popen_callback,
+                start_new_session=kwargs.get("start_new_session", False),
+            )
+        with subprocess.Popen(command, *args, **kwargs) as process:
+            if popen_callback:
+                popen_callback(process)
+            try:
+                return process.wait()
+            except BaseException:
+                # Same than subprocess.call e.g. Ctrl+C
+                if kwargs.get("start_new_session"):
+                    # The terminal does not send Ctrl+C to the children of other sessions
+                    kill_process_group(process)
+                process.kill()
+                raise
+
+
+def subprocess_call_buffered(command, popen_callback=None):
+    """Run the command buffering its stdout and stderr instead of printing them
+
+    It is used to run commands at the same time without mixing their output
+    The command runs in a new session so kill_process_group stops its children too
+    Return a tuple (exit_status, output_bytes, seconds)
+    """
+    start_time = time.monotonic()
+    with tempfile.TemporaryFile() as f_output:
+        status = subprocess_call(
+            command,
+            stdout=f_output,
+            stderr=subprocess.STDOUT,
+            popen_callback=popen_callback,
+            start_new_session=True,
+        )
+        f_output.seek(0)
+        return status, f_output.read(), time.monotonic() - start_time
+
+
+class FilesLists:
+    """NUL-separated files with the lists of files to check
+
+    Each list is written only once even if several stages use it
+    """
+
+    def __init__(self):
+        self.paths = {}
+
+    def get_path(self, files):
+        key = tuple(files)
+        if key not in self.paths:
+            with tempfile.NamedTemporaryFile("wb", prefix="pre-commit-vauxoo-files-", delete=False) as f_files:
+                f_files.write(b"".join(os.fsencode(fname) + b"\0" for fname in files))
+            self.paths[key] = f_files.name
+        return self.paths[key]
+
+    def cleanup(self):
+        for path in self.paths.values():
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+        self.paths = {}
+
+
+def get_stage_command(cmd, files, pre_commit_cfg, files_lists=None):
+    """pre-commit command to run the hooks of the configuration file on the files
+
+    files=None runs them on all the files of the repository
+    Return None if there are no files to check (e.g. all of them are cached as passed)
+    If there are a lot of files and files_lists is defined, they are sent to pre-commit
+    using a file (see pre_commit_files.py) instead of the command line
+    """
+    if files is None:
+        return cmd + ["--all", "-c", pre_commit_cfg]
+    if not files:
+        return None
+    if files_lists is not None and sum(len(fname) + 1 for fname in files) > FILES_ARGV_MAX_LENGTH:
+        files_list_path = files_lists.get_path(files)
+        return [sys.executable, "-m", PRE_COMMIT_FILES_MODULE, files_list_path] + cmd[1:] + ["-c", pre_commit_cfg]
+    return cmd + ["--files", *files, "-c", pre_commit_cfg]
+
+
+def is_pre_commit_run(command):
+    return command[:2] == ["pre-commit", "run"] or command[1:3] == ["-m", PRE_COMMIT_FILES_MODULE]
+
+
+def run_stage(command, stage_future=None):
+    """Run the pre-commit command of a stage returning a tuple (exit_status, seconds)
+
+    If the stage was already started in parallel (stage_future) then wait for it
+    and print its buffered output, so the output keeps the same order as running it directly
+    """
+    if command is None:
+        _logger.info("All the files already passed these checks (results cache). Nothing to run.")
+        return 0, 0.0
+    if stage_future is None:
+        start_time = time.monotonic()
+        status = subprocess_call(command)
+        return status, time.monotonic() - start_time
+    status, output, seconds = stage_future.result()
+    sys.stdout.flush()
+    stdout_buffer = getattr(sys.stdout, "buffer", None)
+    if stdout_buffer is not None:
+        stdout_buffer.write(output)
+        stdout_buffer.flush()
+    else:
+        sys.stdout.write(output.decode(sys.stdout.encoding or "utf-8", errors="replace"))
+        sys.stdout.flush()
+    return status, seconds
+
+
+def get_pre_commit_home():
+    """Directory used by pre-commit to store the repositories and environments of the hooks"""
+    if os.environ.get("PRE_COMMIT_HOME"):
+        return os.environ["PRE_COMMIT_HOME"]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "pre-commit")
+
+
+def get_install_hooks_fingerprint(pre_commit_cfg):
+    """Hash of everything "pre-commit install-hooks" installs for the configuration file
+
+    It only considers the repos, revs, languages and additional_dependencies of the hooks
+    (and where they are stored) so changing e.g. the args of a hook does not install them again
+    Return None if the configuration file can not be read so the hooks are always installed
+    The fingerprint is reused while the configuration file is not modified (e.g. in the daemon of "--serve")
+    """
+    from .results_cache import get_files_stamp  # ruff: ignore[import-outside-top-level]
+
+    pre_commit_home = get_pre_commit_home()
+    key = (str(pre_commit_cfg), pre_commit_home)
+    stamp = get_files_stamp([pre_commit_cfg])
+    last_stamp, fingerprint = INSTALL_HOOKS_FINGERPRINTS.get(key, (None, None))
+    if stamp[0] and last_stamp == stamp:
+        return fingerprint
+    # yaml is imported only if it is needed since that importing it is slow
+    import yaml  # ruff: ignore[import-outside-top-level]
+
+    try:
+        with pathlib.Path(pre_commit_cfg).open(encoding="utf-8") as f_pre_commit_cfg:
+            config = yaml.safe_load(f_pre_commit_cfg)
+    except (OSError, yaml.YAMLError):
+        return None
+    hooks_envs = {
+        "pre_commit_home": pre_commit_home,
+        "default_language_version": config.get("default_language_version"),
+        "repos": [
+            {
+                "repo": repo.get("repo"),
+                "rev": repo.get("rev"),
+                "hooks": [
+                    {
+                        hook_key: hook.get(hook_key)
+                        for hook_key in ("id", "language", "language_version", "additional_dependencies")
+                    }
+                    for hook in repo.get("hooks", [])
+                ],
+            }
+            for repo in config.get("repos", [])
+        ],
+    }
+    fingerprint = hashlib.sha256(json.dumps(hooks_envs, sort_keys=True).encode()).hexdigest()
+    INSTALL_HOOKS_FINGERPRINTS[key] = (stamp, fingerprint)
+    return fingerprint
+
+
+def install_hooks(pre_commit_cfgs, cache_dir):
+    """Run "pre-commit install-hooks" for the configuration files in parallel
+
+    The fingerprint of the configuration files installed successfully is stored in the
+    cache_dir to skip them in the next runs if nothing to install changed
+    """
+    fingerprints_path = pathlib.Path(cache_dir) / INSTALL_HOOKS_FINGERPRINTS_FILENAME
+    try:
+        fingerprints = json.loads(fingerprints_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        fingerprints = {}
+    pending_fingerprints = {}
+    for pre_commit_cfg in pre_commit_cfgs:
+        fingerprint = get_install_hooks_fingerprint(pre_commit_cfg)
+        cfg_name = pathlib.Path(pre_commit_cfg).name
+        if fingerprint and fingerprint == fingerprints.get(cfg_name) and os.path.isdir(get_pre_commit_home()):
+            _logger.info("The hooks of %s are already installed", cfg_name)
+            continue
+        pending_fingerprints[pre_commit_cfg] = fingerprint
+    if not pending_fingerprints:
+        return
+    cmd = ["pre-commit", "install-hooks", "--color=always"]
+    install_futures = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(pending_fingerprints)) as executor:
+        if len(pending_fingerprints) > 1:
+            install_futures = {
+                pre_commit_cfg: executor.submit(subprocess_call_buffered, cmd + ["-c", pre_commit_cfg])
+                for pre_commit_cfg in pending_fingerprints
+            }
+        installed_fingerprints = {}
+        for pre_commit_cfg, fingerprint in pending_fingerprints.items():
+            install_status, _seconds = run_stage(cmd + ["-c", pre_commit_cfg], install_futures.get(pre_commit_cfg))
+            if not install_status and fingerprint:
+                installed_fingerprints[pathlib.Path(pre_commit_cfg).name] = fingerprint
+    if installed_fingerprints:
+        fingerprints.update(installed_fingerprints)
+        fingerprints_path.parent.mkdir(exist_ok=True, parents=True)
+        fingerprints_path.write_text(json.dumps(fingerprints, indent=4, sort_keys=True), encoding="utf-8")
 
 
 def install_git_hook(src_path, dest_path, replacements):
@@ -436,141 +847,215 @@ def resolve_console_script(script_name):
     return shutil.which(script_name) or script_name
 
 
-# There are a lot of if validations in this method. It is expected for now.
-def main(  # ruff: ignore[complex-structure]
-    paths,
-    scope,
-    no_overwrite,
-    exclude_autofix,
-    exclude_lint,
-    pylint_disable_checks,
-    oca_hooks_disable_checks,
-    ruff_disable_checks,
-    precommit_hooks_type,
-    fail_optional,
-    install,
-    skip_string_normalization,
-    odoo_version,
-    is_project_for_apps,
-    only_cp_cfg,
-    compatibility_version,
-    do_exit=True,
-):
-    show_version()
-    repo_dirname = get_repo()
-    cwd = git_cwd()
+def cancel_stage(test_name, all_status):
+    """Show the stage as cancelled by fail_fast in the summary without affecting the exit status"""
+    _logger.warning("%s cancelled since a previous stage failed (fail-fast)", test_name)
+    all_status[test_name] = {"status": 0, "level": logging.WARNING, "status_msg": "Cancelled"}
 
-    root_dir = full_norm_path(str(pathlib.Path(__file__).parent))
 
-    if install:
-        git_hook_pre_commit_src = os.path.join(root_dir, "git_hook_pre_commit")
-        git_hook_pre_commit_dest = os.path.join(repo_dirname, ".git", "hooks", "pre-commit")
-        pre_commit_vauxoo_bin = resolve_console_script("pre-commit-vauxoo")
-        _logger.info("pre-commit installed at %s", git_hook_pre_commit_dest)
-        install_git_hook(
-            git_hook_pre_commit_src,
-            git_hook_pre_commit_dest,
-            {"__PRE_COMMIT_VAUXOO_BIN__": pre_commit_vauxoo_bin},
-        )
-        if do_exit:
-            sys.exit(0)
-        return
+def skip_stage(test_name, all_status):
+    """Show the stage as skipped since that none of its hooks match the files to check"""
+    _logger.info("%s skipped since that none of their hooks match the files to check", test_name)
+    all_status[test_name] = {"status": 0, "level": logging.INFO, "status_msg": "Skipped"}
 
-    precommit_config_dir = os.path.join(root_dir, "cfg")
-    uninstallable_modules = get_uninstallable_modules(repo_dirname)
-    exclude_lint += tuple(uninstallable_modules)
 
-    copy_cfg_files(
-        precommit_config_dir,
+def get_idle_stages(files, precommit_hooks_type, pre_commit_cfgs, repo_dirname):
+    """Stages of precommit_hooks_type whose hooks match none of the files (see hooks_routing)
+
+    files=None (all the files of the repository) runs all the stages
+    """
+    from . import hooks_routing  # ruff: ignore[import-outside-top-level]
+
+    if files is None or not repo_dirname:
+        return set()
+    relpaths = [pathlib.Path(os.path.relpath(os.path.abspath(fname), repo_dirname)).as_posix() for fname in files]
+    stages_routing = hooks_routing.get_routing(
         repo_dirname,
-        no_overwrite,
-        exclude_lint,
-        pylint_disable_checks,
-        oca_hooks_disable_checks,
-        ruff_disable_checks,
-        exclude_autofix,
-        skip_string_normalization,
-        odoo_version,
-        is_project_for_apps,
-        compatibility_version,
+        relpaths,
+        {stage: pre_commit_cfg for stage, pre_commit_cfg in pre_commit_cfgs.items() if stage in precommit_hooks_type},
+        get_pre_commit_home(),
     )
-    if only_cp_cfg:
-        _logger.info("Only copied configuration files. Exiting now.")
-        return
-    _logger.info("Installing pre-commit hooks")
-    cmd = ["pre-commit", "install-hooks", "--color=always"]
-    # Paths to the pre‑commit configuration files inside the hidden folder
-    cfg_dir = os.path.join(repo_dirname, CFG_SUBFOLDER)
-    pre_commit_cfg_mandatory = os.path.join(cfg_dir, ".pre-commit-config.yaml")
-    pre_commit_cfg_optional = os.path.join(cfg_dir, ".pre-commit-config-optional.yaml")
-    pre_commit_cfg_autofix = os.path.join(cfg_dir, ".pre-commit-config-autofix.yaml")
-    if "mandatory" in precommit_hooks_type:
-        subprocess_call(cmd + ["-c", pre_commit_cfg_mandatory])
-    if "optional" in precommit_hooks_type:
-        subprocess_call(cmd + ["-c", pre_commit_cfg_optional])
-    if "fix" in precommit_hooks_type:
-        subprocess_call(cmd + ["-c", pre_commit_cfg_autofix])
-
-    status = 0
-    cmd = ["pre-commit", "run", "--color=always"]
-    custom_paths = bool(paths) and paths != (".",)
-    if custom_paths and scope != SCOPE_ALL:
-        _logger.warning(
-            "Conflicting parameters: '--%s' is ignored since that '-p/--paths' has precedence over it",
-            scope,
-        )
-        scope = SCOPE_ALL
-    if scope != SCOPE_ALL:
-        # The scope has precedence over the current directory so it always checks the
-        # files of the whole repository even if the command is invoked from a subdirectory
-        if cwd != ".":
-            _logger.warning(
-                "Running '--%s' for the whole repository even if the current directory is '%s'",
-                scope,
-                pathlib.Path(cwd).name,
+    for stage, routing in sorted(stages_routing.items()):
+        if routing:
+            _logger.debug(
+                "Files of the hooks of the %s checks: %s",
+                stage,
+                {hook_id: len(hook_files) for hook_id, hook_files in routing.items()},
             )
-        scope_files = get_scope_files(scope, repo_dirname)
-        if not scope_files:
-            _logger.warning("There are no files to check for '--%s'. Nothing to do.", scope)
-            if do_exit:
-                sys.exit(0)
-            return
-        _logger.info("Running only for the %d file(s) of '--%s'", len(scope_files), scope)
-        # The absolute path is required to be independent of the current directory and
-        # it is normalized since that git always reports the files separated by "/"
-        cmd.extend([
-            "--files",
-            *(os.path.normpath(os.path.join(repo_dirname, scope_file)) for scope_file in scope_files),
-        ])
-    elif cwd != ".":
-        if paths:
+    return {stage for stage, routing in stages_routing.items() if routing is not None and not any(routing.values())}
+
+
+def get_files_snapshot(files, repo_dirname):
+    """{fname: git blob SHA of its current content} of the files
+
+    files=None takes all the files of the repository
+    """
+    from .results_cache import get_files_blob_shas, git_z_output  # ruff: ignore[import-outside-top-level]
+
+    if files is None:
+        files = [os.path.join(repo_dirname, relpath) for relpath in git_z_output(["ls-files", "-z"], repo_dirname)]
+    relpaths = {
+        fname: pathlib.Path(os.path.relpath(os.path.abspath(fname), repo_dirname)).as_posix() for fname in files
+    }
+    shas = get_files_blob_shas(repo_dirname, sorted(set(relpaths.values())))
+    return {fname: shas.get(relpath) for fname, relpath in relpaths.items()}
+
+
+def run_autofix_until_stable(cmd, files, pre_commit_cfg_autofix, repo_dirname, files_lists=None):
+    """Run the autofix checks again only for the files changed by the previous run until they do not change
+
+    The output of a fixer could be reformatted by another one (e.g. prettier after oca-checks "--fix")
+    so the files are stable after a run without changes. It runs FIX_UNTIL_STABLE_MAX_RUNS times at most
+    Return a tuple (exit_status, seconds, reformatted) where exit_status is the one of the last run or 1 if
+    a run failed with files not changed since that the next runs do not check them again
+    """
+    snapshot = get_files_snapshot(files, repo_dirname)
+    run_files = list(snapshot)
+    status, seconds = run_stage(get_stage_command(cmd, files, pre_commit_cfg_autofix, files_lists))
+    reformatted = False
+    failed_unchanged = False
+    runs = 1
+    # pre-commit exits without error only if the hooks passed without changing files
+    while status:
+        new_snapshot = get_files_snapshot(list(snapshot), repo_dirname)
+        changed = sorted(fname for fname, sha in new_snapshot.items() if sha != snapshot[fname])
+        if not changed:
+            # A hook failed without changing files so running it again gets the same result
+            break
+        reformatted = True
+        # The exit status does not tell a hook changing files from one failing, so a file not changed
+        # could have failed too (e.g. a fixer changed a file and a checker failed for other one)
+        failed_unchanged = failed_unchanged or bool(set(run_files) - set(changed))
+        if runs >= FIX_UNTIL_STABLE_MAX_RUNS:
             _logger.warning(
-                "Ignored path configured '%s'. Use 'cd %s' and run the same command again to use configured path",
-                ",".join(paths),
-                repo_dirname,
+                "The autofix checks are still changing %d file(s) after %d runs: %s",
+                len(changed),
+                runs,
+                ", ".join(os.path.relpath(fname, repo_dirname) for fname in changed),
             )
-        _logger.warning("Running in current directory '%s'", pathlib.Path(cwd).name)
-        files = get_files(os.path.join(repo_dirname, cwd))
-        if not files:
-            raise UserWarning("Not files detected in current path %s" % cwd)
-        cmd.extend(["--files"] + files)
-    elif custom_paths:
-        _logger.info("Running only for INCLUDE_LINT=%s", paths)
-        included_files = []
-        for included_path in paths:
-            included_files += get_files(included_path) or (included_path,)
-        cmd.extend(["--files"] + included_files)
-    else:
-        cmd.append("--all")
+            break
+        snapshot = new_snapshot
+        run_files = changed
+        runs += 1
+        _logger.info("Running the autofix checks again for the %d file(s) changed (run #%d)", len(changed), runs)
+        status, run_seconds = run_stage(get_stage_command(cmd, changed, pre_commit_cfg_autofix, files_lists))
+        seconds += run_seconds
+    return status or int(failed_unchanged), seconds, reformatted
+
+
+def get_single_passes(use_ruff_single_pass, use_pylint_single_pass):
+    """The hooks enabled to run once for the mandatory and optional stages {single_pass: (name, hook_id)}
+
+    Their modules are imported only if they are enabled
+    """
+    single_passes = {}
+    if use_ruff_single_pass:
+        from . import ruff_single_pass  # ruff: ignore[import-outside-top-level]
+
+        single_passes[ruff_single_pass] = ("ruff-odoo", ruff_single_pass.RUFF_HOOK_ID)
+    if use_pylint_single_pass:
+        from . import pylint_single_pass  # ruff: ignore[import-outside-top-level]
+
+        single_passes[pylint_single_pass] = ("pylint-odoo", pylint_single_pass.PYLINT_HOOK_ID)
+    return single_passes
+
+
+def run_single_pass(single_pass, name, stage_files, pre_commit_cfgs, repo_dirname, cache_dir):
+    """Run the hooks of the stages once (see ruff_single_pass and pylint_single_pass) for their files {stage: files}
+
+    Return the results for single_pass.report or None if the hooks need to run as usual
+    """
+    files = set()
+    for stage_files_to_check in stage_files.values():
+        if stage_files_to_check is None:
+            files = None
+            break
+        files.update(stage_files_to_check)
+    start_time = time.monotonic()
+    try:
+        results = single_pass.run_single_pass(
+            repo_dirname,
+            None if files is None else sorted(files),
+            {stage: pre_commit_cfgs[stage] for stage in stage_files},
+            get_pre_commit_home(),
+            cache_dir,
+        )
+    except single_pass.SinglePassError as error:
+        _logger.warning("Unable to run %s once: %s. Running its hooks as usual", name, error)
+        return None
+    _logger.info("%s single pass finished in %.2fs", name, time.monotonic() - start_time)
+    return results
+
+
+def get_single_passes_status(single_passes_results, stage):
+    """Show the results of the single passes for the stage returning its status"""
+    statuses = [single_pass.report(results, stage) for single_pass, results in single_passes_results.items()]
+    return max(statuses, default=0)
+
+
+# There are a lot of if validations in this method. It is expected for now.
+def run_stages(  # ruff: ignore[complex-structure]
+    files,
+    precommit_hooks_type,
+    cfg_dir,
+    fail_optional,
+    parallel_stages=False,
+    results_cache=None,
+    odoo_version=None,
+    repo_dirname=None,
+    fail_fast=False,
+    use_ruff_single_pass=False,
+    use_pylint_single_pass=False,
+    fix_until_stable=False,
+):
+    """Run the pre-commit configuration files of the precommit_hooks_type on the files
+
+    files=None runs them on all the files of the repository
+    fail_fast cancels the stages not finished yet after a stage affecting the exit status failed
+    use_ruff_single_pass and use_pylint_single_pass run the ruff-odoo and pylint-odoo hooks of the
+    mandatory and optional stages only once
+    fix_until_stable runs the autofix checks again for the files they changed until they are stable
+    so the mandatory and optional stages check the content already fixed
+    Return a tuple (exit_status, all_status) where all_status is the result of each stage
+    used by print_summary
+    """
+    status = 0
+    cmd = ["pre-commit", "run", "--color=always"]
+    pre_commit_cfgs = get_pre_commit_cfgs(cfg_dir)
+    pre_commit_cfg_mandatory = pre_commit_cfgs["mandatory"]
+    pre_commit_cfg_optional = pre_commit_cfgs["optional"]
+    pre_commit_cfg_autofix = pre_commit_cfgs["fix"]
+    files_lists = FilesLists()
     all_status = {}
+    autofix_stable = False
+    # The stages without files for any of their hooks are not started at all
+    idle_stages = get_idle_stages(files, precommit_hooks_type, pre_commit_cfgs, repo_dirname)
 
-    if "fix" in precommit_hooks_type:
+    if "fix" in precommit_hooks_type and "fix" in idle_stages:
+        skip_stage("Autofix checks", all_status)
+    elif "fix" in precommit_hooks_type:
         _logger.info("%s AUTOFIX CHECKS %s", "-" * 25, "-" * 25)
         _logger.info("Running autofix checks (affect status build but you can autofix them locally)")
-        autofix_status = subprocess_call(cmd + ["-c", pre_commit_cfg_autofix])
+        autofix_files = results_cache.pending_files("fix", files) if results_cache else files
+        if fix_until_stable and repo_dirname and (autofix_files is None or autofix_files):
+            autofix_status, seconds, reformatted = run_autofix_until_stable(
+                cmd, autofix_files, pre_commit_cfg_autofix, repo_dirname, files_lists
+            )
+            # The files are stable so the stages are not cancelled by fail_fast
+            autofix_stable = reformatted and not autofix_status
+            autofix_status = autofix_status or int(reformatted)
+        else:
+            autofix_status, seconds = run_stage(
+                get_stage_command(cmd, autofix_files, pre_commit_cfg_autofix, files_lists)
+            )
         status += autofix_status
+        if results_cache and autofix_status:
+            # The content of the reformatted files changed so their SHA changed too
+            results_cache.update_files_shas(files)
+        elif results_cache:
+            results_cache.record_passed("fix", autofix_files)
         test_name = "Autofix checks"
-        all_status[test_name] = {"status": autofix_status}
+        all_status[test_name] = {"status": autofix_status, "seconds": seconds}
         if autofix_status:
             _logger.error("%s reformatted", test_name)
             is_ci = get_is_ci()
@@ -625,29 +1110,116 @@ def main(  # ruff: ignore[complex-structure]
             all_status[test_name]["status_msg"] = "Passed"
         _logger.info("-" * 66)
 
-    if "mandatory" in precommit_hooks_type:
+    # The stages that will not run because of fail_fast
+    cancelled_stages = set()
+    if fail_fast and status and not autofix_stable:
+        cancelled_stages = {"mandatory", "optional"}
+
+    # The mandatory and optional checks do not write files so they can run at the same time
+    # after the autofix checks finished. Their output is printed in the usual order
+    stage_files = {}
+    stage_commands = {}
+    for stage, pre_commit_cfg in (("mandatory", pre_commit_cfg_mandatory), ("optional", pre_commit_cfg_optional)):
+        if stage not in precommit_hooks_type or stage in cancelled_stages or stage in idle_stages:
+            continue
+        stage_files[stage] = results_cache.pending_files(stage, files) if results_cache else files
+        stage_commands[stage] = get_stage_command(cmd, stage_files[stage], pre_commit_cfg, files_lists)
+    # The results of the hooks already run once for all the stages {single_pass: results}
+    single_passes_results = {}
+    skip_environ = os.environ.get("SKIP")
+    single_pass_stage_files = {stage: stage_files[stage] for stage, command in stage_commands.items() if command}
+    single_passes = {}
+    if repo_dirname and single_pass_stage_files:
+        single_passes = get_single_passes(use_ruff_single_pass, use_pylint_single_pass)
+    for single_pass, (name, _hook_id) in single_passes.items():
+        results = run_single_pass(
+            single_pass,
+            name,
+            single_pass_stage_files,
+            pre_commit_cfgs,
+            repo_dirname,
+            os.path.join(cfg_dir, CFG_CACHE_SUBFOLDER),
+        )
+        if results is not None:
+            single_passes_results[single_pass] = results
+    if single_passes_results:
+        # pre-commit does not run again the hooks already run by the single passes
+        os.environ["SKIP"] = ",".join(
+            filter(None, [skip_environ] + [single_passes[single_pass][1] for single_pass in single_passes_results])
+        )
+    stage_futures = {}
+    stages_executor = None
+    if parallel_stages and len([stage_command for stage_command in stage_commands.values() if stage_command]) > 1:
+        _logger.info("Running %s checks in parallel", " and ".join(stage_commands))
+        stages_executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(stage_commands))
+        stage_processes = {}
+        cancel_event = threading.Event()
+
+        def register_stage_process(stage, process):
+            stage_processes[stage] = process
+            if cancel_event.is_set() and stage in cancelled_stages:
+                # Cancelled before it started
+                kill_process_group(process)
+
+        stage_futures = {
+            stage: stages_executor.submit(
+                subprocess_call_buffered, stage_command, functools.partial(register_stage_process, stage)
+            )
+            for stage, stage_command in stage_commands.items()
+            if stage_command
+        }
+        if fail_fast:
+            for stage_future in concurrent.futures.as_completed(stage_futures.values()):
+                stage = next(stage for stage, future in stage_futures.items() if future is stage_future)
+                if stage_future.result()[0] and (stage == "mandatory" or fail_optional):
+                    cancelled_stages = {stage for stage, future in stage_futures.items() if not future.done()}
+                    cancel_event.set()
+                    for cancelled_stage in cancelled_stages:
+                        stage_futures[cancelled_stage].cancel()
+                        if cancelled_stage in stage_processes:
+                            kill_process_group(stage_processes[cancelled_stage])
+                    break
+
+    if "mandatory" in precommit_hooks_type and "mandatory" in cancelled_stages:
+        cancel_stage("Mandatory checks", all_status)
+    elif "mandatory" in precommit_hooks_type and "mandatory" in idle_stages:
+        skip_stage("Mandatory checks", all_status)
+    elif "mandatory" in precommit_hooks_type:
         _logger.info("%s MANDATORY CHECKS %s", "*" * 25, "*" * 25)
         _logger.info("Running mandatory checks (affect status build)")
-        mandatory_status = subprocess_call(cmd + ["-c", pre_commit_cfg_mandatory])
+        mandatory_status, seconds = run_stage(stage_commands["mandatory"], stage_futures.get("mandatory"))
+        mandatory_status = mandatory_status or get_single_passes_status(single_passes_results, "mandatory")
         status += mandatory_status
+        if results_cache and not mandatory_status:
+            results_cache.record_passed("mandatory", stage_files["mandatory"])
         test_name = "Mandatory checks"
-        all_status[test_name] = {"status": mandatory_status}
+        all_status[test_name] = {"status": mandatory_status, "seconds": seconds}
         if mandatory_status:
             _logger.error("%s failed", test_name)
             all_status[test_name]["level"] = logging.ERROR
             all_status[test_name]["status_msg"] = "Failed"
+            if fail_fast and "optional" not in stage_futures:
+                # The optional checks were not started yet (or they already finished running in parallel)
+                cancelled_stages.add("optional")
         else:
             _logger.info("%s passed!", test_name)
             all_status[test_name]["level"] = logging.INFO
             all_status[test_name]["status_msg"] = "Passed"
 
-    if "optional" in precommit_hooks_type:
+    if "optional" in precommit_hooks_type and "optional" in cancelled_stages:
+        cancel_stage("Optional checks", all_status)
+    elif "optional" in precommit_hooks_type and "optional" in idle_stages:
+        skip_stage("Optional checks", all_status)
+    elif "optional" in precommit_hooks_type:
         _logger.info("*" * 68)
         _logger.info("%s OPTIONAL CHECKS %s", "~" * 25, "~" * 25)
         _logger.info("Running optional checks (does not affect status build)")
-        status_optional = subprocess_call(cmd + ["-c", pre_commit_cfg_optional])
+        status_optional, seconds = run_stage(stage_commands["optional"], stage_futures.get("optional"))
+        status_optional = status_optional or get_single_passes_status(single_passes_results, "optional")
+        if results_cache and not status_optional:
+            results_cache.record_passed("optional", stage_files["optional"])
         test_name = "Optional checks"
-        all_status[test_name] = {"status": status_optional}
+        all_status[test_name] = {"status": status_optional, "seconds": seconds}
         if status_optional and fail_optional:
             _logger.error("Optional checks failed")
             all_status[test_name]["level"] = logging.ERROR
@@ -663,14 +1235,417 @@ def main(  # ruff: ignore[complex-structure]
             all_status[test_name]["status_msg"] = "Passed"
         _logger.info("~" * 67)
 
-    print_summary(all_status)
+    if stages_executor is not None:
+        stages_executor.shutdown()
+    if single_passes_results and skip_environ is None:
+        os.environ.pop("SKIP", None)
+    elif single_passes_results:
+        os.environ["SKIP"] = skip_environ
+    files_lists.cleanup()
+    if results_cache:
+        results_cache.save()
+    return status, all_status
+
+
+def watch_stages(
+    repo_dirname,
+    precommit_hooks_type,
+    cfg_dir,
+    fail_optional,
+    parallel_stages=False,
+    use_results_cache=False,
+    odoo_version=None,
+    fail_fast=False,
+    use_ruff_single_pass=False,
+    use_pylint_single_pass=False,
+    fix_until_stable=False,
+):
+    """Run the stages on the files each time they are saved until Ctrl+C
+
+    The configuration files were already rendered and the hooks installed so only the
+    pre-commit stages run for the files changed that are part of '--diff'
+    """
+    from . import watcher  # ruff: ignore[import-outside-top-level]
+
+    results_cache = None
+    if use_results_cache:
+        from . import odoo_modules  # ruff: ignore[import-outside-top-level]
+        from .results_cache import ResultsCache  # ruff: ignore[import-outside-top-level]
+
+        cache_dir = os.path.join(cfg_dir, CFG_CACHE_SUBFOLDER)
+        modules_index = odoo_modules.get_modules_index(repo_dirname, cache_dir)
+        results_cache = ResultsCache(repo_dirname, cache_dir, get_cfg_paths(repo_dirname), modules_index)
+    file_watcher = watcher.get_watcher(repo_dirname)
+    _logger.info("Waiting for changes in the files of '--%s'. Stop it using Ctrl+C", SCOPE_DIFF)
+    pending_changes = set()
+    try:
+        while True:
+            changes = watcher.wait_changes(file_watcher, changes=pending_changes)
+            # e.g. a file saved without changes compared with HEAD is not checked
+            relpaths = sorted(changes & set(get_scope_files(SCOPE_DIFF, repo_dirname)))
+            pending_changes = set()
+            if not relpaths:
+                continue
+            _logger.info("Running for the %d file(s) changed: %s", len(relpaths), ", ".join(relpaths))
+            files = [os.path.normpath(os.path.join(repo_dirname, relpath)) for relpath in relpaths]
+            if results_cache:
+                results_cache.update_files_shas(files)
+            _status, all_status = run_stages(
+                files,
+                precommit_hooks_type,
+                cfg_dir,
+                fail_optional,
+                parallel_stages=parallel_stages,
+                results_cache=results_cache,
+                odoo_version=odoo_version,
+                repo_dirname=repo_dirname,
+                fail_fast=fail_fast,
+                use_ruff_single_pass=use_ruff_single_pass,
+                use_pylint_single_pass=use_pylint_single_pass,
+                fix_until_stable=fix_until_stable,
+            )
+            print_summary(all_status)
+            if all_status.get("Autofix checks", {}).get("status"):
+                # The files reformatted by the autofix checks should not run the checks again
+                # but the other files saved meanwhile should
+                pending_changes = file_watcher.read_changes(0) - set(relpaths)
+            _logger.info("Waiting for changes in the files of '--%s'. Stop it using Ctrl+C", SCOPE_DIFF)
+    except KeyboardInterrupt:
+        _logger.info("Stopping the watch mode")
+    finally:
+        file_watcher.close()
+
+
+def get_changed_files(
+    scope,
+    repo_dirname,
+    since_ref=None,
+    changed_modules=False,
+    dependents_depth=0,
+    modules_index=None,
+    exclude_modules=(),
+):
+    """Files of the scope (the whole modules changed for changed_modules) as absolute paths
+
+    An empty list means that there is nothing to check
+    """
+    scope_files = get_scope_files(scope, repo_dirname, since_ref=since_ref)
+    if changed_modules and scope_files:
+        from . import odoo_modules  # ruff: ignore[import-outside-top-level]
+
+        scope_files, modules = odoo_modules.expand_to_modules(
+            repo_dirname,
+            scope_files,
+            modules_index,
+            exclude_modules,
+            dependents_depth=dependents_depth,
+        )
+        _logger.info("Running the whole %d module(s) changed: %s", len(modules), ", ".join(modules))
+    if not scope_files:
+        _logger.warning("There are no files to check for '--%s'. Nothing to do.", scope)
+        return []
+    _logger.info("Running only for the %d file(s) of '--%s'", len(scope_files), scope)
+    # The absolute path is required to be independent of the current directory and
+    # it is normalized since that git always reports the files separated by "/"
+    return [os.path.normpath(os.path.join(repo_dirname, scope_file)) for scope_file in scope_files]
+
+
+def get_files_to_check(
+    repo_dirname,
+    cwd,
+    paths,
+    scope,
+    since_ref=None,
+    files_from=None,
+    changed_modules=False,
+    dependents_depth=0,
+    modules_index=None,
+    uninstallable_modules=(),
+):
+    """Files to run the hooks on. None means all the files of the repository ("--all")
+
+    An empty list means that there is nothing to check
+    """
+    if files_from is not None:
+        if not files_from:
+            _logger.warning("There are no files to check for '--files-from'. Nothing to do.")
+            return []
+        _logger.info("Running only for the %d file(s) of '--files-from'", len(files_from))
+        return [os.path.normpath(os.path.abspath(fname)) for fname in files_from]
+    if scope != SCOPE_ALL:
+        # The scope has precedence over the current directory so it always checks the
+        # files of the whole repository even if the command is invoked from a subdirectory
+        if cwd != ".":
+            _logger.warning(
+                "Running '--%s' for the whole repository even if the current directory is '%s'",
+                scope,
+                pathlib.Path(cwd).name,
+            )
+        return get_changed_files(
+            scope, repo_dirname, since_ref, changed_modules, dependents_depth, modules_index, uninstallable_modules
+        )
+    if cwd != ".":
+        if paths:
+            _logger.warning(
+                "Ignored path configured '%s'. Use 'cd %s' and run the same command again to use configured path",
+                ",".join(paths),
+                repo_dirname,
+            )
+        _logger.warning("Running in current directory '%s'", pathlib.Path(cwd).name)
+        files = get_files(os.path.join(repo_dirname, cwd))
+        if not files:
+            raise UserWarning("Not files detected in current path %s" % cwd)
+        return files
+    if paths and paths != (".",):
+        _logger.info("Running only for INCLUDE_LINT=%s", paths)
+        files = []
+        for included_path in paths:
+            files += get_files(included_path) or (included_path,)
+        return files
+    return None
+
+
+def filter_excluded_files(repo_dirname, files, exclude_lint):
+    """Drop the files excluded from all the stages once here instead of pre-commit searching
+    the exclude regex for them in each hook (EXCLUDE_AUTOFIX is left to pre-commit)
+
+    An empty list means that there is nothing to check
+    """
+    if not files:
+        return files
+    files, excluded_files = exclusions.filter_files(repo_dirname, files, exclude_lint)
+    if excluded_files:
+        _logger.info("Excluded %d file(s) of EXCLUDE_LINT and the uninstallable modules", len(excluded_files))
+    if not files:
+        _logger.warning("All the files to check are excluded. Nothing to do.")
+    return files
+
+
+def filter_shard_files(repo_dirname, files, shard, modules_index):
+    """Files of the shard (index, total) of the files (all the files of the repository if None)
+
+    An empty list means that there is nothing to check
+    """
+    from . import sharding  # ruff: ignore[import-outside-top-level]
+
+    if files is None:
+        # The shard can only be run using an explicit list of files
+        files = get_files(repo_dirname)
+    elif not files:
+        return files
+    shard_index, shard_total = shard
+    files = sharding.get_shard_files(repo_dirname, files, shard_index, shard_total, modules_index)
+    if not files:
+        _logger.warning("There are no files to check for the shard %d/%d. Nothing to do.", shard_index, shard_total)
+    return files
+
+
+def warm_up(repo_dirname):
+    """Load in memory the state reused by the next runs of the same process (e.g. the daemon of "--serve")
+
+    The index of the Odoo modules, the digest and the compiled templates and the fingerprints of the hooks
+    installed are computed again in the next runs only if the files they come from were modified
+    """
+    from . import odoo_modules, renderer  # ruff: ignore[import-outside-top-level]
+
+    cfg_cache_dir = os.path.join(repo_dirname, CFG_SUBFOLDER, CFG_CACHE_SUBFOLDER)
+    odoo_modules.get_modules_index(repo_dirname, cache_dir=cfg_cache_dir)
+    precommit_config_dir = os.path.join(full_norm_path(str(pathlib.Path(__file__).parent)), "cfg")
+    get_templates_digest(precommit_config_dir)
+    if renderer.can_render(precommit_config_dir):
+        renderer.load_templates(precommit_config_dir, cfg_cache_dir)
+    for pre_commit_cfg in get_pre_commit_cfgs(os.path.join(repo_dirname, CFG_SUBFOLDER)).values():
+        get_install_hooks_fingerprint(pre_commit_cfg)
+
+
+# There are a lot of if validations in this method. It is expected for now.
+@tracing.with_trace_file
+def main(  # ruff: ignore[complex-structure]
+    paths,
+    scope,
+    no_overwrite,
+    exclude_autofix,
+    exclude_lint,
+    pylint_disable_checks,
+    oca_hooks_disable_checks,
+    ruff_disable_checks,
+    precommit_hooks_type,
+    fail_optional,
+    install,
+    skip_string_normalization,
+    odoo_version,
+    is_project_for_apps,
+    only_cp_cfg,
+    compatibility_version,
+    parallel_stages=False,
+    use_results_cache=False,
+    watch=False,
+    shard=None,
+    fail_fast=False,
+    files_from=None,
+    since=None,
+    changed_modules=False,
+    dependents_depth=0,
+    use_ruff_single_pass=False,
+    use_pylint_single_pass=False,
+    fix_until_stable=False,
+    do_exit=True,
+):
+    from . import odoo_modules  # ruff: ignore[import-outside-top-level]
+
+    show_version()
+    repo_dirname = get_repo()
+    cwd = git_cwd()
+
+    root_dir = full_norm_path(str(pathlib.Path(__file__).parent))
+
+    if install:
+        git_hook_pre_commit_src = os.path.join(root_dir, "git_hook_pre_commit")
+        git_hook_pre_commit_dest = os.path.join(repo_dirname, ".git", "hooks", "pre-commit")
+        pre_commit_vauxoo_bin = resolve_console_script("pre-commit-vauxoo")
+        _logger.info("pre-commit installed at %s", git_hook_pre_commit_dest)
+        install_git_hook(
+            git_hook_pre_commit_src,
+            git_hook_pre_commit_dest,
+            {"__PRE_COMMIT_VAUXOO_BIN__": pre_commit_vauxoo_bin},
+        )
+        if do_exit:
+            sys.exit(0)
+        return
+
+    precommit_config_dir = os.path.join(root_dir, "cfg")
+    # The index is built before copying the configuration files since they exclude the uninstallable modules
+    modules_index = odoo_modules.get_modules_index(
+        repo_dirname, cache_dir=os.path.join(repo_dirname, CFG_SUBFOLDER, CFG_CACHE_SUBFOLDER)
+    )
+    uninstallable_modules = get_uninstallable_modules(repo_dirname, modules_index)
+    exclude_lint += tuple(uninstallable_modules)
+
+    copy_cfg_files(
+        precommit_config_dir,
+        repo_dirname,
+        no_overwrite,
+        exclude_lint,
+        pylint_disable_checks,
+        oca_hooks_disable_checks,
+        ruff_disable_checks,
+        exclude_autofix,
+        skip_string_normalization,
+        odoo_version,
+        is_project_for_apps,
+        compatibility_version,
+    )
+    if only_cp_cfg:
+        _logger.info("Only copied configuration files. Exiting now.")
+        return
+    _logger.info("Installing pre-commit hooks")
+    cfg_dir = os.path.join(repo_dirname, CFG_SUBFOLDER)
+    pre_commit_cfgs = get_pre_commit_cfgs(cfg_dir)
+    install_pre_commit_cfgs = [
+        pre_commit_cfgs[stage] for stage in ("mandatory", "optional", "fix") if stage in precommit_hooks_type
+    ]
+    install_hooks(install_pre_commit_cfgs, os.path.join(cfg_dir, CFG_CACHE_SUBFOLDER))
+    if watch:
+        watch_stages(
+            repo_dirname,
+            precommit_hooks_type,
+            cfg_dir,
+            fail_optional,
+            parallel_stages=parallel_stages,
+            use_results_cache=use_results_cache,
+            odoo_version=odoo_version,
+            fail_fast=fail_fast,
+            use_ruff_single_pass=use_ruff_single_pass,
+            use_pylint_single_pass=use_pylint_single_pass,
+            fix_until_stable=fix_until_stable,
+        )
+        return
+
+    custom_paths = bool(paths) and paths != (".",)
+    since_ref = None
+    if since is not None:
+        if scope != SCOPE_ALL:
+            _logger.warning(
+                "Conflicting parameters: '--%s' is ignored since that '--since' has precedence over it", scope
+            )
+        scope = SCOPE_SINCE
+        since_ref = resolve_since_ref(since, odoo_version)
+        if not since_ref:
+            _logger.warning(
+                "Unable to find the stable ref of the odoo version '%s' for '--since'. Running for all the files",
+                odoo_version,
+            )
+            scope = SCOPE_ALL
+    if files_from is not None and (custom_paths or scope != SCOPE_ALL):
+        _logger.warning("Conflicting parameters: '--files-from' has precedence over '-p/--paths' and the scope")
+    elif custom_paths and scope != SCOPE_ALL:
+        _logger.warning(
+            "Conflicting parameters: '--%s' is ignored since that '-p/--paths' has precedence over it",
+            scope,
+        )
+        scope = SCOPE_ALL
+    if dependents_depth and not changed_modules:
+        # The dependents are found from the modules changed
+        changed_modules = True
+    if changed_modules and scope == SCOPE_ALL and not custom_paths and files_from is None:
+        # The modules changed by the files not committed yet if there is not other scope
+        scope = SCOPE_DIFF
+    files = get_files_to_check(
+        repo_dirname,
+        cwd,
+        paths,
+        scope,
+        since_ref=since_ref,
+        files_from=files_from,
+        changed_modules=changed_modules,
+        dependents_depth=dependents_depth,
+        modules_index=modules_index,
+        uninstallable_modules=uninstallable_modules,
+    )
+    if files is not None and exclude_lint and not no_overwrite:
+        # The custom files (no_overwrite) may not exclude them so they are left to pre-commit
+        files = filter_excluded_files(repo_dirname, files, exclude_lint)
+    summary_title = "Tests summary"
+    if shard:
+        summary_title = "Tests summary (shard %d/%d)" % shard
+        files = filter_shard_files(repo_dirname, files, shard, modules_index)
+    if files is not None and not files:
+        # Nothing to do (the reason was already logged)
+        if do_exit:
+            sys.exit(0)
+        return
+    cache_dir = os.path.join(cfg_dir, CFG_CACHE_SUBFOLDER)
+    results_cache = None
+    if use_results_cache:
+        from .results_cache import ResultsCache  # ruff: ignore[import-outside-top-level]
+
+        if files is None:
+            # The files that already passed can only be skipped using an explicit list of files
+            files = get_files(repo_dirname)
+        results_cache = ResultsCache(repo_dirname, cache_dir, get_cfg_paths(repo_dirname), modules_index)
+        results_cache.update_files_shas(files)
+    status, all_status = run_stages(
+        files,
+        precommit_hooks_type,
+        cfg_dir,
+        fail_optional,
+        parallel_stages=parallel_stages,
+        results_cache=results_cache,
+        odoo_version=odoo_version,
+        repo_dirname=repo_dirname,
+        fail_fast=fail_fast,
+        use_ruff_single_pass=use_ruff_single_pass,
+        use_pylint_single_pass=use_pylint_single_pass,
+        fix_until_stable=fix_until_stable,
+    )
+    print_summary(all_status, summary_title)
     if do_exit:
         sys.exit(status)
 
 
-def print_summary(all_status):
+def print_summary(all_status, title="Tests summary"):
     summary_msg = ["+" + "=" * 39]
-    summary_msg.append("|  Tests summary:")
+    summary_msg.append("|  %s:" % title)
     summary_msg.append("|" + "-" * 39)
     for test_name, test_result in all_status.items():
         outcome = (
@@ -678,13 +1653,37 @@ def print_summary(all_status):
             if test_result["status"]
             else logging_colored.colorized_msg(test_result["status_msg"], test_result["level"])
         )
-        summary_msg.append(f"| {test_name:<28}{outcome}")
+        seconds = "%.2fs" % test_result["seconds"] if "seconds" in test_result else ""
+        summary_msg.append(f"| {test_name:<20}{seconds:>8}  {outcome}")
     summary_msg.append("+" + "=" * 39)
-    _logger.info("Tests summary\n%s", "\n".join(summary_msg))
+    _logger.info("%s\n%s", title, "\n".join(summary_msg))
 
 
-def show_version():
+def show_version(import_seconds=None):
     _logger.info("Version\npre-commit-vauxoo %s\nPython %s", __version__, sys.version)
+    if import_seconds is not None:
+        _logger.info("Imported in %.3fs", import_seconds)
+
+
+def show_explain_check(name):
+    """Show the ruff equivalent of a pylint check or the pylint checks of a ruff code
+
+    Return True if the check was found
+    """
+    checks = pylint_ruff.explain_check(name)
+    if not checks:
+        _logger.error("The check '%s' is not a pylint check migrated to ruff nor its ruff code", name)
+        return False
+    for pylint_check, entry in checks:
+        _logger.info(
+            "pylint %s (%s .pylintrc%s) -> ruff %s%s",
+            pylint_check,
+            entry["severity"],
+            "-optional" if entry["severity"] == "optional" else "",
+            ",".join(entry["ruff"]),
+            " (%s)" % entry["note"] if entry["note"] else "",
+        )
+    return True
 
 
 if __name__ == "__main__":
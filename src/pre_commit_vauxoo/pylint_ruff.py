@@ -0,0 +1,85 @@
+"""Index of the pylint checks migrated to ruff
+
+The .pylintrc*.jinja templates document each pylint check migrated to ruff using a
+"check-name,  # ruff CODE1,CODE2 (note)" comment. Parsing the templates on every run is
+avoided using the index generated from them (PYLINT_RUFF_INDEX_FILENAME) packaged with
+the templates. Generate it again after changing the annotations of the templates running:
+
+    python -m pre_commit_vauxoo.pylint_ruff
+
+tests/test_pre_commit_vauxoo.py checks that the index is in sync with the templates.
+"""
+
+import functools
+import json
+import pathlib
+import re
+
+PYLINT_RUFF_INDEX_FILENAME = "pylint-ruff-checks.json"
+# The templates annotated and the severity of their checks
+PYLINTRC_TEMPLATES = {
+    ".pylintrc.jinja": "mandatory",
+    ".pylintrc-optional.jinja": "optional",
+}
+
+# Matches the "check-name,  # ruff CODE1,CODE2 (note)" annotations of the templates
+re_pylint_check_ruff_codes = re.compile(
+    r"^\s*(?P<check>[a-z][\w-]*),?\s+#\s*ruff\s+(?P<codes>[A-Z]+\d+(?:,[A-Z]+\d+)*)(?:\s+\((?P<note>[^)\n]*)\))?",
+    re.MULTILINE,
+)
+
+PACKAGE_DIR = pathlib.Path(__file__).parent
+CFG_DIR = PACKAGE_DIR / "cfg"
+
+
+def parse_templates(precommit_config_dir=CFG_DIR):
+    """Parse the annotations of the templates
+
+    Return a dict {check: {"ruff": [code, ...], "severity": "mandatory"|"optional", "note": str}}
+    """
+    index = {}
+    for pylintrc_filename, severity in PYLINTRC_TEMPLATES.items():
+        pylintrc_path = pathlib.Path(precommit_config_dir) / pylintrc_filename
+        if not pylintrc_path.is_file():
+            continue
+        for check_match in re_pylint_check_ruff_codes.finditer(pylintrc_path.read_text(encoding="utf-8")):
+            entry = index.setdefault(check_match["check"], {"ruff": [], "severity": severity, "note": ""})
+            entry["ruff"] += [code for code in check_match["codes"].split(",") if code not in entry["ruff"]]
+            entry["note"] = entry["note"] or check_match["note"] or ""
+    return index
+
+
+def generate_index(precommit_config_dir=CFG_DIR, index_path=PACKAGE_DIR / PYLINT_RUFF_INDEX_FILENAME):
+    index = parse_templates(precommit_config_dir)
+    # A check per line to get readable diffs
+    lines = (
+        "%s: %s" % (json.dumps(check), json.dumps(entry, sort_keys=True)) for check, entry in sorted(index.items())
+    )
+    pathlib.Path(index_path).write_text("{\n%s\n}\n" % ",\n".join(lines), encoding="utf-8")
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def load_index():
+    """The index packaged (read only the first time it is used)"""
+    return json.loads((PACKAGE_DIR / PYLINT_RUFF_INDEX_FILENAME).read_text(encoding="utf-8"))
+
+
+def get_ruff_codes(pylint_check):
+    """ruff codes equivalent to the pylint check (empty if it was not migrated)"""
+    return tuple(load_index().get(pylint_check, {}).get("ruff", ()))
+
+
+def explain_check(name):
+    """Checks matching name: a pylint check or a ruff code (case insensitive for the codes)
+
+    Return a list of tuples (pylint_check, entry)
+    """
+    index = load_index()
+    if name in index:
+        return [(name, index[name])]
+    return [(check, entry) for check, entry in sorted(index.items()) if name.upper() in entry["ruff"]]
+
+
+if __name__ == "__main__":
+    print("%d pylint checks indexed" % len(generate_index()))
@@ -0,0 +1,413 @@
+"""Run pylint-odoo once for the mandatory and optional checks ("--pylint-single-pass")
+
+The mandatory and optional pylint-odoo hooks run pylint over the same files with their own
+.pylintrc, so astroid parses and infers each file twice. In this mode:
+
+- The messages enabled and the option values of each .pylintrc are the ones resolved by the
+  pylint of the hook environment (see pylint_state.py), so PYLINT_DISABLE_CHECKS, the
+  categories and the plugins are honored exactly as the hooks do.
+- pylint runs once (with the "--jobs" of the hooks) using a .pylintrc enabling the union of
+  their messages. Each option takes the value of the severities enabling the messages using it
+  (e.g. max-complexity is used only by too-complex and py-version is not used by the messages
+  of the experimental checks). The lists of files and extensions ignored or loaded
+  (UNION_OPTIONS) use the union of the severities.
+- Each message is assigned to the severities enabling it (and whose hook routes its file)
+  and reported as part of their stage. The ones using "--exit-zero" (e.g. the experimental
+  checks) show their messages without affecting the status.
+- The stages run with SKIP=pylint_odoo so pre-commit does not run the hooks again.
+
+If the single pass can not be prepared (e.g. the hook is not installed yet or an option used
+by the messages of both severities has different values) the hooks run as usual.
+"""
+
+import configparser
+import hashlib
+import io
+import json
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+
+from . import hooks_routing
+from .results_cache import git_z_output, make_cache_dir
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+PYLINT_HOOK_ID = "pylint_odoo"
+PYLINT_STATE_FILENAME = "pylint-state.json"
+PYLINT_STATE_CACHE_SIZE = 4
+SINGLE_PASS_RCFILE_FILENAME = "pylintrc-single-pass"
+PYLINT_STATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pylint_state.py")
+# Files per pylint command to keep the command line short
+PYLINT_FILES_PER_COMMAND = 1000
+# The messages using the option. The options not listed here are used by all the messages of their checker
+OPTION_MESSAGES = {
+    "bad-names": ["disallowed-name"],
+    "defining-attr-methods": ["attribute-defined-outside-init", "access-member-before-definition"],
+    "good-names": ["invalid-name", "disallowed-name"],
+    "license-allowed": ["license-allowed"],
+    "manifest-deprecated-keys": ["manifest-deprecated-key"],
+    "manifest-required-authors": ["manifest-required-author"],
+    "max-args": ["too-many-arguments"],
+    "max-attributes": ["too-many-instance-attributes"],
+    "max-bool-expr": ["too-many-boolean-expressions"],
+    "max-branches": ["too-many-branches"],
+    "max-complexity": ["too-complex"],
+    "max-line-length": ["line-too-long"],
+    "max-locals": ["too-many-locals"],
+    "max-module-lines": ["too-many-lines"],
+    "max-parents": ["too-many-ancestors"],
+    "max-positional-arguments": ["too-many-positional-arguments"],
+    "max-public-methods": ["too-many-public-methods"],
+    "max-returns": ["too-many-return-statements"],
+    "max-statements": ["too-many-statements"],
+    "min-public-methods": ["too-few-public-methods"],
+    "no-docstring-rgx": ["missing-module-docstring", "missing-class-docstring", "missing-function-docstring"],
+    # Besides the messages of the range of odoo versions resolved by pylint_state.py
+    "valid-odoo-versions": ["deprecated-odoo-model-method", "manifest-version-format", "translation-required"],
+}
+# The naming options (e.g. "class-rgx" or "class-naming-style") are used only by invalid-name
+NAMING_OPTION_SUFFIXES = ("-rgx", "-naming-style")
+# The lists of files ignored and extensions loaded use the union of the severities
+UNION_OPTIONS = ("ignore", "load-plugins", "extension-pkg-whitelist", "extension-pkg-allow-list")
+# Options resolved by severity: the messages enabled use the union of the severities and
+# "exit-zero" (e.g. the experimental checks) only changes the status of its severity
+SEVERITY_OPTIONS = ("enable", "disable", "exit-zero")
+# Arguments of the hooks already resolved in the messages enabled of each severity or in its status
+SEVERITY_ARGS = ("--enable=", "--disable=", "-e", "-d", "--exit-zero")
+
+
+class SinglePassError(Exception):
+    """The single pass can not run so the pylint hooks run as usual"""
+
+
+class Severity:
+    """The pylint-odoo hook of a stage with its .pylintrc"""
+
+    def __init__(self, stage, pre_commit_config, hook, rcfile, args, jobs):
+        self.stage = stage
+        self.pre_commit_config = pre_commit_config
+        self.hook = hook
+        self.name = hook.get("name") or PYLINT_HOOK_ID
+        self.rcfile = rcfile
+        # The arguments of the hook without "--rcfile" and "--jobs"
+        self.args = args
+        self.jobs = jobs
+        self.exit_zero = False
+        # Resolved by pylint (see get_state)
+        self.enabled = set()
+        self.options = {}
+        self.relpaths = set()
+
+
+def read_rcfile(path):
+    """The .pylintrc parsed as pylint does"""
+    parser = configparser.ConfigParser(inline_comment_prefixes=("#", ";"))
+    try:
+        with open(path, encoding="utf-8") as f_rcfile:
+            parser.read_file(f_rcfile)
+    except (OSError, configparser.Error) as error:
+        raise SinglePassError("Unable to read %s: %s" % (path, error)) from error
+    return parser
+
+
+def get_option_messages(option, checker_messages, state):
+    if option in state.get("option_messages", {}):
+        # The version options (e.g. py-version) are used by the messages resolved by pylint_state.py
+        return set(state["option_messages"][option]) | set(OPTION_MESSAGES.get(option, []))
+    if option in OPTION_MESSAGES:
+        return set(OPTION_MESSAGES[option])
+    if option.endswith(NAMING_OPTION_SUFFIXES):
+        return {"invalid-name"}
+    return set(checker_messages)
+
+
+def get_common_args(args):
+    """The arguments of the hook used by the single pass"""
+    return [arg for arg in args if not arg.startswith(SEVERITY_ARGS)]
+
+
+def prepare(repo_dirname, pre_commit_cfgs, pre_commit_home):
+    """The pylint command and the severities of the pylint-odoo hooks of the stages {stage: pre_commit_cfg}
+
+    Raise SinglePassError if the single pass can not run
+    """
+    severities = []
+    repos = set()
+    for stage, pre_commit_cfg in pre_commit_cfgs.items():
+        try:
+            pre_commit_config = hooks_routing.get_hook_config(pre_commit_cfg, PYLINT_HOOK_ID)
+            hooks = hooks_routing.get_config_hooks(pre_commit_config, pre_commit_home)
+        except hooks_routing.UnknownHook as error:
+            raise SinglePassError(str(error)) from error
+        repos |= {(repo.get("repo"), repo.get("rev")) for repo in pre_commit_config["repos"]}
+        for hook in hooks:
+            if hook["id"] != PYLINT_HOOK_ID:
+                continue
+            hook_args = [str(arg) for arg in hook.get("args", [])]
+            rcfiles = [arg.split("=", 1)[1] for arg in hook_args if arg.startswith("--rcfile=")]
+            if len(rcfiles) != 1:
+                raise SinglePassError("The hook %s of %s has not one configuration file" % (hook.get("name"), stage))
+            jobs = [arg for arg in hook_args if arg.startswith(("--jobs=", "-j"))]
+            args = [arg for arg in hook_args if not arg.startswith("--rcfile=") and arg not in jobs]
+            severity = Severity(stage, pre_commit_config, hook, os.path.join(repo_dirname, rcfiles[0]), args, jobs)
+            severities.append(severity)
+    if not severities:
+        raise SinglePassError("There are no pylint-odoo hooks")
+    if len(repos) > 1:
+        raise SinglePassError("The pylint-odoo hooks use different versions")
+    if len({tuple(get_common_args(severity.args)) for severity in severities}) > 1:
+        raise SinglePassError("The pylint-odoo hooks use different arguments")
+    if len({tuple(severity.jobs) for severity in severities}) > 1:
+        raise SinglePassError("The pylint-odoo hooks use different --jobs")
+    ((repo, rev),) = repos
+    try:
+        pylint_command = hooks_routing.get_hook_command(pre_commit_home, repo, rev, PYLINT_HOOK_ID)
+    except hooks_routing.UnknownHook as error:
+        raise SinglePassError(str(error)) from error
+    return pylint_command, severities
+
+
+def get_state(pylint_command, configs, repo_dirname, cache_dir):
+    """State of the configs [{"rcfile": path, "args": [...]}] resolved by pylint (see pylint_state.py)
+
+    It is cached by the content of the .pylintrc, the arguments and the pylint of the hook
+    since that loading pylint and its plugins takes a while
+    """
+    python = shutil.which("python", path=os.path.dirname(pylint_command[0]))
+    if not python:
+        raise SinglePassError("The python of the pylint-odoo environment was not found")
+    stamp = hashlib.sha256()
+    for path in [PYLINT_STATE_SCRIPT] + [config["rcfile"] for config in configs]:
+        try:
+            stamp.update(pathlib.Path(path).read_bytes())
+        except OSError as error:
+            raise SinglePassError("Unable to read %s: %s" % (path, error)) from error
+    # The environment of the hook is installed again if it changes (e.g. a new version of pylint_odoo)
+    stamp.update(
+        json.dumps([pylint_command[0], os.stat(pylint_command[0]).st_mtime_ns, configs], sort_keys=True).encode(
+            "utf-8"
+        )
+    )
+    key = stamp.hexdigest()
+    cache_path = pathlib.Path(cache_dir, PYLINT_STATE_FILENAME)
+    try:
+        entries = [
+            [entry_key, entry_state] for entry_key, entry_state in json.loads(cache_path.read_text(encoding="utf-8"))
+        ]
+    except (OSError, ValueError, TypeError):
+        entries = []
+    state = dict(entries).get(key)
+    if state is not None:
+        return state
+    try:
+        output = subprocess.check_output(
+            [python, PYLINT_STATE_SCRIPT, json.dumps(configs)], cwd=repo_dirname, stderr=subprocess.PIPE
+        )
+        state = json.loads(output)
+    except (OSError, subprocess.CalledProcessError, ValueError) as error:
+        raise SinglePassError("Unable to get the messages enabled of pylint: %s" % error) from error
+    # The last states used (e.g. the ones of the severities and the one of the single pass)
+    entries = [entry for entry in entries if entry[0] != key][-(PYLINT_STATE_CACHE_SIZE - 1) :] + [[key, state]]
+    make_cache_dir(cache_path.parent)
+    cache_path.write_text(json.dumps(entries), encoding="utf-8")
+    return state
+
+
+def get_owners(severities, state):
+    """Severity whose value takes each option with different values {option: severity or None for the union}
+
+    Raise SinglePassError if the messages using the option are enabled in severities with different values
+    """
+    owners = {}
+    for checker in state["checkers"].values():
+        for option in checker["options"]:
+            if option in SEVERITY_OPTIONS:
+                continue
+            if len({severity.options.get(option) for severity in severities}) == 1:
+                continue
+            if option in UNION_OPTIONS:
+                owners[option] = None
+                continue
+            messages = get_option_messages(option, checker["messages"], state)
+            option_owners = [severity for severity in severities if severity.enabled & messages]
+            if len({severity.options.get(option) for severity in option_owners}) > 1:
+                raise SinglePassError(
+                    "The option %s has different values for %s"
+                    % (option, " and ".join(severity.name for severity in option_owners))
+                )
+            # The value of the first severity (e.g. mandatory) if none of them uses it
+            owners[option] = option_owners[0] if option_owners else severities[0]
+    return owners
+
+
+def get_single_pass_rcfile(severities, owners, state):
+    """Content of the .pylintrc of the first severity with the values of the owners of each option"""
+    parsers = {severity: read_rcfile(severity.rcfile) for severity in severities}
+    rcfile = configparser.RawConfigParser()
+    base = parsers[severities[0]]
+    for section in base.sections():
+        rcfile.add_section(section)
+        for option in base.options(section):
+            if option not in SEVERITY_OPTIONS and owners.get(option, severities[0]) is severities[0]:
+                rcfile.set(section, option, base.get(section, option, raw=True))
+    for option, owner in sorted(owners.items(), key=lambda item: item[0]):
+        values = []
+        for severity in severities if owner is None else [owner]:
+            parser = parsers[severity]
+            for section in parser.sections():
+                if parser.has_option(section, option):
+                    values.append((section, parser.get(section, option, raw=True)))
+        if not values:
+            # The default value
+            continue
+        section = values[0][0]
+        if not rcfile.has_section(section):
+            rcfile.add_section(section)
+        if owner is None:
+            items = []
+            for _section, value in values:
+                items += [item.strip() for item in value.split(",") if item.strip() and item.strip() not in items]
+            rcfile.set(section, option, ",".join(items))
+        else:
+            rcfile.set(section, option, values[0][1])
+    if not rcfile.has_section("MESSAGES CONTROL"):
+        rcfile.add_section("MESSAGES CONTROL")
+    enabled = set().union(*(severity.enabled for severity in severities))
+    # "all" does not disable a few messages (e.g. unknown-option-value) so they are listed too
+    messages = set().union(*(checker["messages"] for checker in state["checkers"].values()))
+    rcfile.set("MESSAGES CONTROL", "disable", ",\n".join(["all"] + sorted(messages - enabled)))
+    rcfile.set("MESSAGES CONTROL", "enable", ",\n".join(sorted(enabled)))
+    content = io.StringIO()
+    rcfile.write(content)
+    return content.getvalue()
+
+
+def check_single_pass_state(severities, owners, single_pass_state):
+    """The single pass resolves the union of the messages and the values of the owners of the options"""
+    enabled = set().union(*(severity.enabled for severity in severities))
+    different = set(single_pass_state["enabled"]) ^ enabled
+    if different:
+        raise SinglePassError(
+            "The single pass configuration does not enable the messages of the severities: %s"
+            % ", ".join(sorted(different))
+        )
+    for option, value in single_pass_state["options"].items():
+        if option in SEVERITY_OPTIONS or owners.get(option, severities[0]) is None:
+            continue
+        if value != owners.get(option, severities[0]).options.get(option):
+            raise SinglePassError("The single pass configuration does not use the value of the option %s" % option)
+
+
+def run_pylint(command, repo_dirname):
+    """Messages of pylint using the JSON output format"""
+    try:
+        process = subprocess.run(command, cwd=repo_dirname, stdout=subprocess.PIPE, check=False)
+    except OSError as error:
+        raise SinglePassError("Unable to run pylint: %s" % error) from error
+    # The exit status is a bit mask of the categories of the messages emitted. 32 is an usage error
+    if process.returncode & 32:
+        raise SinglePassError("Unable to run pylint: exit status %d" % process.returncode)
+    try:
+        return json.loads(process.stdout or b"[]")
+    except ValueError as error:
+        raise SinglePassError("Unable to read the output of pylint: %s" % error) from error
+
+
+def run_single_pass(repo_dirname, files, pre_commit_cfgs, pre_commit_home, cache_dir):
+    """Run pylint once for the pylint-odoo hooks of the stages {stage: pre_commit_cfg}
+
+    files=None checks all the files of the repository
+    Return a list of tuples (severity, messages) or raise SinglePassError if it can not run
+    """
+    pylint_command, severities = prepare(repo_dirname, pre_commit_cfgs, pre_commit_home)
+    state = get_state(
+        pylint_command,
+        [{"rcfile": severity.rcfile, "args": severity.args} for severity in severities],
+        repo_dirname,
+        cache_dir,
+    )
+    for severity, severity_state in zip(severities, state["configs"]):
+        severity.enabled = set(severity_state["enabled"])
+        severity.options = severity_state["options"]
+        # e.g. the experimental checks show their messages without affecting the status
+        severity.exit_zero = severity.options.get("exit-zero") == repr(True)
+    owners = get_owners(severities, state)
+    rcfile_path = pathlib.Path(cache_dir, SINGLE_PASS_RCFILE_FILENAME)
+    make_cache_dir(rcfile_path.parent)
+    rcfile_path.write_text(get_single_pass_rcfile(severities, owners, state), encoding="utf-8")
+    common_args = get_common_args(severities[0].args)
+    single_pass_state = get_state(
+        pylint_command, [{"rcfile": str(rcfile_path), "args": common_args}], repo_dirname, cache_dir
+    )
+    check_single_pass_state(severities, owners, single_pass_state["configs"][0])
+    if files is None:
+        relpaths = git_z_output(["ls-files", "-z"], repo_dirname)
+    else:
+        relpaths = [pathlib.Path(os.path.relpath(os.path.abspath(fname), repo_dirname)).as_posix() for fname in files]
+    # The files of each hook filtered as pre-commit does (e.g. only python files and the exclude regex)
+    files_tags = hooks_routing.get_files_tags(repo_dirname, relpaths)
+    for severity in severities:
+        routing = hooks_routing.route_files(severity.pre_commit_config, [severity.hook], files_tags)
+        severity.relpaths = set(routing[PYLINT_HOOK_ID])
+    relpaths = sorted(set().union(*(severity.relpaths for severity in severities)))
+    results = [(severity, []) for severity in severities]
+    if not relpaths:
+        return results
+    _logger.info(
+        "Running pylint-odoo once for %s on %d file(s)",
+        ", ".join(severity.name for severity in severities),
+        len(relpaths),
+    )
+    messages = []
+    for index in range(0, len(relpaths), PYLINT_FILES_PER_COMMAND):
+        messages += run_pylint(
+            pylint_command
+            + ["--rcfile=%s" % rcfile_path]
+            + common_args
+            # The "--jobs" of the matrix (the same one is rendered for all the hooks)
+            + severities[0].jobs
+            + ["--output-format=json"]
+            + relpaths[index : index + PYLINT_FILES_PER_COMMAND],
+            repo_dirname,
+        )
+    for message in messages:
+        relpath = pathlib.Path(message["path"]).as_posix()
+        for severity, severity_messages in results:
+            if relpath in severity.relpaths and message.get("symbol") in severity.enabled:
+                severity_messages.append(dict(message, relpath=relpath))
+    return results
+
+
+def format_message(message):
+    """The message using a fixed format ("path:line:column: (symbol) message") whatever the msg-template"""
+    return "%s:%s:%s: (%s) %s" % (
+        message["relpath"],
+        message.get("line"),
+        message.get("column"),
+        message.get("symbol"),
+        message.get("message"),
+    )
+
+
+def report(results, stage):
+    """Show the messages of the severities of the stage returning the status of the stage"""
+    status = 0
+    for severity, messages in results:
+        if severity.stage != stage:
+            continue
+        if not messages:
+            _logger.info("%s (single pass): Passed", severity.name)
+            continue
+        log = _logger.info if severity.exit_zero else _logger.error
+        log(
+            "%s (single pass): %d error(s)\n%s",
+            severity.name,
+            len(messages),
+            "\n".join(format_message(message) for message in messages),
+        )
+        if not severity.exit_zero:
+            status = 1
+    return status
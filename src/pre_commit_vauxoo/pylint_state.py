@@ -0,0 +1,82 @@
+"""Messages enabled and option values of pylint configurations as pylint resolves them
+
+It is not imported by pre-commit-vauxoo (pylint is not one of its dependencies).
+pylint_single_pass runs it as a script using the python of the environment installed by
+pre-commit for the pylint hook, so the state is the one of that pylint and its plugins:
+
+    python pylint_state.py '[{"rcfile": ".config/.pylintrc", "args": ["--disable=R0000"]}, ...]'
+
+It prints a JSON {"checkers": {checker: {"messages": [...], "options": [...]}}, "configs": [...],
+"option_messages": {option: [symbol, ...]}} where each config is {"enabled": [symbol, ...],
+"options": {option: value_repr}} and option_messages are the messages using the version options
+"""
+
+import json
+import sys
+
+from pylint.config.config_initialization import _config_initialization
+from pylint.lint import PyLinter
+
+
+def value_repr(value):
+    """repr of the value of an option independent of the order of the sets"""
+    if isinstance(value, (set, frozenset)):
+        return repr(sorted(value_repr(item) for item in value))
+    if isinstance(value, (list, tuple)):
+        return repr([value_repr(item) for item in value])
+    return repr(value)
+
+
+def get_linter(rcfile, args):
+    linter = PyLinter()
+    linter.load_default_plugins()
+    for arg in args:
+        # "pylint" loads the plugins of the command line before parsing the configuration
+        if arg.startswith("--load-plugins="):
+            linter.load_plugin_modules([
+                plugin.strip() for plugin in arg.split("=", 1)[1].split(",") if plugin.strip()
+            ])
+    _config_initialization(linter, list(args), config_file=rcfile)
+    return linter
+
+
+def get_state(configs):
+    checkers = {}
+    states = []
+    # The messages using the version options (they are options of checkers not using them)
+    option_messages = {"py-version": set(), "valid-odoo-versions": set()}
+    for config in configs:
+        linter = get_linter(config["rcfile"], config.get("args", []))
+        options = {}
+        for checker in linter.get_checkers():
+            checker_state = checkers.setdefault(checker.name, {"messages": set(), "options": set()})
+            checker_state["messages"].update(message.symbol for message in checker.messages)
+            # The checkers of pylint read py-version (e.g. to suggest f-strings) but not the main one
+            if checker is not linter and type(checker).__module__.startswith("pylint."):
+                option_messages["py-version"].update(message.symbol for message in checker.messages)
+            option_messages["py-version"].update(
+                message.symbol for message in checker.messages if message.minversion or message.maxversion
+            )
+            # pylint_odoo emits them only if the odoo version is in their range
+            option_messages["valid-odoo-versions"].update(getattr(checker, "checks_maxmin_odoo_version", {}))
+            for option_name, _option in checker.options:
+                checker_state["options"].add(option_name)
+                options[option_name] = value_repr(getattr(linter.config, option_name.replace("-", "_"), None))
+        states.append({
+            "enabled": sorted(
+                message.symbol for message in linter.msgs_store.messages if linter.is_message_enabled(message.msgid)
+            ),
+            "options": options,
+        })
+    return {
+        "checkers": {
+            name: {"messages": sorted(state["messages"]), "options": sorted(state["options"])}
+            for name, state in checkers.items()
+        },
+        "configs": states,
+        "option_messages": {option: sorted(messages) for option, messages in option_messages.items()},
+    }
+
+
+if __name__ == "__main__":
+    json.dump(get_state(json.loads(sys.argv[1])), sys.stdout)
@@ -0,0 +1,133 @@
+"""Render the configuration files templates (cfg/) using jinja2 directly
+
+The templates are a flat folder of files where the ones ending with ".jinja" are rendered
+and the others are copied as is. The name of a file is rendered too, so a name rendered
+empty (e.g. "{% if use_ruff %}.ruff.toml{% endif %}.jinja") is not created.
+
+It produces the same files as copier would produce for them (same jinja2 options and
+same handling of the names) without importing copier and its own answers, tasks and
+validation machinery. Templates using copier features (a copier.yml or subfolders) are
+not supported, so copy_cfg_files uses copier for them into a staging folder.
+
+Only the files with a different content are written (atomically) in both cases.
+"""
+
+import concurrent.futures
+import os
+import pathlib
+import stat
+import tempfile
+
+TEMPLATES_SUFFIX = ".jinja"
+COPIER_CONFIG_FILENAMES = ("copier.yml", "copier.yaml")
+BYTECODE_CACHE_SUBFOLDER = "jinja2"
+RENDER_WORKERS = 8
+# The environment of each templates folder {(src_path, cache_dir): environment} so a process running
+# several commands (e.g. the daemon of "--serve") keeps the templates compiled in memory
+ENVIRONMENTS = {}
+
+
+def can_render(src_path):
+    """The templates of src_path are a flat folder without copier configuration"""
+    for entry in os.scandir(src_path):
+        if entry.is_dir() or entry.name in COPIER_CONFIG_FILENAMES:
+            return False
+    return True
+
+
+def get_environment(src_path, cache_dir=None):
+    """jinja2 environment with the same options used by copier
+
+    The templates compiled are stored in cache_dir to avoid compiling them again in the next runs
+    and the environment keeps them in memory (reloading the ones modified) for the next calls
+    """
+    # jinja2 is imported only if the files are rendered since that importing it is slow
+    import jinja2  # ruff: ignore[import-outside-top-level]
+
+    bytecode_cache_dir = os.path.join(cache_dir, BYTECODE_CACHE_SUBFOLDER) if cache_dir else None
+    if bytecode_cache_dir:
+        # Created even if the environment already exists since that the cache folder could be removed
+        pathlib.Path(bytecode_cache_dir).mkdir(exist_ok=True, parents=True)
+    key = (str(src_path), bytecode_cache_dir)
+    if key not in ENVIRONMENTS:
+        ENVIRONMENTS[key] = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(src_path),
+            keep_trailing_newline=True,
+            bytecode_cache=jinja2.FileSystemBytecodeCache(bytecode_cache_dir) if bytecode_cache_dir else None,
+        )
+    return ENVIRONMENTS[key]
+
+
+def load_templates(src_path, cache_dir=None):
+    """Compile the templates of src_path in the environment of get_environment to render them faster later"""
+    env = get_environment(src_path, cache_dir)
+    for name in sorted(os.listdir(src_path)):
+        if name.endswith(TEMPLATES_SUFFIX):
+            env.get_template(name)
+
+
+def write_file(dst_file, content, mode):
+    """Replace atomically dst_file by content only if its content changed returning if it was rewritten
+
+    The files without changes are not written again to keep their mtime since that other tools
+    use it to detect changes (e.g. the caches of ruff and eslint or the editors watching them)
+    """
+    dst_file = pathlib.Path(dst_file)
+    if dst_file.is_file() and dst_file.read_bytes() == content:
+        if stat.S_IMODE(dst_file.stat().st_mode) != mode:
+            dst_file.chmod(mode)
+        return False
+    dst_file.parent.mkdir(exist_ok=True, parents=True)
+    with tempfile.NamedTemporaryFile(dir=dst_file.parent, prefix="%s." % dst_file.name, delete=False) as tmp_file:
+        tmp_file.write(content)
+    os.chmod(tmp_file.name, mode)
+    # It replaces a symlink instead of writing into the file it links
+    os.replace(tmp_file.name, dst_file)
+    return True
+
+
+def render_file(env, src_path, dst_path, name, data, dst_overrides):
+    """Render (or copy) the template name returning a tuple (path, rewritten) or None if its name is rendered empty"""
+    is_template = name.endswith(TEMPLATES_SUFFIX)
+    dst_name = env.from_string(name[: -len(TEMPLATES_SUFFIX)] if is_template else name).render(**data)
+    if not dst_name:
+        return None
+    src_file = os.path.join(src_path, name)
+    if is_template:
+        content = env.get_template(name).render(**data).encode()
+    else:
+        content = pathlib.Path(src_file).read_bytes()
+    dst_file = dst_overrides.get(dst_name) or os.path.join(dst_path, dst_name)
+    return str(dst_file), write_file(dst_file, content, stat.S_IMODE(os.stat(src_file).st_mode))
+
+
+def render_templates(src_path, dst_path, data, cache_dir=None, dst_overrides=None):
+    """Render the templates of src_path into dst_path in parallel
+
+    dst_overrides are the paths of the files created out of dst_path {name: path}
+    Return a dict {path: rewritten} of the files created
+    """
+    env = get_environment(src_path, cache_dir)
+    pathlib.Path(dst_path).mkdir(exist_ok=True, parents=True)
+    names = sorted(entry.name for entry in os.scandir(src_path) if entry.is_file())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=RENDER_WORKERS) as executor:
+        dst_files = executor.map(
+            lambda name: render_file(env, src_path, dst_path, name, data, dst_overrides or {}), names
+        )
+        return dict(dst_file for dst_file in dst_files if dst_file)
+
+
+def sync_files(staging_path, dst_path, dst_overrides=None):
+    """Copy the files rendered by copier into staging_path to dst_path writing only the ones changed
+
+    Return a dict {path: rewritten} of the files created
+    """
+    dst_files = {}
+    for dirpath, _dirnames, filenames in os.walk(staging_path):
+        for filename in sorted(filenames):
+            staging_file = os.path.join(dirpath, filename)
+            relpath = pathlib.Path(os.path.relpath(staging_file, staging_path)).as_posix()
+            dst_file = (dst_overrides or {}).get(relpath) or os.path.join(dst_path, relpath)
+            content = pathlib.Path(staging_file).read_bytes()
+            dst_files[str(dst_file)] = write_file(dst_file, content, stat.S_IMODE(os.stat(staging_file).st_mode))
+    return dst_files
@@ -0,0 +1,195 @@
+"""Cache of the files that already passed the checks of each stage
+
+A file is identified by the git blob SHA of its current content so a file that passed
+a stage is not checked again by that stage until its content changes.
+The files of an Odoo module are also identified by the content of all the files of their
+module since that pylint-odoo and the OCA hooks report errors of a file using the other
+files of the module (e.g. the manifest keys, the xml ids or the files missing).
+The whole cache is discarded when the rendered configuration files or the package
+version change since the same content could get a different result.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import subprocess
+import sys
+
+from . import __version__
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+RESULTS_CACHE_FILENAME = "results-cache.json"
+
+
+def get_config_key(cfg_paths):
+    """Hash of the content of the configuration files and the package version"""
+    config_hash = hashlib.sha256(__version__.encode())
+    for cfg_path in sorted(cfg_paths):
+        cfg_path = pathlib.Path(cfg_path)
+        if not cfg_path.is_file():
+            continue
+        config_hash.update(cfg_path.name.encode() + b"\0")
+        config_hash.update(cfg_path.read_bytes() + b"\0")
+    return config_hash.hexdigest()
+
+
+def make_cache_dir(cache_dir):
+    """Create the cache folder ignored by git so the caches are never reported as changes (e.g. "--diff")"""
+    cache_path = pathlib.Path(cache_dir)
+    cache_path.mkdir(exist_ok=True, parents=True)
+    gitignore_path = cache_path / ".gitignore"
+    if not gitignore_path.exists():
+        gitignore_path.write_text("*\n", encoding="utf-8")
+
+
+def get_files_stamp(paths):
+    """mtime and size of the files (None for the missing ones) to detect if they changed"""
+    stamp = []
+    for path in paths:
+        try:
+            path_stat = pathlib.Path(path).stat()
+        except FileNotFoundError:
+            stamp.append(None)
+            continue
+        stamp.append((path_stat.st_mtime_ns, path_stat.st_size))
+    return tuple(stamp)
+
+
+def git_z_output(git_args, repo_dirname):
+    """Run a git command using "-z" returning its NUL-separated output items"""
+    output = subprocess.check_output(["git"] + git_args, cwd=repo_dirname, stderr=subprocess.PIPE)
+    return [item for item in output.decode(sys.stdout.encoding).split("\0") if item]
+
+
+def get_files_blob_shas(repo_dirname, relpaths):
+    """git blob SHA of the current content of the files (relative to the repository)
+
+    The SHA stored in the index ("git ls-files -s") is reused for the files without
+    changes in the working tree, so only the modified and untracked ones are hashed
+    Symlinks and missing files are not returned so they are always checked
+    """
+    index_shas = {}
+    for line in git_z_output(["ls-files", "-s", "-z"], repo_dirname):
+        info, relpath = line.split("\t", 1)
+        mode, sha = info.split(" ")[:2]
+        if mode != "120000":
+            index_shas[relpath] = sha
+    modified = set(git_z_output(["diff", "--name-only", "-z"], repo_dirname))
+    shas = {}
+    to_hash = []
+    for relpath in relpaths:
+        if relpath in index_shas and relpath not in modified:
+            shas[relpath] = index_shas[relpath]
+            continue
+        path = pathlib.Path(repo_dirname, relpath)
+        if path.is_file() and not path.is_symlink():
+            to_hash.append(relpath)
+    if to_hash:
+        hashed = subprocess.run(
+            ["git", "hash-object", "--stdin-paths"],
+            cwd=repo_dirname,
+            input="\n".join(to_hash).encode(sys.stdout.encoding),
+            capture_output=True,
+            check=True,
+        ).stdout.decode(sys.stdout.encoding)
+        shas.update(zip(to_hash, hashed.split()))
+    return shas
+
+
+def get_modules_shas(repo_dirname, module_dirs, shas):
+    """SHA of the content of all the files of each module (including its nested modules)
+
+    shas has the blob SHA of the files already computed. The missing ones are added to it
+    """
+    if not module_dirs:
+        return {}
+    module_relpaths = git_z_output(
+        ["ls-files", "-z", "--cached", "--others", "--exclude-standard", "--", *sorted(module_dirs)], repo_dirname
+    )
+    pending = sorted(set(module_relpaths) - set(shas))
+    if pending:
+        shas.update(get_files_blob_shas(repo_dirname, pending))
+    modules_hashes = {module_dir: hashlib.sha256() for module_dir in module_dirs}
+    for relpath in sorted(set(module_relpaths)):
+        for parent in pathlib.PurePosixPath(relpath).parents:
+            if parent.as_posix() in modules_hashes:
+                modules_hashes[parent.as_posix()].update(("%s %s\0" % (relpath, shas.get(relpath))).encode())
+    return {module_dir: module_hash.hexdigest() for module_dir, module_hash in modules_hashes.items()}
+
+
+class ResultsCache:
+    def __init__(self, repo_dirname, cache_dir, cfg_paths, module_dirs=()):
+        self.repo_dirname = repo_dirname
+        # The Odoo modules of the repository relative to it (see odoo_modules.get_modules_index)
+        self.module_dirs = set(module_dirs)
+        self.path = pathlib.Path(cache_dir, RESULTS_CACHE_FILENAME)
+        self.key = get_config_key(cfg_paths)
+        self.stages = {}
+        self.files_shas = {}
+        try:
+            content = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            content = {}
+        if content.get("key") == self.key:
+            self.stages = content.get("stages", {})
+        elif content:
+            _logger.info("The configuration files or the package version changed. Discarding the results cache")
+
+    def relpath(self, fname):
+        return pathlib.Path(os.path.relpath(os.path.abspath(fname), self.repo_dirname)).as_posix()
+
+    def get_file_module(self, relpath):
+        """Module containing the file (the nearest one for nested modules) or None"""
+        for parent in pathlib.PurePosixPath(relpath).parents:
+            if parent.as_posix() in self.module_dirs:
+                return parent.as_posix()
+        return None
+
+    def update_files_shas(self, files):
+        """Compute the blob SHA of the files again (e.g. after the autofix changed them)
+
+        The SHA of a file of a module is combined with the SHA of its module so it is checked
+        again if any file of the module changed
+        """
+        relpaths = {fname: self.relpath(fname) for fname in files}
+        shas = get_files_blob_shas(self.repo_dirname, sorted(set(relpaths.values())))
+        files_modules = {relpath: self.get_file_module(relpath) for relpath in set(relpaths.values())}
+        modules_shas = get_modules_shas(self.repo_dirname, set(filter(None, files_modules.values())), shas)
+        self.files_shas = {}
+        for fname, relpath in relpaths.items():
+            sha = shas.get(relpath)
+            module = files_modules[relpath]
+            if sha and module:
+                sha = "%s:%s" % (sha, modules_shas[module])
+            self.files_shas[fname] = sha
+
+    def pending_files(self, stage, files):
+        """Files that did not pass the stage yet for their current content"""
+        stage_shas = self.stages.get(stage, {})
+        pending = [
+            fname
+            for fname in files
+            if not self.files_shas.get(fname) or stage_shas.get(self.relpath(fname)) != self.files_shas[fname]
+        ]
+        if len(pending) != len(files):
+            _logger.info(
+                "Skipping %d file(s) that already passed the %s checks (results cache)",
+                len(files) - len(pending),
+                stage,
+            )
+        return pending
+
+    def record_passed(self, stage, files):
+        stage_shas = self.stages.setdefault(stage, {})
+        for fname in files:
+            if self.files_shas.get(fname):
+                stage_shas[self.relpath(fname)] = self.files_shas[fname]
+
+    def save(self):
+        make_cache_dir(self.path.parent)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"key": self.key, "stages": self.stages}), encoding="utf-8")
+        tmp_path.replace(self.path)
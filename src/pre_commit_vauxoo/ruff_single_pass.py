@@ -0,0 +1,415 @@
+"""Run ruff-odoo once for all the lint severities ("--ruff-single-pass")
+
+The mandatory, optional and experimental ruff-odoo hooks run ruff over the same files
+with their own .ruff*.toml, so each file is parsed once per severity. In this mode:
+
+- ruff runs once (using the environment of the hook already installed by pre-commit)
+  selecting the union of the rules of the severities. Each setting takes the value of the
+  severity selecting the rules using it (e.g. max-complexity is used only by C901).
+- Each diagnostic is assigned to the severities whose configuration reports it (their
+  select, ignore and per-file-ignores and the files routed to their hook) and reported
+  as part of their stage. The experimental ones (--exit-zero) never fail.
+- The stages run with SKIP=ruff-check so pre-commit does not run the hooks again.
+
+The autofix ruff hook still runs in its own stage since that it needs to write the
+files fixed before the lint checks. If the single pass can not be prepared (e.g. the hook
+is not installed yet or a setting used by the rules of several severities has different
+values) the hooks run as usual.
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import pathlib
+import posixpath
+import subprocess
+
+from . import hooks_routing
+from .results_cache import git_z_output, make_cache_dir
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+RUFF_HOOK_ID = "ruff-check"
+RUFF_RULES_FILENAME = "ruff-rules.json"
+SINGLE_PASS_CONFIG_FILENAME = "ruff-single-pass.toml"
+# The keys of the rules selected by each severity, all the other ones are settings merged
+SELECTION_KEYS = ("select", "extend-select", "ignore", "extend-ignore", "per-file-ignores", "extend-per-file-ignores")
+# Files per ruff command to keep the command line short
+RUFF_FILES_PER_COMMAND = 1000
+# The rules (selectors of their codes or names) using the setting. The other settings of the
+# [lint.<linter>] tables are used by the rules of their linter and the rest by all the rules
+SETTING_RULES = {
+    "lint.flake8-bandit.allowed-markup-calls": ["S704"],
+    "lint.flake8-bandit.check-typed-exception": ["S110", "S112"],
+    "lint.mccabe.max-complexity": ["C901"],
+    "lint.odoo.category-allowed": ["category-allowed"],
+    "lint.odoo.license-allowed": ["license-allowed"],
+    "lint.odoo.manifest-deprecated-keys": ["manifest-deprecated-key"],
+    "lint.odoo.manifest-required-authors": ["manifest-required-author"],
+    "lint.odoo.odoo-required-files": ["missing-odoo-file"],
+    "lint.pycodestyle.max-doc-length": ["W505"],
+    "lint.pycodestyle.max-line-length": ["E501"],
+    "lint.pylint.max-args": ["PLR0913"],
+    "lint.pylint.max-bool-expr": ["PLR0916"],
+    "lint.pylint.max-branches": ["PLR0912"],
+    "lint.pylint.max-locals": ["PLR0914"],
+    "lint.pylint.max-nested-blocks": ["PLR1702"],
+    "lint.pylint.max-positional-args": ["PLR0917"],
+    "lint.pylint.max-public-methods": ["PLR0904"],
+    "lint.pylint.max-returns": ["PLR0911"],
+    "lint.pylint.max-statements": ["PLR0915"],
+}
+LINTER_RULES = {
+    "flake8-bandit": ["S"],
+    "flake8-builtins": ["A"],
+    "isort": ["I"],
+    "mccabe": ["C90"],
+    "pycodestyle": ["E", "W"],
+    "pylint": ["PL"],
+}
+# A setting missing in a severity (its default value)
+MISSING = object()
+
+
+class SinglePassError(Exception):
+    """The single pass can not run so the ruff hooks run as usual"""
+
+
+def load_toml(path):
+    try:
+        import tomllib  # ruff: ignore[import-outside-top-level]
+    except ImportError as error:  # python < 3.11
+        raise SinglePassError("tomllib is not available") from error
+    try:
+        with open(path, "rb") as f_toml:
+            return tomllib.load(f_toml)
+    except (OSError, tomllib.TOMLDecodeError) as error:
+        raise SinglePassError("Unable to read %s: %s" % (path, error)) from error
+
+
+def dump_toml(data, table=()):
+    """TOML of the settings (tables, strings, numbers, booleans and lists of them)"""
+    lines = []
+    tables = []
+    for key, value in data.items():
+        if isinstance(value, dict):
+            tables.append((key, value))
+        else:
+            # The JSON values of those types are valid TOML values
+            lines.append("%s = %s" % (json.dumps(key), json.dumps(value)))
+    for key, value in tables:
+        lines.append("\n[%s]" % ".".join(json.dumps(name) for name in table + (key,)))
+        lines.append(dump_toml(value, table + (key,)))
+    return "\n".join(lines)
+
+
+def flatten_settings(settings, path=()):
+    """The values of the settings {(table, ..., key): value}"""
+    flat = {}
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            flat.update(flatten_settings(value, path + (key,)))
+        else:
+            flat[path + (key,)] = value
+    return flat
+
+
+def get_setting_selectors(path):
+    """Selectors of the rules using the setting (None if all the rules use it)"""
+    setting = ".".join(path)
+    if setting in SETTING_RULES:
+        return SETTING_RULES[setting]
+    if len(path) > 2 and path[0] == "lint":
+        return LINTER_RULES.get(path[1])
+    return None
+
+
+class Severity:
+    """The ruff-odoo hook of a stage with the rules selected by its configuration file"""
+
+    def __init__(self, stage, pre_commit_config, hook, config):
+        self.stage = stage
+        self.pre_commit_config = pre_commit_config
+        self.hook = hook
+        self.name = hook.get("name") or RUFF_HOOK_ID
+        # e.g. the experimental checks do not affect the status of the stage
+        self.exit_zero = "--exit-zero" in hook.get("args", [])
+        self.settings = config
+        lint = config.get("lint", {})
+        self.select = list(lint.get("select", [])) + list(lint.get("extend-select", []))
+        self.ignore = list(lint.get("ignore", [])) + list(lint.get("extend-ignore", []))
+        self.per_file_ignores = dict(lint.get("per-file-ignores", {}), **lint.get("extend-per-file-ignores", {}))
+        self.relpaths = set()
+
+    @staticmethod
+    def get_specificity(selector, code, rule):
+        """How specific the selector matching the rule is (0 if it does not match it) as ruff resolves them
+
+        rule is (name, prefix) where prefix is the shortest prefix selecting it (e.g. "E" selects
+        "E501" but not "EM101" and "PL" selects "PLE0237")
+        """
+        name, prefix = rule
+        if selector in (code, name):
+            return len(code) + 1
+        if selector == "ALL":
+            return 1
+        return len(selector) + 1 if code.startswith(selector) and len(selector) >= len(prefix) else 0
+
+    def is_selected(self, code, rule, selectors_ignored=()):
+        """The rule is selected by the most specific selector (an ignore wins a tie)"""
+        select = max((self.get_specificity(selector, code, rule) for selector in self.select), default=0)
+        ignore = max(
+            (self.get_specificity(selector, code, rule) for selector in [*self.ignore, *selectors_ignored]),
+            default=0,
+        )
+        return select > ignore
+
+    def reports(self, relpath, code, rule):
+        if relpath not in self.relpaths:
+            return False
+        if not code:
+            # e.g. the syntax errors are reported whatever the rules selected
+            return True
+        file_ignores = [
+            selector
+            for pattern, selectors in self.per_file_ignores.items()
+            if match_pattern(relpath, pattern)
+            for selector in selectors
+        ]
+        return self.is_selected(code, rule, file_ignores)
+
+
+def match_pattern(relpath, pattern):
+    """The file matches a per-file-ignores pattern (a glob of its path or of its name)"""
+    negated = pattern.startswith("!")
+    pattern = pattern.lstrip("!")
+    matched = (
+        fnmatch.fnmatchcase(relpath, pattern)
+        or fnmatch.fnmatchcase(posixpath.basename(relpath), pattern)
+        # "**/" matches the files of the root too
+        or (pattern.startswith("**/") and fnmatch.fnmatchcase(relpath, pattern[3:]))
+    )
+    return matched != negated
+
+
+def get_rules(ruff_command, cache_dir):
+    """Rules of ruff {code: (name, prefix)} cached by executable
+
+    prefix is the shortest prefix selecting the rule: the common prefix of the codes of its
+    linter (e.g. "PL" for "PLC", "PLE", ...) or the letters of its code (e.g. "E" of "E501")
+    """
+    executable = ruff_command[0]
+    cache_path = pathlib.Path(cache_dir, RUFF_RULES_FILENAME)
+    stamp = [executable, os.stat(executable).st_mtime_ns]
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cache["stamp"] == stamp:
+            return {code: tuple(rule) for code, rule in cache["rules"].items()}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    try:
+        ruff_rules = [
+            (rule["code"], rule["name"], rule.get("linter"))
+            for rule in run_ruff([executable, "rule", "--all", "--output-format=json"])
+        ]
+    except (KeyError, TypeError) as error:
+        raise SinglePassError("Unable to get the rules of ruff: %s" % error) from error
+    linters_letters = {}
+    for code, _name, linter in ruff_rules:
+        linters_letters.setdefault(linter, set()).add(get_code_letters(code))
+    rules = {}
+    for code, name, linter in ruff_rules:
+        rules[code] = (name, os.path.commonprefix(sorted(linters_letters[linter])) or get_code_letters(code))
+    make_cache_dir(cache_path.parent)
+    cache_path.write_text(json.dumps({"stamp": stamp, "rules": rules}, sort_keys=True), encoding="utf-8")
+    return rules
+
+
+def get_code_letters(code):
+    return code.rstrip("0123456789")
+
+
+def run_ruff(command, repo_dirname=None):
+    """Output of ruff using the JSON output format (e.g. the diagnostics)"""
+    try:
+        output = subprocess.check_output(command, cwd=repo_dirname)
+        return json.loads(output or b"[]")
+    except (OSError, subprocess.CalledProcessError, ValueError) as error:
+        raise SinglePassError("Unable to run ruff: %s" % error) from error
+
+
+def prepare(repo_dirname, pre_commit_cfgs, pre_commit_home):
+    """The ruff command and the severities of the ruff-odoo hooks of the stages {stage: pre_commit_cfg}
+
+    Raise SinglePassError if the single pass can not run
+    """
+    severities = []
+    repos = set()
+    for stage, pre_commit_cfg in pre_commit_cfgs.items():
+        try:
+            pre_commit_config = hooks_routing.get_hook_config(pre_commit_cfg, RUFF_HOOK_ID)
+            hooks = hooks_routing.get_config_hooks(pre_commit_config, pre_commit_home)
+        except hooks_routing.UnknownHook as error:
+            raise SinglePassError(str(error)) from error
+        repos |= {(repo.get("repo"), repo.get("rev")) for repo in pre_commit_config["repos"]}
+        for hook in hooks:
+            if hook["id"] != RUFF_HOOK_ID:
+                continue
+            config_paths = [arg.split("=", 1)[1] for arg in hook.get("args", []) if arg.startswith("--config=")]
+            if len(config_paths) != 1:
+                raise SinglePassError("The hook %s of %s has not one configuration file" % (hook.get("name"), stage))
+            config = load_toml(os.path.join(repo_dirname, config_paths[0]))
+            severities.append(Severity(stage, pre_commit_config, hook, config))
+    if not severities:
+        raise SinglePassError("There are no ruff-odoo hooks")
+    if len(repos) > 1:
+        raise SinglePassError("The ruff-odoo hooks use different versions")
+    ((repo, rev),) = repos
+    try:
+        ruff_command = hooks_routing.get_hook_command(pre_commit_home, repo, rev, RUFF_HOOK_ID)
+    except hooks_routing.UnknownHook as error:
+        raise SinglePassError(str(error)) from error
+    return ruff_command, severities
+
+
+def get_owners(severities, settings, rules):
+    """Severity whose value takes each setting with different values (or missing in a severity)
+
+    Raise SinglePassError if the rules using the setting are selected in several severities
+    """
+    owners = {}
+    for path in sorted(set().union(*settings)):
+        values = [flat.get(path, MISSING) for flat in settings]
+        if all(value == values[0] for value in values):
+            continue
+        selectors = get_setting_selectors(path)
+        setting_owners = [
+            severity
+            for severity in severities
+            if any(
+                severity.is_selected(code, rule)
+                for code, rule in rules.items()
+                if selectors is None or any(Severity.get_specificity(selector, code, rule) for selector in selectors)
+            )
+        ]
+        if len(setting_owners) > 1:
+            raise SinglePassError(
+                "The setting %s has different values for %s"
+                % (".".join(path), " and ".join(severity.name for severity in setting_owners))
+            )
+        # The value of the first severity (e.g. mandatory) if none of them uses it
+        owners[path] = setting_owners[0] if setting_owners else severities[0]
+    return owners
+
+
+def get_single_pass_config(severities, rules):
+    """Settings of the severities selecting the union of their rules
+
+    Each setting takes the value of the severity selecting the rules using it (see get_owners)
+    """
+    settings = [
+        {
+            path: value
+            for path, value in flatten_settings(severity.settings).items()
+            if path[0] != "lint" or path[1] not in SELECTION_KEYS
+        }
+        for severity in severities
+    ]
+    owners = get_owners(severities, settings, rules)
+    merged = {}
+    for path in sorted(set().union(*settings)):
+        owner_settings = settings[severities.index(owners[path])] if path in owners else settings[0]
+        if path not in owner_settings:
+            # The default value
+            continue
+        table = merged
+        for key in path[:-1]:
+            table = table.setdefault(key, {})
+        table[path[-1]] = owner_settings[path]
+    selectors = {selector for severity in severities for selector in severity.select}
+    merged.setdefault("lint", {})["select"] = sorted(selectors)
+    return merged
+
+
+def run_single_pass(repo_dirname, files, pre_commit_cfgs, pre_commit_home, cache_dir):
+    """Run ruff once for the ruff-odoo hooks of the stages {stage: pre_commit_cfg}
+
+    files=None checks all the files of the repository
+    Return a list of tuples (severity, diagnostics) or raise SinglePassError if it can not run
+    """
+    ruff_command, severities = prepare(repo_dirname, pre_commit_cfgs, pre_commit_home)
+    rules = get_rules(ruff_command, cache_dir)
+    single_pass_config = get_single_pass_config(severities, rules)
+    if files is None:
+        relpaths = git_z_output(["ls-files", "-z"], repo_dirname)
+    else:
+        relpaths = [pathlib.Path(os.path.relpath(os.path.abspath(fname), repo_dirname)).as_posix() for fname in files]
+    # The files of each hook filtered as pre-commit does (e.g. only python files and the exclude regex)
+    files_tags = hooks_routing.get_files_tags(repo_dirname, relpaths)
+    for severity in severities:
+        routing = hooks_routing.route_files(severity.pre_commit_config, [severity.hook], files_tags)
+        severity.relpaths = set(routing[RUFF_HOOK_ID])
+    relpaths = sorted(set().union(*(severity.relpaths for severity in severities)))
+    results = [(severity, []) for severity in severities]
+    if not relpaths:
+        return results
+    config_path = pathlib.Path(cache_dir, SINGLE_PASS_CONFIG_FILENAME)
+    make_cache_dir(config_path.parent)
+    config_path.write_text(dump_toml(single_pass_config) + "\n", encoding="utf-8")
+    _logger.info(
+        "Running ruff-odoo once for %s on %d file(s)",
+        ", ".join(severity.name for severity in severities),
+        len(relpaths),
+    )
+    diagnostics = []
+    for index in range(0, len(relpaths), RUFF_FILES_PER_COMMAND):
+        diagnostics += run_ruff(
+            ruff_command
+            + ["--config=%s" % config_path, "--output-format=json", "--exit-zero", "--"]
+            + relpaths[index : index + RUFF_FILES_PER_COMMAND],
+            repo_dirname,
+        )
+    for diagnostic in diagnostics:
+        relpath = pathlib.Path(os.path.relpath(diagnostic["filename"], repo_dirname)).as_posix()
+        code = diagnostic.get("code") or ""
+        rule = rules.get(code) or ("", get_code_letters(code))
+        for severity, severity_diagnostics in results:
+            if severity.reports(relpath, code, rule):
+                severity_diagnostics.append(dict(diagnostic, relpath=relpath))
+    return results
+
+
+def format_diagnostic(diagnostic):
+    location = diagnostic.get("location") or {}
+    return "%s:%s:%s: %s %s" % (
+        diagnostic["relpath"],
+        location.get("row"),
+        location.get("column"),
+        diagnostic.get("code") or "",
+        diagnostic.get("message"),
+    )
+
+
+def report(results, stage):
+    """Show the diagnostics of the severities of the stage returning the status of the stage
+
+    The status is 1 if there are diagnostics of a severity affecting it (not --exit-zero)
+    """
+    status = 0
+    for severity, diagnostics in results:
+        if severity.stage != stage:
+            continue
+        if not diagnostics:
+            _logger.info("%s (single pass): Passed", severity.name)
+            continue
+        log = _logger.info if severity.exit_zero else _logger.error
+        log(
+            "%s (single pass): %d error(s)\n%s",
+            severity.name,
+            len(diagnostics),
+            "\n".join(format_diagnostic(diagnostic) for diagnostic in diagnostics),
+        )
+        if not severity.exit_zero:
+            status = 1
+    return status
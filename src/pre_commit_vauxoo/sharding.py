@@ -0,0 +1,93 @@
+"""Split the files to check across several CI jobs ("--shard INDEX/TOTAL")
+
+The files of the same Odoo module are never split since pylint-odoo needs the whole
+module (e.g. the manifest) to check them, so the units to split are the modules and
+the files outside of any module.
+
+Each unit costs its size in bytes (plus an overhead per file). The units are assigned
+from the most expensive one to the shard with less cost so far (ties are resolved by
+the unit path and the shard index), so the split only depends on the files of the
+checkout and all the jobs get the same split without sharing anything (e.g. a cache).
+"""
+
+import logging
+import os
+import pathlib
+
+from . import odoo_modules
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+# A file costs at least it even if it is empty since the hooks still need to process it
+FILE_COST_OVERHEAD = 1024
+
+
+def parse_shard(value):
+    """Convert "INDEX/TOTAL" (1-based index) to a tuple (index, total)"""
+    index, sep, total = value.partition("/")
+    if not sep or not index.strip().isdigit() or not total.strip().isdigit():
+        raise ValueError("Invalid shard '%s'. Expected INDEX/TOTAL (e.g. 1/3)" % value)
+    index, total = int(index), int(total)
+    if not 1 <= index <= total:
+        raise ValueError("Invalid shard '%s'. INDEX should be between 1 and TOTAL" % value)
+    return index, total
+
+
+def get_units(relpaths, module_dirs):
+    """Group the files by the Odoo module containing them (module_dirs of the modules index)
+
+    Return a dict {unit: [relpath, ...]} where the unit is the path of the module or
+    the path of the file itself if it is not part of a module
+    """
+    units = {}
+    for relpath in relpaths:
+        units.setdefault(odoo_modules.get_file_module(relpath, module_dirs) or relpath, []).append(relpath)
+    return units
+
+
+def get_units_size(repo_dirname, units):
+    units_size = {}
+    for unit, relpaths in units.items():
+        size = 0
+        for relpath in relpaths:
+            try:
+                size += os.path.getsize(os.path.join(repo_dirname, relpath))
+            except OSError:
+                pass
+            size += FILE_COST_OVERHEAD
+        units_size[unit] = size
+    return units_size
+
+
+def split_units(units_cost, total):
+    """Assign the units to total shards balancing their cost (greedy longest processing time first)
+
+    Return a list with the set of units of each shard
+    """
+    shards = [set() for _shard in range(total)]
+    shards_cost = [0] * total
+    for unit in sorted(units_cost, key=lambda unit: (-units_cost[unit], unit)):
+        shard = min(range(total), key=lambda shard: (shards_cost[shard], shard))
+        shards[shard].add(unit)
+        shards_cost[shard] += units_cost[unit]
+    return shards
+
+
+def get_shard_files(repo_dirname, files, index, total, modules_index):
+    """Files of the shard index (1-based) of total"""
+    relpaths = {
+        fname: pathlib.Path(os.path.relpath(os.path.abspath(fname), repo_dirname)).as_posix() for fname in files
+    }
+    units = get_units(sorted(set(relpaths.values())), set(modules_index))
+    shards = split_units(get_units_size(repo_dirname, units), total)
+    shard_units = shards[index - 1]
+    shard_relpaths = {relpath for unit in shard_units for relpath in units[unit]}
+    _logger.info(
+        "Running the shard %d/%d: %d of %d unit(s) (Odoo modules or files) with %d file(s)",
+        index,
+        total,
+        len(shard_units),
+        len(units),
+        len(shard_relpaths),
+    )
+    return [fname for fname in files if relpaths[fname] in shard_relpaths]
@@ -0,0 +1,150 @@
+"""Timeline of a run in the Chrome trace-event format ("--trace-file")
+
+The file can be opened using https://ui.perfetto.dev or chrome://tracing
+Each span is a "complete" event ("ph": "X") with its start and duration in microseconds
+and the thread running it, so the stages running in parallel are shown in separated rows.
+
+The hooks of a pre-commit stage are not run by this process, so their spans are built
+from the output of pre-commit: a hook finishes when its status line
+(e.g. "black......Passed") is printed and it started when the previous one finished.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+ANSI_ESCAPE_RE = re.compile(rb"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+HOOK_STATUS_RE = re.compile(rb"^(?P<name>\S.*?)\.{3,}(?:\([^)]*\))?(?P<status>Passed|Failed|Skipped)\s*$")
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.origin = time.perf_counter()
+        self.threads = {}
+
+    def enable(self):
+        self.enabled = True
+        self.events = []
+        self.origin = time.perf_counter()
+
+    def get_tid(self):
+        """Short id for the current thread so the trace viewers show 1, 2, 3... rows"""
+        return self.threads.setdefault(threading.get_ident(), len(self.threads) + 1)
+
+    def add_span(self, name, start, end, cat="run", args=None, tid=None):
+        if not self.enabled:
+            return
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((start - self.origin) * 1e6),
+            "dur": round((end - start) * 1e6),
+            "pid": os.getpid(),
+            "tid": tid or self.get_tid(),
+            "args": args or {},
+        })
+
+    @contextlib.contextmanager
+    def span(self, name, cat="run", args=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter(), cat, args)
+
+    def save(self, trace_file):
+        with open(trace_file, "w", encoding="utf-8") as f_trace:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f_trace)
+
+
+TRACER = Tracer()
+
+
+def span(name, cat="run", args=None):
+    return TRACER.span(name, cat, args)
+
+
+def traced(meth):
+    """Decorator adding a span with the name of the function"""
+
+    @functools.wraps(meth)
+    def wrapper(*args, **kwargs):
+        with TRACER.span(meth.__name__):
+            return meth(*args, **kwargs)
+
+    return wrapper
+
+
+def with_trace_file(meth):
+    """Decorator enabling the trace if there is a "trace_file" parameter and saving it at the end
+
+    It is saved even if the method exits using sys.exit
+    """
+
+    @functools.wraps(meth)
+    def wrapper(*args, trace_file=None, **kwargs):
+        if not trace_file:
+            return meth(*args, **kwargs)
+        TRACER.enable()
+        try:
+            with TRACER.span(meth.__name__):
+                return meth(*args, **kwargs)
+        finally:
+            TRACER.save(trace_file)
+
+    return wrapper
+
+
+def call_with_hook_spans(command, stdout=None, popen_callback=None, start_new_session=False):
+    """Run the pre-commit command adding a span for each hook reported by its output
+
+    The output (stdout and stderr merged) is forwarded to stdout (or the file object)
+    while it is read, so it is shown in the terminal at the same time than without trace
+    popen_callback(process) is called with the process started (e.g. to kill it)
+    """
+    tid = TRACER.get_tid()
+    output = stdout if stdout is not None else getattr(sys.stdout, "buffer", None)
+    if stdout is None:
+        sys.stdout.flush()
+    with subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=start_new_session
+    ) as process:
+        if popen_callback:
+            popen_callback(process)
+        hook_start = time.perf_counter()
+        line = b""
+        while True:
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                break
+            if output is not None:
+                output.write(chunk)
+                output.flush()
+            else:
+                sys.stdout.write(chunk.decode(sys.stdout.encoding or "utf-8", errors="replace"))
+                sys.stdout.flush()
+            *lines, line = (line + chunk).split(b"\n")
+            for full_line in lines:
+                hook_status = HOOK_STATUS_RE.match(ANSI_ESCAPE_RE.sub(b"", full_line).strip())
+                if not hook_status:
+                    continue
+                hook_end = time.perf_counter()
+                TRACER.add_span(
+                    hook_status.group("name").decode(errors="replace").strip(),
+                    hook_start,
+                    hook_end,
+                    cat="hook",
+                    args={"status": hook_status.group("status").decode()},
+                    tid=tid,
+                )
+                hook_start = hook_end
+        return process.wait()
@@ -0,0 +1,190 @@
+"""Watch the working tree of the repository for the "--watch" mode
+
+inotify is used in linux (through ctypes to avoid an extra dependency) and the other
+platforms (or if inotify is not available e.g. the max number of watches was reached)
+fallback to poll the mtime and size of the files of the repository.
+
+Both watchers report the paths changed relative to the root of the repository.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import pathlib
+import select
+import struct
+import time
+
+from .results_cache import git_z_output
+
+_logger = logging.getLogger("pre-commit-vauxoo")
+
+# Seconds without new changes to consider a burst of saves finished
+DEBOUNCE_SECONDS = 0.2
+POLLING_INTERVAL_SECONDS = 0.5
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def get_repo_files(repo_dirname):
+    """Files tracked and untracked (but not ignored) of the repository"""
+    return git_z_output(["ls-files", "-z", "--cached", "--others", "--exclude-standard"], repo_dirname)
+
+
+class PollingWatcher:
+    def __init__(self, repo_dirname, interval=POLLING_INTERVAL_SECONDS):
+        self.repo_dirname = repo_dirname
+        self.interval = interval
+        self.snapshot = self.get_snapshot()
+
+    def get_snapshot(self):
+        snapshot = {}
+        for relpath in get_repo_files(self.repo_dirname):
+            try:
+                stat = os.stat(os.path.join(self.repo_dirname, relpath))
+            except OSError:
+                continue
+            snapshot[relpath] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read_changes(self, timeout=None):
+        """Wait up to timeout seconds (None is forever) for changes returning the paths changed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.get_snapshot()
+            changes = {
+                relpath
+                for relpath in set(snapshot) | set(self.snapshot)
+                if snapshot.get(relpath) != self.snapshot.get(relpath)
+            }
+            self.snapshot = snapshot
+            if changes:
+                return changes
+            remaining = self.interval if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, repo_dirname):
+        self.repo_dirname = repo_dirname
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.inotify_fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.inotify_fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor: directory relative to the root of the repository
+        self.watches = {}
+        try:
+            # inotify is not recursive so it watches each directory with files of the repository
+            reldirs = {""}
+            for relpath in get_repo_files(repo_dirname):
+                reldir = os.path.dirname(relpath)
+                while reldir not in reldirs:
+                    reldirs.add(reldir)
+                    reldir = os.path.dirname(reldir)
+            for reldir in sorted(reldirs):
+                self.add_watch(reldir)
+        except BaseException:
+            self.close()
+            raise
+
+    def add_watch(self, reldir):
+        path = os.path.join(self.repo_dirname, reldir)
+        wd = self.libc.inotify_add_watch(self.inotify_fd, os.fsencode(path), INOTIFY_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOENT:
+                # Removed before it was watched
+                return
+            raise OSError(error, "inotify_add_watch failed for %s" % path)
+        self.watches[wd] = reldir
+
+    def add_new_dir(self, reldir):
+        """Watch a new directory and report its files created before it was watched"""
+        changes = set()
+        for dirpath, dirnames, filenames in os.walk(os.path.join(self.repo_dirname, reldir)):
+            dirnames[:] = [dirname for dirname in dirnames if dirname != ".git"]
+            reldirpath = os.path.relpath(dirpath, self.repo_dirname)
+            self.add_watch(reldirpath)
+            changes.update(pathlib.Path(reldirpath, filename).as_posix() for filename in filenames)
+        return changes
+
+    def read_changes(self, timeout=None):
+        """Wait up to timeout seconds (None is forever) for changes returning the paths changed"""
+        ready, _, _ = select.select([self.inotify_fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = b""
+        while True:
+            try:
+                data += os.read(self.inotify_fd, 65536)
+            except BlockingIOError:
+                break
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                _logger.warning("Too many changes at the same time. Some of them could be missed by the watcher")
+                continue
+            if wd not in self.watches or not name:
+                continue
+            relpath = pathlib.Path(self.watches[wd], name).as_posix()
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name != ".git":
+                    changes |= self.add_new_dir(relpath)
+                continue
+            changes.add(relpath)
+        return changes
+
+    def close(self):
+        os.close(self.inotify_fd)
+
+
+def get_watcher(repo_dirname):
+    try:
+        watcher = InotifyWatcher(repo_dirname)
+    except (OSError, AttributeError) as inotify_error:
+        # AttributeError: There is not inotify_init1 in the libc e.g. macOS
+        _logger.info("Watching the files using polling since inotify is not available: %s", inotify_error)
+        return PollingWatcher(repo_dirname)
+    _logger.info("Watching %d directories using inotify", len(watcher.watches))
+    return watcher
+
+
+def wait_changes(watcher, debounce=DEBOUNCE_SECONDS, changes=None):
+    """Wait for a burst of saves returning all the paths changed by it
+
+    The changes are collected until there are no new changes during "debounce" seconds
+    so saving several files at the same time (e.g. "git checkout" or the "save all" of an editor)
+    returns them together only once
+    "changes" are the changes already known so it does not wait for the first one
+    """
+    changes = set(changes or ())
+    while not changes:
+        changes = watcher.read_changes()
+    while True:
+        new_changes = watcher.read_changes(debounce)
+        if not new_changes:
+            return changes
+        changes |= new_changes
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import json
 import logging
 import os
 import posixpath
 import re
 import shutil
+import signal
+import sqlite3
 import subprocess
+import sys
 import tempfile
+import threading
+import time
 from configparser import ConfigParser
 from contextlib import contextmanager, redirect_stdout
 from io import StringIO
@@ -19,6 +25,7 @@ except ImportError:
 
 from distutils.dir_util import copy_tree  # pylint:disable=deprecated-module
 
+import copier
 import pytest
 from click.testing import CliRunner
 from jinja2 import Environment, FileSystemLoader
@@ -26,7 +33,18 @@ from pylint.config.config_initialization import _config_initialization
 from pylint.lint import PyLinter, Run
 from yaml import Loader, load
 
+from pre_commit_vauxoo import daemon as pre_commit_vauxoo_daemon
+from pre_commit_vauxoo import exclusions as pre_commit_vauxoo_exclusions
+from pre_commit_vauxoo import hooks_routing as pre_commit_vauxoo_hooks_routing
+from pre_commit_vauxoo import odoo_modules as pre_commit_vauxoo_odoo_modules
+from pre_commit_vauxoo import pre_commit_files as pre_commit_vauxoo_files
 from pre_commit_vauxoo import pre_commit_vauxoo
+from pre_commit_vauxoo import pylint_ruff as pre_commit_vauxoo_pylint_ruff
+from pre_commit_vauxoo import pylint_single_pass as pre_commit_vauxoo_pylint_single_pass
+from pre_commit_vauxoo import renderer as pre_commit_vauxoo_renderer
+from pre_commit_vauxoo import ruff_single_pass as pre_commit_vauxoo_ruff_single_pass
+from pre_commit_vauxoo import tracing as pre_commit_vauxoo_tracing
+from pre_commit_vauxoo import watcher as pre_commit_vauxoo_watcher
 from pre_commit_vauxoo.cli import main
 from pre_commit_vauxoo.hooks.check_commit_msg import (
     check_commit_messages_since_version,
@@ -74,6 +92,31 @@ VERSIONED_OPTIONAL_CHECKS = {
     "translation-unsupported-format",
 }
 VERSIONED_AUTOFIX_CHECKS = {"deprecated-self-cr", "prefer-env-translation", "translation-not-lazy"}
+# Startup budget of "import pre_commit_vauxoo.cli" (the git hook and "--version") in CPU seconds
+# so it does not depend on the load of the machine. It was ~0.06s when recorded
+IMPORT_TIME_BUDGET_SECONDS = 0.2
+# Modules only imported by the code paths using them
+LAZY_IMPORTED_MODULES = (
+    "copier",
+    "identify",
+    "importlib.metadata",
+    "jinja2",
+    "pgsanity",
+    "pre_commit",
+    "pre_commit_vauxoo.daemon",
+    "pre_commit_vauxoo.hooks_routing",
+    "pre_commit_vauxoo.odoo_modules",
+    "pre_commit_vauxoo.pre_commit_vauxoo",
+    "pre_commit_vauxoo.pylint_single_pass",
+    "pre_commit_vauxoo.renderer",
+    "pre_commit_vauxoo.results_cache",
+    "pre_commit_vauxoo.ruff_single_pass",
+    "pre_commit_vauxoo.sharding",
+    "pre_commit_vauxoo.tracing",
+    "pre_commit_vauxoo.watcher",
+    "sqlite3",
+    "yaml",
+)
 RUFF_TOML_FILENAMES = (".ruff.toml", ".ruff-optional.toml", ".ruff-experimental.toml", ".ruff-autofix.toml")
 
 
@@ -150,6 +193,9 @@ class TestPreCommitVauxoo:
         self.create_dummy_repo(self.src_path, self.tmp_dir)
         self.maxDiff = None
         os.environ["EXCLUDE_AUTOFIX"] = "module_autofix1/"
+        # The configuration files rendered by other tests are not reused
+        self.user_cache_dir = os.path.realpath(tempfile.mkdtemp(suffix="_pre_commit_vauxoo_cache"))
+        os.environ["PRECOMMIT_VAUXOO_CACHE_DIR"] = self.user_cache_dir
 
     def create_dummy_repo(self, src_path, dest_path):
         copy_tree(src_path, dest_path)
@@ -163,6 +209,7 @@ class TestPreCommitVauxoo:
         # Cleanup temporary files
         if Path(self.tmp_dir).is_dir() and self.tmp_dir != "/":
             shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        shutil.rmtree(self.user_cache_dir, ignore_errors=True)
         # reset environment variables
         os.environ.clear()
         os.environ.update(self.old_environ)
@@ -190,6 +237,16 @@ class TestPreCommitVauxoo:
         diff = set(expected_logs) - formatted_logs
         assert not diff, f"Logs expected not raised {diff}"
 
+    @staticmethod
+    def is_process_running(pid):
+        """The zombie processes (finished but not reaped by their parent yet) are not running"""
+        try:
+            with open("/proc/%s/stat" % pid, encoding="utf-8") as f_stat:
+                # The state is after the name of the command that is between parenthesis
+                return f_stat.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except FileNotFoundError:
+            return False
+
     def get_pylint_messages(self):
         output = StringIO()
         with redirect_stdout(output):
@@ -571,17 +628,18 @@ class TestPreCommitVauxoo:
         ruff_toml = Path(self.tmp_dir) / CFG_SUBFOLDER / ".ruff-autofix.toml"
         with ruff_toml.open("rb") as f_ruff_toml:
             data = tomllib.load(f_ruff_toml)
-            original_ignore = set(data["lint"]["ignore"])
-            assert "print" not in data["lint"]["ignore"], (
-                "print (T201) should not be in ruff ignore when RUFF_DISABLE_CHECKS is not set"
-            )
-            os.environ["RUFF_DISABLE_CHECKS"] = "print"
-            self.runner.invoke(main, ["--only-cp-cfg"])
-            f_ruff_toml.seek(0)
+        original_ignore = set(data["lint"]["ignore"])
+        assert "print" not in data["lint"]["ignore"], (
+            "print (T201) should not be in ruff ignore when RUFF_DISABLE_CHECKS is not set"
+        )
+        os.environ["RUFF_DISABLE_CHECKS"] = "print"
+        self.runner.invoke(main, ["--only-cp-cfg"])
+        # The file is replaced (not written in place) so it is opened again
+        with ruff_toml.open("rb") as f_ruff_toml:
             data = tomllib.load(f_ruff_toml)
-            disable_ignore = set(data["lint"]["ignore"])
-            diff = disable_ignore - original_ignore
-            assert {"print"} == diff, "print (T201) should be in ruff ignore when RUFF_DISABLE_CHECKS is set"
+        disable_ignore = set(data["lint"]["ignore"])
+        diff = disable_ignore - original_ignore
+        assert {"print"} == diff, "print (T201) should be in ruff ignore when RUFF_DISABLE_CHECKS is set"
 
     def test_disable_pylint_checks_migrated_to_ruff(self, caplog):
         if (
@@ -616,6 +674,30 @@ class TestPreCommitVauxoo:
                 "when PYLINT_DISABLE_CHECKS is set"
             )
 
+    def test_pylint_ruff_index(self):
+        """The index packaged is in sync with the annotations of the templates"""
+        assert pre_commit_vauxoo_pylint_ruff.parse_templates() == pre_commit_vauxoo_pylint_ruff.load_index(), (
+            "The pylint-ruff index is outdated. Run 'python -m pre_commit_vauxoo.pylint_ruff' to generate it again"
+        )
+        assert pre_commit_vauxoo_pylint_ruff.get_ruff_codes("dangerous-default-value") == ("B006",)
+        assert not pre_commit_vauxoo_pylint_ruff.get_ruff_codes("unknown-check")
+
+    def test_explain_check(self, caplog):
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result = self.runner.invoke(main, ["--explain-check", "dangerous-default-value"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert "pylint dangerous-default-value (mandatory .pylintrc) -> ruff B006" in caplog.text
+
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result = self.runner.invoke(main, ["--explain-check", "b006"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert "pylint dangerous-default-value " in caplog.text, "The pylint check of the ruff code was not shown"
+
+        result = self.runner.invoke(main, ["--explain-check", "unknown-check"])
+        assert result.exit_code == 1, "An unknown check should exit with error"
+        assert not (Path(self.tmp_dir) / CFG_SUBFOLDER).exists(), "The configuration files should not be copied"
+
     @staticmethod
     def uses_ruff():
         """The compatibility matrix enables ruff, so the checks migrated to it run from ruff"""
@@ -1003,7 +1085,7 @@ class TestPreCommitVauxoo:
             f_content.write(content)
         return relpath
 
-    def invoke_scope(self, monkeypatch, argv):
+    def invoke_scope(self, monkeypatch, argv, **invoke_kwargs):
         """Invoke the CLI without running the real hooks
 
         The configuration files and the hooks are not needed to check which files are
@@ -1017,7 +1099,7 @@ class TestPreCommitVauxoo:
 
         monkeypatch.setattr(pre_commit_vauxoo, "subprocess_call", stub_subprocess_call)
         monkeypatch.setattr(pre_commit_vauxoo, "copy_cfg_files", lambda *args, **kwargs: None)
-        result = self.runner.invoke(main, argv)
+        result = self.runner.invoke(main, argv, **invoke_kwargs)
         run_commands = [command for command in commands if command[:2] == ["pre-commit", "run"]]
         return result, run_commands
 
@@ -1079,6 +1161,425 @@ class TestPreCommitVauxoo:
         assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
         assert not run_commands, "The hooks were run without files to check"
 
+    def test_scope_diff_excluded(self, monkeypatch, caplog):
+        """The files of EXCLUDE_LINT are not sent to pre-commit and only them does not run the hooks"""
+        self.git_commit_all()
+        os.environ["EXCLUDE_LINT"] = "module_example1/,module_warnings1/models/models.py"
+        self.write_file("module_example1/models/models.py")
+        self.write_file("module_warnings1/models/models.py")
+        changed = self.write_file("module_warnings1/__init__.py")
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert "Excluded 2 file(s) of EXCLUDE_LINT" in caplog.text
+        assert run_commands, "The hooks were not run"
+        for run_command in run_commands:
+            assert self.scope_files(run_command) == [changed], "The files of EXCLUDE_LINT were sent to pre-commit"
+
+        self.git_commit_all()
+        self.write_file("module_example1/models/models.py")
+        expected_logs = ["WARNING:pre-commit-vauxoo:All the files to check are excluded. Nothing to do."]
+        with self.custom_assert_logs("pre-commit-vauxoo", level="WARNING", expected_logs=expected_logs, caplog=caplog):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert not run_commands, "The hooks were run without files to check"
+
+    def test_scope_skip_idle_stages(self, monkeypatch, caplog):
+        """The stages whose hooks match none of the files to check are not started"""
+        os.environ["PRECOMMIT_HOOKS_TYPE"] = "all"
+        cfg_subfolder = Path(self.tmp_dir) / CFG_SUBFOLDER
+        cfg_subfolder.mkdir(exist_ok=True)
+        local_hook = (
+            "repos:\n  - repo: local\n    hooks:\n      - {id: %s, name: %s, entry: 'true', language: system, %s}\n"
+        )
+        (cfg_subfolder / ".pre-commit-config.yaml").write_text(local_hook % ("py", "py", r"files: '\.py$'"))
+        (cfg_subfolder / ".pre-commit-config-optional.yaml").write_text(local_hook % ("py", "py", "types: [python]"))
+        (cfg_subfolder / ".pre-commit-config-autofix.yaml").write_text(local_hook % ("md", "md", "types: [markdown]"))
+        self.git_commit_all()
+        self.write_file("README.md")
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert [run_command[-1] for run_command in run_commands] == [
+            str(cfg_subfolder / ".pre-commit-config-autofix.yaml")
+        ], "Only the autofix checks should run for a markdown file"
+        assert "Mandatory checks skipped since that none of their hooks match the files to check" in caplog.text
+        assert "Optional checks skipped since that none of their hooks match the files to check" in caplog.text
+
+        self.git_commit_all()
+        self.write_file("module_example1/models/models.py")
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert sorted(run_command[-1] for run_command in run_commands) == [
+            str(cfg_subfolder / ".pre-commit-config-optional.yaml"),
+            str(cfg_subfolder / ".pre-commit-config.yaml"),
+        ], "Only the mandatory and optional checks should run for a python file"
+        assert "Autofix checks skipped" in caplog.text
+
+        # A hook running even without files always starts its stage
+        (cfg_subfolder / ".pre-commit-config-autofix.yaml").write_text(
+            local_hook % ("md", "md", "types: [markdown], always_run: true")
+        )
+        result, run_commands = self.invoke_scope(monkeypatch, ["--diff"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert len(run_commands) == 3, "The stage with a hook always running was not started"
+
+        # "--all" runs all the stages
+        result, run_commands = self.invoke_scope(monkeypatch, [])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert len(run_commands) == 3, "All the stages should run for all the files"
+
+    def test_hooks_routing(self):
+        """The hooks of the repositories cloned by pre-commit use the filters of their manifests"""
+        pre_commit_home = Path(self.tmp_dir) / "pre_commit_home"
+        hooks_repo = pre_commit_home / "repo_hooks"
+        hooks_repo.mkdir(parents=True)
+        (hooks_repo / ".pre-commit-hooks.yaml").write_text(
+            "- {id: py-hook, name: py, entry: py, language: python, types: [python]}\n"
+            "- {id: xml-hook, name: xml, entry: xml, language: python, types_or: [xml, csv]}\n"
+            "- {id: manual-hook, name: manual, entry: manual, language: python, stages: [manual]}\n"
+        )
+        with sqlite3.connect(str(pre_commit_home / "db.db")) as db:
+            db.execute("CREATE TABLE repos (repo TEXT NOT NULL, ref TEXT NOT NULL, path TEXT NOT NULL)")
+            db.execute("INSERT INTO repos VALUES (?, ?, ?)", ("https://hooks", "v1", str(hooks_repo)))
+        pre_commit_cfg = Path(self.tmp_dir) / "pre-commit-config.yaml"
+        pre_commit_cfg.write_text(
+            "exclude: ^module_autofix1/\n"
+            "repos:\n"
+            "  - repo: https://hooks\n"
+            "    rev: v1\n"
+            "    hooks:\n"
+            "      - {id: py-hook, exclude: _sanitized}\n"
+            "      - {id: xml-hook}\n"
+            "      - {id: manual-hook}\n"
+        )
+        relpaths = [
+            "README.md",
+            "module_example1/__init__.py",
+            "module_example1/models/markupsafe_sanitized.py",
+            "module_example1/views/views.xml",
+            "module_autofix1/__init__.py",
+            "not_found.py",
+        ]
+        routing = pre_commit_vauxoo_hooks_routing.get_routing(
+            self.tmp_dir, relpaths, {"mandatory": str(pre_commit_cfg)}, str(pre_commit_home)
+        )
+        assert routing == {
+            "mandatory": {
+                "py-hook": ["module_example1/__init__.py"],
+                "xml-hook": ["module_example1/views/views.xml"],
+            }
+        }
+
+        # The repositories not cloned yet can not be routed
+        pre_commit_cfg.write_text(pre_commit_cfg.read_text().replace("rev: v1", "rev: v2"))
+        routing = pre_commit_vauxoo_hooks_routing.get_routing(
+            self.tmp_dir, relpaths, {"mandatory": str(pre_commit_cfg)}, str(pre_commit_home)
+        )
+        assert routing == {"mandatory": None}, "The stage with hooks unknown should run"
+
+    def fake_hook_store(self, pre_commit_home, hook_id, repo_name, hooks_manifest):
+        """pre-commit store with the repository of the hook of the configuration files installed
+
+        Return the bin directory of its environment
+        """
+        pre_commit_cfg = load(
+            (Path(self.tmp_dir) / CFG_SUBFOLDER / ".pre-commit-config.yaml").read_text(encoding="utf-8"), Loader=Loader
+        )
+        hook_repo = next(
+            repo for repo in pre_commit_cfg["repos"] if any(hook["id"] == hook_id for hook in repo["hooks"])
+        )
+        repo_path = pre_commit_home / repo_name
+        bin_path = repo_path / "py_env-python3" / ("Scripts" if sys.platform == "win32" else "bin")
+        bin_path.mkdir(parents=True)
+        (repo_path / ".pre-commit-hooks.yaml").write_text(hooks_manifest)
+        with sqlite3.connect(str(pre_commit_home / "db.db")) as db:
+            db.execute("CREATE TABLE IF NOT EXISTS repos (repo TEXT NOT NULL, ref TEXT NOT NULL, path TEXT NOT NULL)")
+            db.execute("INSERT INTO repos VALUES (?, ?, ?)", (hook_repo["repo"], hook_repo["rev"], str(repo_path)))
+        return bin_path
+
+    def fake_ruff_store(self, pre_commit_home):
+        """pre-commit store with the ruff-odoo repository of the configuration files installed"""
+        bin_path = self.fake_hook_store(
+            pre_commit_home,
+            pre_commit_vauxoo_ruff_single_pass.RUFF_HOOK_ID,
+            "repo_ruff",
+            "- {id: ruff-check, name: ruff, entry: ruff check --force-exclude, language: python, "
+            "types_or: [python, pyi, jupyter], require_serial: true}\n",
+        )
+        ruff_bin = bin_path / ("ruff.exe" if sys.platform == "win32" else "ruff")
+        ruff_bin.write_text("")
+        ruff_bin.chmod(0o755)
+        return ruff_bin
+
+    def fake_pylint_store(self, pre_commit_home):
+        """pre-commit store with the pylint-odoo repository installed using the pylint of the tests"""
+        bin_path = self.fake_hook_store(
+            pre_commit_home,
+            pre_commit_vauxoo_pylint_single_pass.PYLINT_HOOK_ID,
+            "repo_pylint",
+            "- {id: pylint_odoo, name: pylint_odoo, entry: pylint, language: python, types: [python]}\n",
+        )
+        (bin_path / "python").symlink_to(sys.executable)
+        pylint_bin = bin_path / "pylint"
+        pylint_bin.write_text("#!%s\nfrom pylint import run_pylint\nrun_pylint()\n" % sys.executable)
+        pylint_bin.chmod(0o755)
+        return pylint_bin
+
+    @pytest.mark.skipif(
+        sys.version_info < (3, 11), reason="The single pass reads the ruff configuration using tomllib"
+    )
+    def test_ruff_single_pass(self, monkeypatch, caplog):
+        """ruff-odoo runs once and each error is reported by the severities selecting it"""
+        if not self.uses_ruff():
+            pytest.skip("Requires BLACK_AUTOFLAKE_MATRIX_VALUE >= 30")
+        self.runner.invoke(main, ["--only-cp-cfg"])
+        pre_commit_home = Path(self.tmp_dir) / "pre_commit_home"
+        monkeypatch.setenv("PRE_COMMIT_HOME", str(pre_commit_home))
+        monkeypatch.delenv("SKIP", raising=False)
+        ruff_bin = self.fake_ruff_store(pre_commit_home)
+        (Path(self.tmp_dir) / "module_example1" / "tests").mkdir()
+        self.git_commit_all()
+        models_py = self.write_file("module_example1/models/models.py")
+        tests_py = self.write_file("module_example1/tests/test_models.py")
+        self.write_file("module_example1/views/views.xml", "<!-- comment -->\n")
+        rules = [
+            {"code": "F401", "name": "unused-import", "linter": "Pyflakes"},
+            {"code": "E501", "name": "line-too-long", "linter": "pycodestyle"},
+            {"code": "W191", "name": "tab-indentation", "linter": "pycodestyle"},
+            {"code": "EM101", "name": "raw-string-in-exception", "linter": "flake8-errmsg"},
+            {"code": "S101", "name": "assert", "linter": "flake8-bandit"},
+            {"code": "S108", "name": "hardcoded-temp-file", "linter": "flake8-bandit"},
+        ]
+        diagnostics = {
+            models_py: ["F401", "E501", "EM101", "S101", "S108"],
+            tests_py: ["S108"],
+        }
+        ruff_commands = []
+
+        def fake_run_ruff(command, repo_dirname=None):
+            if command[1:3] == ["rule", "--all"]:
+                return rules
+            ruff_commands.append(command)
+            files = command[command.index("--") + 1 :]
+            return [
+                {
+                    "filename": os.path.join(repo_dirname, fname),
+                    "code": code,
+                    "message": "%s message" % code,
+                    "location": {"row": 1, "column": 1},
+                }
+                for fname in files
+                for code in diagnostics.get(fname, [])
+            ]
+
+        stages_skip = []
+        run_stage = pre_commit_vauxoo.run_stage
+
+        def fake_run_stage(command, *args, **kwargs):
+            if command and pre_commit_vauxoo.is_pre_commit_run(command):
+                stages_skip.append(os.environ.get("SKIP"))
+            return run_stage(command, *args, **kwargs)
+
+        monkeypatch.setattr(pre_commit_vauxoo_ruff_single_pass, "run_ruff", fake_run_ruff)
+        monkeypatch.setattr(pre_commit_vauxoo, "run_stage", fake_run_stage)
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff", "--ruff-single-pass"])
+        assert result.exit_code == 1, "The mandatory error should fail %s - %s" % (result, result.output)
+        assert len(ruff_commands) == 1, "ruff should run once for all the severities"
+        assert ruff_commands[0][0] == str(ruff_bin), "The ruff of the hook environment was not used"
+        assert ruff_commands[0][ruff_commands[0].index("--") + 1 :] == [models_py, tests_py], "Only python files"
+        assert len(run_commands) == 2, "The mandatory and optional checks should still run"
+        assert stages_skip == ["ruff-check", "ruff-check"], "pre-commit should skip the ruff-odoo hooks"
+        assert "SKIP" not in os.environ, "SKIP was not restored"
+        single_pass_config = tomllib.loads(
+            (Path(self.tmp_dir) / CFG_SUBFOLDER / ".cache" / "ruff-single-pass.toml").read_text(encoding="utf-8")
+        )
+        assert {"E", "line-too-long", "S"} <= set(single_pass_config["lint"]["select"])
+        assert single_pass_config["lint"]["pycodestyle"]["max-line-length"] == 130, "Only the optional use E501"
+        assert "flake8-bandit" not in single_pass_config["lint"], "No rule using it is selected (default)"
+
+        reports = {
+            record.getMessage().split(" (single pass)")[0]: record.getMessage()
+            for record in caplog.records
+            if " (single pass): " in record.getMessage()
+        }
+        mandatory = reports["ruff-odoo mandatory checks"]
+        assert "F401" in mandatory and "E501" not in mandatory, "line-too-long is reported by the optional checks"
+        assert "EM101" not in mandatory, "'E' should not select the flake8-errmsg rules"
+        optional = reports["ruff-odoo optional checks"]
+        assert "E501" in optional and "S101" in optional and "F401" not in optional
+        experimental = reports["ruff-odoo EXPERIMENTAL checks (Won't affect CI status)!"]
+        assert "%s:1:1: S108" % models_py in experimental, "The experimental checks select 'S'"
+        assert tests_py not in experimental, "The experimental checks ignore 'S' in the tests"
+        assert "S101" not in experimental, "The experimental checks ignore 'assert'"
+
+        # A setting missing in a severity is its default value so it can not be merged if both select its rules
+        experimental_toml = Path(self.tmp_dir) / CFG_SUBFOLDER / ".ruff-experimental.toml"
+        experimental_toml.write_text(
+            experimental_toml.read_text(encoding="utf-8").replace("\nselect = [", '\nselect = [\n    "E501",', 1),
+            encoding="utf-8",
+        )
+        caplog.clear()
+        stages_skip.clear()
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff", "--ruff-single-pass"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert "The setting lint.pycodestyle.max-line-length has different values" in caplog.text
+        assert stages_skip == [None, None], "pre-commit should run the ruff-odoo hooks"
+
+        # The hooks run as usual if the single pass can not run
+        shutil.rmtree(pre_commit_home)
+        caplog.clear()
+        stages_skip.clear()
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff", "--ruff-single-pass"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert "Unable to run ruff-odoo once" in caplog.text
+        assert stages_skip == [None, None], "pre-commit should run the ruff-odoo hooks"
+
+    @pytest.mark.skipif(os.name != "posix", reason="The fake pylint-odoo environment uses a shebang script")
+    def test_pylint_single_pass(self, monkeypatch, caplog):
+        """pylint-odoo runs once and each message is reported by the severities enabling it"""
+        monkeypatch.setenv("PYLINT_DISABLE_CHECKS", "eval-used")
+        self.runner.invoke(main, ["--only-cp-cfg"])
+        pre_commit_home = Path(self.tmp_dir) / "pre_commit_home"
+        monkeypatch.setenv("PRE_COMMIT_HOME", str(pre_commit_home))
+        monkeypatch.delenv("SKIP", raising=False)
+        pylint_bin = self.fake_pylint_store(pre_commit_home)
+        self.git_commit_all()
+        models_py = self.write_file(
+            "module_example1/models/models.py",
+            "from odoo import models\n\n\nclass Parent:\n    def method(self):\n        return 1\n\n\n"
+            "class Child(Parent):\n    def method(self):\n        return super().method()\n\n\n"
+            "def function():\n    value = 1\n    1\n    try:\n        return eval('1')\n    except:\n        pass\n"
+            "    return len([1]) == 0\n\n\n"
+            "class Model(models.Model):\n    def action(self):\n        return self.search([])\n",
+        )
+        self.write_file("module_example1/views/views.xml", "<!-- comment -->\n")
+        pylint_commands = []
+        run_pylint = pre_commit_vauxoo_pylint_single_pass.run_pylint
+
+        def wrap_run_pylint(command, repo_dirname):
+            pylint_commands.append(command)
+            return run_pylint(command, repo_dirname)
+
+        stages_skip = []
+        run_stage = pre_commit_vauxoo.run_stage
+
+        def fake_run_stage(command, *args, **kwargs):
+            if command and pre_commit_vauxoo.is_pre_commit_run(command):
+                stages_skip.append(os.environ.get("SKIP"))
+            return run_stage(command, *args, **kwargs)
+
+        monkeypatch.setattr(pre_commit_vauxoo_pylint_single_pass, "run_pylint", wrap_run_pylint)
+        monkeypatch.setattr(pre_commit_vauxoo, "run_stage", fake_run_stage)
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff", "--pylint-single-pass"])
+        assert result.exit_code == 1, "The mandatory message should fail %s - %s" % (result, result.output)
+        assert len(pylint_commands) == 1, "pylint should run once for all the severities"
+        assert pylint_commands[0][0] == str(pylint_bin), "The pylint of the hook environment was not used"
+        assert pylint_commands[0][-1:] == [models_py], "Only python files"
+        assert len(run_commands) == 2, "The mandatory and optional checks should still run"
+        assert stages_skip == ["pylint_odoo", "pylint_odoo"], "pre-commit should skip the pylint-odoo hooks"
+        assert "SKIP" not in os.environ, "SKIP was not restored"
+
+        reports = {
+            record.getMessage().split(" (single pass)")[0]: record.getMessage()
+            for record in caplog.records
+            if " (single pass): " in record.getMessage()
+        }
+        # Each severity reports the same messages of running its own hook
+        for cfg_name in (".pre-commit-config.yaml", ".pre-commit-config-optional.yaml"):
+            pre_commit_cfg = load(
+                (Path(self.tmp_dir) / CFG_SUBFOLDER / cfg_name).read_text(encoding="utf-8"), Loader=Loader
+            )
+            for repo in pre_commit_cfg["repos"]:
+                for hook in repo["hooks"]:
+                    if hook["id"] != pre_commit_vauxoo_pylint_single_pass.PYLINT_HOOK_ID:
+                        continue
+                    process = subprocess.run(
+                        [str(pylint_bin)] + hook["args"] + ["--output-format=json", models_py],
+                        cwd=self.tmp_dir,
+                        stdout=subprocess.PIPE,
+                        check=False,
+                    )
+                    expected = {
+                        pre_commit_vauxoo_pylint_single_pass.format_message(dict(message, relpath=message["path"]))
+                        for message in json.loads(process.stdout)
+                    }
+                    reported = {line for line in reports[hook["name"]].splitlines() if line.startswith(models_py)}
+                    assert reported == expected, "%s should report the messages of its hook" % hook["name"]
+        mandatory = reports["pylint mandatory checks"]
+        optional = reports["pylint optional checks"]
+        assert "(useless-parent-delegation)" in mandatory and "(useless-parent-delegation)" in optional
+        assert "(use-implicit-booleaness-not-comparison-to-zero)" not in mandatory, "It is enabled only as optional"
+        assert "(use-implicit-booleaness-not-comparison-to-zero)" in optional
+        assert "(eval-used)" not in caplog.text, "PYLINT_DISABLE_CHECKS should disable it"
+        cfg_dir = Path(self.tmp_dir) / CFG_SUBFOLDER
+        if not self.uses_ruff():
+            (experimental,) = [
+                record for record in caplog.records if record.getMessage().startswith("pylint EXPERIMENTAL checks")
+            ]
+            assert "(no-search-all)" in experimental.getMessage()
+            assert experimental.levelno == logging.INFO, "The experimental messages do not affect the status"
+            # The experimental .pylintrc does not set py-version but none of its messages use it
+            assert "py-version" not in (cfg_dir / ".pylintrc-experimental").read_text(encoding="utf-8")
+        py_versions = [
+            pre_commit_vauxoo_pylint_single_pass.read_rcfile(rcfile).get("MAIN", "py-version", raw=True, fallback=None)
+            for rcfile in (cfg_dir / ".pylintrc", cfg_dir / ".cache" / "pylintrc-single-pass")
+        ]
+        assert py_versions[0] == py_versions[1], "The single pass should use the py-version of the mandatory checks"
+
+        # The single pass uses the "--jobs" of the hooks so all of them must use the same ones
+        optional_cfg = cfg_dir / ".pre-commit-config-optional.yaml"
+        optional_cfg.write_text(
+            optional_cfg.read_text(encoding="utf-8").replace(
+                "- --rcfile=.config/.pylintrc-optional", "- --rcfile=.config/.pylintrc-optional\n          - --jobs=2"
+            ),
+            encoding="utf-8",
+        )
+        caplog.clear()
+        stages_skip.clear()
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff", "--pylint-single-pass"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert "The pylint-odoo hooks use different --jobs" in caplog.text
+        assert stages_skip == [None, None], "pre-commit should run the pylint-odoo hooks"
+
+        # The hooks run as usual if the single pass can not run
+        shutil.rmtree(pre_commit_home)
+        caplog.clear()
+        stages_skip.clear()
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result, run_commands = self.invoke_scope(monkeypatch, ["--diff", "--pylint-single-pass"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert "Unable to run pylint-odoo once" in caplog.text
+        assert stages_skip == [None, None], "pre-commit should run the pylint-odoo hooks"
+
+    def test_exclude_regex(self):
+        """The trie-shaped regex matches the same paths as the alternation of the excluded paths"""
+        exclude_paths = ["module_a/", "module_b/", " module_a/models ", "module_ab/x", "", "dir with #/"]
+        exclude_regex = pre_commit_vauxoo_exclusions.get_exclude_regex(exclude_paths)
+        assert exclude_regex.count("module_") == 1, "The common prefix is not shared %s" % exclude_regex
+        alternation = "|".join(re.escape(path.strip()) for path in exclude_paths if path.strip())
+        for relpath in (
+            "module_a/models/x.py",
+            "addons/module_b/__init__.py",
+            "module_ab/x.py",
+            "module_abc/x.py",
+            "module_c/module_a/y.py",
+            "dir with #/file.py",
+            "dir with/file.py",
+            "README.md",
+        ):
+            # The configuration files use the verbose mode so the spaces and "#" must be escaped
+            assert bool(re.search("(?x)(%s)" % exclude_regex, relpath)) == bool(re.search(alternation, relpath)), (
+                "Different match for %s" % relpath
+            )
+
     def test_scope_paths_precedence(self, monkeypatch, caplog):
         """'-p/--paths' has precedence over the scope parameters"""
         self.git_commit_all()
@@ -1114,3 +1615,803 @@ class TestPreCommitVauxoo:
         assert run_commands, "The hooks were not run"
         for run_command in run_commands:
             assert self.scope_files(run_command) == [changed], "The current directory has precedence over the scope"
+
+    def test_parallel_stages(self, monkeypatch, caplog):
+        """'--parallel-stages' runs the read-only stages at the same time keeping their output order"""
+        commands = []
+
+        def stub_subprocess_call(command, *args, **kwargs):
+            commands.append(command)
+            if command[:2] != ["pre-commit", "run"]:
+                return 0
+            stage_cfg = Path(command[command.index("-c") + 1]).name
+            kwargs["stdout"].write(b"output of %s\n" % stage_cfg.encode())
+            return int(stage_cfg == ".pre-commit-config-optional.yaml")
+
+        monkeypatch.setattr(pre_commit_vauxoo, "subprocess_call", stub_subprocess_call)
+        monkeypatch.setattr(pre_commit_vauxoo, "copy_cfg_files", lambda *args, **kwargs: None)
+        expected_logs = [
+            "INFO:pre-commit-vauxoo:Running mandatory and optional checks in parallel",
+            "INFO:pre-commit-vauxoo:Mandatory checks passed!",
+            "WARNING:pre-commit-vauxoo:Optional checks failed",
+        ]
+        with self.custom_assert_logs("pre-commit-vauxoo", level="INFO", expected_logs=expected_logs, caplog=caplog):
+            result = self.runner.invoke(main, ["--parallel-stages", "-t", "mandatory,optional"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        run_commands = [command for command in commands if command[:2] == ["pre-commit", "run"]]
+        assert len(run_commands) == 2, "The mandatory and optional checks were not run"
+        mandatory_pos = result.output.index("output of .pre-commit-config.yaml")
+        optional_pos = result.output.index("output of .pre-commit-config-optional.yaml")
+        assert mandatory_pos < optional_pos, "The buffered output is not printed in the usual order"
+
+    def test_results_cache(self, monkeypatch):
+        """'--results-cache' skips the files that already passed until their content changes"""
+        self.write_file("script.py")
+        self.git_commit_all()
+        argv = ["--results-cache", "-t", "mandatory"]
+        result, run_commands = self.invoke_scope(monkeypatch, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert len(run_commands) == 1, "The hooks were not run"
+        assert "module_example1/models/models.py" in self.scope_files(run_commands[0]), (
+            "The results cache is not running the whole repository the first time"
+        )
+        result, run_commands = self.invoke_scope(monkeypatch, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert not run_commands, "The hooks were run again for the files that already passed"
+        # A file outside of the modules (see test_results_cache_module for the files of a module)
+        changed = self.write_file("script.py")
+        result, run_commands = self.invoke_scope(monkeypatch, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert [self.scope_files(run_command) for run_command in run_commands] == [[changed]], (
+            "The results cache is not checking only the changed file"
+        )
+
+    def test_results_cache_module(self, monkeypatch):
+        """'--results-cache' checks again all the files of a module if any file of the module changed"""
+        self.git_commit_all()
+        argv = ["--results-cache", "-t", "mandatory"]
+        self.invoke_scope(monkeypatch, argv)
+        result, run_commands = self.invoke_scope(monkeypatch, argv)
+        assert not run_commands, "The hooks were run again for the files that already passed"
+        # e.g. a xml id or a file of the manifest removed could break the other files of the module
+        self.write_file("module_example1/__manifest__.py")
+        result, run_commands = self.invoke_scope(monkeypatch, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert len(run_commands) == 1, "The hooks were not run for the files of the module changed"
+        checked = self.scope_files(run_commands[0])
+        assert "module_example1/models/models.py" in checked, "The other files of the module were not checked"
+        assert not [fname for fname in checked if not fname.startswith("module_example1/")], (
+            "The files of the other modules should not be checked again"
+        )
+
+    def test_install_hooks_fingerprint(self, monkeypatch):
+        """'pre-commit install-hooks' only runs again if the hooks to install changed"""
+        monkeypatch.setenv("PRE_COMMIT_HOME", self.tmp_dir)
+        commands = []
+
+        def stub_subprocess_call(command, *args, **kwargs):
+            commands.append(command)
+            return 0
+
+        monkeypatch.setattr(pre_commit_vauxoo, "subprocess_call", stub_subprocess_call)
+        argv = ["--diff", "-t", "all"]
+        result = self.runner.invoke(main, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        installed_cfgs = {Path(command[-1]).name for command in commands if command[1] == "install-hooks"}
+        assert installed_cfgs == {
+            ".pre-commit-config.yaml",
+            ".pre-commit-config-optional.yaml",
+            ".pre-commit-config-autofix.yaml",
+        }, "The hooks of all the configuration files were not installed"
+        commands.clear()
+        result = self.runner.invoke(main, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert not [command for command in commands if command[1] == "install-hooks"], (
+            "The hooks were installed again without changes"
+        )
+        # Changing the revs of the hooks requires installing them again
+        os.environ["LINT_COMPATIBILITY_VERSION"] = "10.10.10.10.10.10.10.10" if self.uses_ruff() else "0"
+        result = self.runner.invoke(main, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert [command for command in commands if command[1] == "install-hooks"], (
+            "The hooks were not installed again after changing the revs"
+        )
+
+    @pytest.mark.skipif(os.name != "posix", reason="The daemon requires unix sockets and fork")
+    def test_daemon(self, monkeypatch):
+        """The commands are run by the '--serve' daemon of the repository while it is running"""
+        # A private folder of the test for the sockets since that the other tests could run a daemon too
+        monkeypatch.setenv("XDG_RUNTIME_DIR", self.user_cache_dir)
+        cmd = [sys.executable, "-m", "pre_commit_vauxoo"]
+        socket_path = pre_commit_vauxoo_daemon.get_socket_path(self.tmp_dir, create=True)
+        with monkeypatch.context() as monkeypatch_git:
+            # Finding the socket must not run git (or anything else) for each command if the daemon is not running
+            monkeypatch_git.setattr(subprocess, "Popen", None)
+            assert pre_commit_vauxoo_daemon.connect() is None, "Connected to a daemon not running"
+        with subprocess.Popen(
+            cmd + ["--serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ) as daemon_process:
+            try:
+                for _retry in range(100):
+                    if Path(socket_path).exists():
+                        break
+                    time.sleep(0.1)
+                assert Path(socket_path).exists(), "The daemon is not listening"
+                result = subprocess.run(cmd + ["--only-cp-cfg"], capture_output=True, text=True, check=False)
+                assert not result.returncode, "Exited with error %s" % result.stderr
+                assert "Running in the pre-commit-vauxoo daemon" in result.stderr, "The daemon did not run the command"
+                assert (Path(self.tmp_dir) / CFG_SUBFOLDER / ".pre-commit-config.yaml").is_file(), (
+                    "The daemon did not run the command in the directory of the client"
+                )
+                result = subprocess.run(
+                    cmd + ["--only-cp-cfg"],
+                    capture_output=True,
+                    text=True,
+                    check=False,
+                    env=dict(os.environ, PRECOMMIT_NO_DAEMON="1"),
+                )
+                assert "Running in the pre-commit-vauxoo daemon" not in result.stderr, "The daemon was not disabled"
+                socket_dir = Path(socket_path).parent
+                assert not socket_dir.stat().st_mode & 0o077, "The folder of the socket is accessible by other users"
+                socket_dir.chmod(0o755)
+                try:
+                    result = subprocess.run(cmd + ["--only-cp-cfg"], capture_output=True, text=True, check=False)
+                finally:
+                    socket_dir.chmod(0o700)
+                assert not result.returncode, "Exited with error %s" % result.stderr
+                assert "Running in the pre-commit-vauxoo daemon" not in result.stderr, (
+                    "The request was sent to a socket into a folder accessible by other users"
+                )
+            finally:
+                daemon_process.terminate()
+                daemon_process.wait(timeout=30)
+        assert not Path(socket_path).exists(), "The daemon did not remove its socket"
+
+    def test_daemon_requests(self, monkeypatch):
+        """The daemon runs the requests at the same time and terminates the ones of the clients interrupted"""
+        if not hasattr(pre_commit_vauxoo_daemon.socket, "SO_PEERCRED"):
+            pytest.skip("Requires the peer credentials of the unix sockets")
+        monkeypatch.setenv("XDG_RUNTIME_DIR", self.user_cache_dir)
+        daemon_code = (
+            "import os, subprocess\n"
+            "from pre_commit_vauxoo import daemon\n"
+            "def run(seconds, pid_file):\n"
+            "    process = subprocess.Popen(['sleep', str(seconds)])\n"
+            "    with open(pid_file, 'w') as f_pid:\n"
+            "        f_pid.write(str(process.pid))\n"
+            "    process.wait()\n"
+            "daemon.serve(os.getcwd(), run)\n"
+        )
+        client_code = "import sys\nfrom pre_commit_vauxoo import daemon\nsys.exit(daemon.request(%r))\n"
+
+        def start_client(seconds, pid_file):
+            params = {"seconds": seconds, "pid_file": pid_file}
+            return subprocess.Popen([sys.executable, "-c", client_code % params], stdin=subprocess.DEVNULL)
+
+        socket_path = pre_commit_vauxoo_daemon.get_socket_path(self.tmp_dir, create=True)
+        with subprocess.Popen([sys.executable, "-c", daemon_code], stderr=subprocess.DEVNULL) as daemon_process:
+            slow_pid_file = Path(self.tmp_dir, "slow.pid")
+            try:
+                for _retry in range(100):
+                    if Path(socket_path).exists():
+                        break
+                    time.sleep(0.1)
+                assert Path(socket_path).exists(), "The daemon is not listening"
+                slow_client = start_client(300, str(slow_pid_file))
+                for _retry in range(100):
+                    if slow_pid_file.exists() and slow_pid_file.read_text(encoding="utf-8"):
+                        break
+                    time.sleep(0.1)
+                grandchild_pid = int(slow_pid_file.read_text(encoding="utf-8"))
+                fast_client = start_client(0, str(Path(self.tmp_dir, "fast.pid")))
+                assert fast_client.wait(timeout=30) == 0, "The request was not run while another one was running"
+                assert slow_client.poll() is None, "The slow request finished before cancelling it"
+                slow_client.send_signal(signal.SIGINT)
+                assert slow_client.wait(timeout=30) == 130, "The interrupted client did not exit as interrupted"
+                for _retry in range(100):
+                    if not self.is_process_running(grandchild_pid):
+                        break
+                    time.sleep(0.1)
+                assert not self.is_process_running(grandchild_pid), (
+                    "The processes of the interrupted request are still running"
+                )
+            finally:
+                daemon_process.terminate()
+                daemon_process.wait(timeout=30)
+
+    def test_watcher(self):
+        """The watchers of '--watch' report the files saved and the files of the new directories"""
+        watcher_classes = [pre_commit_vauxoo_watcher.PollingWatcher]
+        if sys.platform.startswith("linux"):
+            watcher_classes.append(pre_commit_vauxoo_watcher.InotifyWatcher)
+        tracked_file = pre_commit_vauxoo.get_files(self.tmp_dir)[0]
+        for watcher_class in watcher_classes:
+            file_watcher = watcher_class(self.tmp_dir)
+            try:
+                assert not file_watcher.read_changes(0), "%s reported changes without saving files" % watcher_class
+                with open(os.path.join(self.tmp_dir, tracked_file), "a", encoding="utf-8") as f_tracked:
+                    f_tracked.write("\n")
+                new_file = "new_module_%s/__init__.py" % watcher_class.__name__
+                new_path = Path(self.tmp_dir, new_file)
+                new_path.parent.mkdir()
+                new_path.write_text("\n", encoding="utf-8")
+                expected_changes = {tracked_file, new_file}
+                changes = set()
+                for _retry in range(20):
+                    if expected_changes <= changes:
+                        break
+                    changes |= file_watcher.read_changes(0.5)
+                assert expected_changes <= changes, "%s did not report the files saved" % watcher_class
+                assert pre_commit_vauxoo_watcher.wait_changes(file_watcher, debounce=0.1, changes={new_file}) == {
+                    new_file
+                }, "The changes already known should be returned without waiting for new ones"
+            finally:
+                file_watcher.close()
+
+    def test_shard(self, monkeypatch, caplog):
+        """'--shard' splits the files between the shards without splitting the Odoo modules"""
+        all_files = {Path(fname).as_posix() for fname in pre_commit_vauxoo.get_files(self.tmp_dir)}
+        shards_files = []
+        cache_dir = Path(self.tmp_dir, CFG_SUBFOLDER, ".cache")
+        for shard in ("1/3", "2/3", "3/3"):
+            # Each CI job could start with a different cache (e.g. none, the one of the previous job or an old one)
+            if shard == "3/3":
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                cache_dir.mkdir(parents=True)
+                (cache_dir / "shard-durations.json").write_text('{"module_example1": [1, 1000]}', encoding="utf-8")
+            with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+                result, run_commands = self.invoke_scope(
+                    monkeypatch, ["--shard", shard, "--precommit-hooks-type", "fix"]
+                )
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            assert "Tests summary (shard %s)" % shard in caplog.text, "The shard summary is missing"
+            assert len(run_commands) == 1, "The shard %s did not run the hooks" % shard
+            shards_files.append(set(self.scope_files(run_commands[0])))
+        assert set().union(*shards_files) == all_files, "The shards are not checking all the files"
+        assert sum(len(shard_files) for shard_files in shards_files) == len(all_files), "A file was checked twice"
+        for shard_files in shards_files:
+            modules = {fname.split("/")[0] for fname in shard_files if "/" in fname}
+            for other_files in shards_files:
+                if other_files is not shard_files:
+                    assert not modules & {fname.split("/")[0] for fname in other_files if "/" in fname}, (
+                        "An Odoo module was split between shards"
+                    )
+        result, _run_commands = self.invoke_scope(monkeypatch, ["--shard", "4/3"])
+        assert result.exit_code, "An invalid shard should fail"
+
+    def test_trace_file(self, monkeypatch):
+        """'--trace-file' writes a Chrome trace with the spans of the run and of each hook"""
+        trace_file = os.path.join(self.tmp_dir, "run.json")
+        result, run_commands = self.invoke_scope(monkeypatch, ["--trace-file", trace_file])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert run_commands, "The hooks were not run"
+        with open(trace_file, encoding="utf-8") as f_trace:
+            events = json.load(f_trace)["traceEvents"]
+        span_names = {event["name"] for event in events}
+        assert {"main", "get_repo", "git_cwd", "get_uninstallable_modules"} <= span_names, (
+            "Missing spans in the trace %s" % span_names
+        )
+        assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events), "Invalid trace events"
+
+        # The spans of the hooks are parsed from the output of pre-commit
+        output = tempfile.TemporaryFile()
+        hooks_output = (
+            "print('black......Passed'); print('pylint...(no files to check)Skipped'); print('eslint....Failed')"
+        )
+        pre_commit_vauxoo_tracing.TRACER.enable()
+        try:
+            status = pre_commit_vauxoo_tracing.call_with_hook_spans(
+                [sys.executable, "-c", hooks_output], stdout=output
+            )
+        finally:
+            pre_commit_vauxoo_tracing.TRACER.enabled = False
+            output.close()
+        assert not status, "The command failed"
+        hook_spans = {
+            event["name"]: event["args"]["status"]
+            for event in pre_commit_vauxoo_tracing.TRACER.events
+            if event["cat"] == "hook"
+        }
+        assert hook_spans == {"black": "Passed", "pylint": "Skipped", "eslint": "Failed"}, "Wrong hook spans"
+
+    def test_fail_fast(self, monkeypatch, caplog):
+        """'--fail-fast' cancels the stages pending and kills the ones running in parallel"""
+        commands = []
+        hook_pids = []
+        optional_started = threading.Event()
+
+        def stub_subprocess_call(command, *args, **kwargs):
+            commands.append(command)
+            if command[:2] != ["pre-commit", "run"]:
+                return 0
+            stage_cfg = Path(command[command.index("-c") + 1]).name
+            if stage_cfg == ".pre-commit-config.yaml":
+                # The mandatory checks fail once the optional checks are running
+                optional_started.wait(30)
+            if stage_cfg != ".pre-commit-config-optional.yaml":
+                return 1
+            # The optional checks (and the hook run by them) are still running when the mandatory ones fail
+            stage_code = (
+                "import subprocess, sys, time\n"
+                "hook = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+                "print(hook.pid, flush=True)\n"
+                "time.sleep(60)\n"
+            )
+            with subprocess.Popen(
+                [sys.executable, "-c", stage_code],
+                stdout=subprocess.PIPE,
+                start_new_session=kwargs.get("start_new_session", False),
+            ) as process:
+                hook_pids.append(int(process.stdout.readline()))
+                if kwargs.get("popen_callback"):
+                    kwargs["popen_callback"](process)
+                optional_started.set()
+                return process.wait()
+
+        monkeypatch.setattr(pre_commit_vauxoo, "subprocess_call", stub_subprocess_call)
+        monkeypatch.setattr(pre_commit_vauxoo, "copy_cfg_files", lambda *args, **kwargs: None)
+        expected_logs = [
+            "ERROR:pre-commit-vauxoo:Autofix checks reformatted",
+            "WARNING:pre-commit-vauxoo:Mandatory checks cancelled since a previous stage failed (fail-fast)",
+            "WARNING:pre-commit-vauxoo:Optional checks cancelled since a previous stage failed (fail-fast)",
+        ]
+        with self.custom_assert_logs("pre-commit-vauxoo", level="INFO", expected_logs=expected_logs, caplog=caplog):
+            result = self.runner.invoke(main, ["--fail-fast", "-t", "fix,mandatory,optional"])
+        assert result.exit_code, "The autofix checks failed but the exit code is successful"
+        run_commands = [command for command in commands if command[:2] == ["pre-commit", "run"]]
+        assert len(run_commands) == 1, "The stages after the autofix checks were not cancelled"
+
+        caplog.clear()
+        expected_logs = [
+            "ERROR:pre-commit-vauxoo:Mandatory checks failed",
+            "WARNING:pre-commit-vauxoo:Optional checks cancelled since a previous stage failed (fail-fast)",
+        ]
+        start_time = time.monotonic()
+        with self.custom_assert_logs("pre-commit-vauxoo", level="INFO", expected_logs=expected_logs, caplog=caplog):
+            result = self.runner.invoke(main, ["--fail-fast", "--parallel-stages", "-t", "mandatory,optional"])
+        assert result.exit_code, "The mandatory checks failed but the exit code is successful"
+        assert time.monotonic() - start_time < 30, "The optional checks running in parallel were not killed"
+        for _retry in range(100):
+            if not any(self.is_process_running(hook_pid) for hook_pid in hook_pids):
+                break
+            time.sleep(0.1)
+        assert hook_pids and not any(self.is_process_running(hook_pid) for hook_pid in hook_pids), (
+            "The hooks of the optional checks killed are still running"
+        )
+
+    def test_fix_until_stable(self, monkeypatch, caplog):
+        """'--fix-until-stable' runs the autofix checks again only for the files changed until they are stable"""
+        models_py = "module_example1/models/models.py"
+        views_xml = "module_example1/views/views.xml"
+        commands = []
+        autofix_runs = []
+        # The files changed by each run of the autofix checks e.g. a fixer reformatting the output of another one
+        fixes = []
+
+        def stub_subprocess_call(command, *args, **kwargs):
+            commands.append(command)
+            if command[:2] != ["pre-commit", "run"]:
+                return 0
+            if Path(command[command.index("-c") + 1]).name != ".pre-commit-config-autofix.yaml":
+                return 0
+            autofix_runs.append(self.scope_files(command))
+            if not fixes:
+                return 0
+            for relpath in fixes.pop(0):
+                self.write_file(relpath, "\n")
+            return 1
+
+        monkeypatch.setattr(pre_commit_vauxoo, "subprocess_call", stub_subprocess_call)
+        monkeypatch.setattr(pre_commit_vauxoo, "copy_cfg_files", lambda *args, **kwargs: None)
+        fixes[:] = [[models_py, views_xml], [models_py]]
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result = self.runner.invoke(main, ["--fix-until-stable", "--fail-fast", "-t", "fix,mandatory,optional"])
+        assert result.exit_code, "The autofix checks reformatted files but the exit code is successful"
+        assert autofix_runs == [None, sorted([models_py, views_xml]), [models_py]], (
+            "The autofix checks should run again only for the files changed by the previous run"
+        )
+        assert "Autofix checks reformatted" in caplog.text
+        run_commands = [command for command in commands if command[:2] == ["pre-commit", "run"]]
+        assert len(run_commands) == 3, "The files not changed by a failed run could fail so the stages are cancelled"
+
+        # All the files of the failed runs were changed so they are stable
+        commands.clear()
+        autofix_runs.clear()
+        fixes[:] = [[models_py, views_xml]]
+        result = self.runner.invoke(
+            main,
+            ["--fix-until-stable", "--fail-fast", "--files-from", "-", "-t", "fix,mandatory,optional"],
+            input="\n".join([models_py, views_xml]).encode(),
+        )
+        assert result.exit_code, "The autofix checks reformatted files but the exit code is successful"
+        assert autofix_runs == [sorted([models_py, views_xml])] * 2
+        run_commands = [command for command in commands if command[:2] == ["pre-commit", "run"]]
+        assert len(run_commands) == 4, "The stable files should be checked by the mandatory and optional checks"
+
+        # A hook failing without changing files is not run again
+        commands.clear()
+        autofix_runs.clear()
+        fixes[:] = [[]]
+        result = self.runner.invoke(main, ["--fix-until-stable", "--fail-fast", "-t", "fix,mandatory,optional"])
+        assert result.exit_code, "The autofix checks failed but the exit code is successful"
+        assert autofix_runs == [None], "The autofix checks should not run again without files changed"
+        run_commands = [command for command in commands if command[:2] == ["pre-commit", "run"]]
+        assert len(run_commands) == 1, "The stages after the failed autofix checks were not cancelled"
+
+        # The fixers changing the files forever stop running
+        caplog.clear()
+        autofix_runs.clear()
+        fixes[:] = [[models_py]] * (pre_commit_vauxoo.FIX_UNTIL_STABLE_MAX_RUNS + 1)
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result = self.runner.invoke(main, ["--fix-until-stable", "-t", "fix"])
+        assert result.exit_code, "The autofix checks reformatted files but the exit code is successful"
+        assert len(autofix_runs) == pre_commit_vauxoo.FIX_UNTIL_STABLE_MAX_RUNS, "The runs should be limited"
+        assert "The autofix checks are still changing 1 file(s) after %d runs" % len(autofix_runs) in caplog.text
+
+    def test_files_from(self, monkeypatch):
+        """'--files-from' runs the hooks on the files listed into a file or stdin"""
+        selected = ["module_example1/models/models.py", "module_example1/__init__.py"]
+        for content in ("\0".join(selected) + "\0", "\r\n".join(selected)):
+            result, run_commands = self.invoke_scope(
+                monkeypatch, ["--files-from", "-", "--diff", "-t", "mandatory"], input=content.encode()
+            )
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            assert [self.scope_files(run_command) for run_command in run_commands] == [sorted(selected)], (
+                "The files of '--files-from' were not used"
+            )
+
+    def test_files_list_transport(self, monkeypatch):
+        """The big lists of files are sent to pre-commit using a file written once for all the stages"""
+        monkeypatch.setattr(pre_commit_vauxoo, "FILES_ARGV_MAX_LENGTH", 10)
+        files_lists = {}
+
+        def stub_subprocess_call(command, *args, **kwargs):
+            if command[1:3] == ["-m", pre_commit_vauxoo.PRE_COMMIT_FILES_MODULE]:
+                files_lists.setdefault(command[3], Path(command[3]).read_bytes())
+            return 0
+
+        monkeypatch.setattr(pre_commit_vauxoo, "subprocess_call", stub_subprocess_call)
+        monkeypatch.setattr(pre_commit_vauxoo, "copy_cfg_files", lambda *args, **kwargs: None)
+        result = self.runner.invoke(main, ["-p", "module_example1", "-t", "fix,mandatory,optional"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert len(files_lists) == 1, "The list of files was not written once for all the stages"
+        files_list_path, content = files_lists.popitem()
+        assert b"module_example1/__manifest__.py\0" in content.replace(b"\\", b"/"), "Wrong list of files"
+        assert not Path(files_list_path).exists(), "The list of files was not removed"
+
+        # The list is sent to pre-commit into the arguments of its process
+        Path(self.tmp_dir, "cfg.yaml").write_text(
+            "repos:\n- repo: local\n  hooks:\n  - id: print-files\n    name: print-files\n"
+            "    entry: %s -c 'import sys; print(\"FILES:\", len(sys.argv) - 1)'\n"
+            "    language: system\n    verbose: true\n" % Path(sys.executable).as_posix(),
+            encoding="utf-8",
+        )
+        Path(self.tmp_dir, "files.txt").write_bytes(content)
+        result = subprocess.run(
+            [sys.executable, "-m", pre_commit_vauxoo.PRE_COMMIT_FILES_MODULE, "files.txt", "run", "-c", "cfg.yaml"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        assert not result.returncode, "pre-commit failed %s %s" % (result.stdout, result.stderr)
+        expected = "FILES: %d" % len(pre_commit_vauxoo_files.read_files_list(content))
+        assert expected in result.stdout, "pre-commit did not receive the files %s" % result.stdout
+
+    def test_scope_since(self, monkeypatch, caplog):
+        """'--since' only checks the files changed by the commits of the branch since it diverged from REF"""
+        self.git_commit_all()
+        self.git_call("branch", "17.0")
+        self.git_call("checkout", "-q", "-b", "feature")
+        self.write_file("module_example1/models/models.py")
+        self.git_commit_all("[FIX] module_example1: first change")
+        self.write_file("module_warnings1/models/models.py")
+        self.git_commit_all("[FIX] module_warnings1: second change")
+        # The new commits of the stable branch are not part of the branch
+        self.git_call("checkout", "-q", "17.0")
+        self.write_file("module_autofix1/models/models.py")
+        self.git_commit_all("[FIX] module_autofix1: stable change")
+        self.git_call("checkout", "-q", "feature")
+        expected = ["module_example1/models/models.py", "module_warnings1/models/models.py"]
+        for argv in (["--since", "17.0"], ["--odoo-version", "17.0", "--since"]):
+            with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+                result, run_commands = self.invoke_scope(monkeypatch, argv + ["-t", "mandatory"])
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            assert [self.scope_files(run_command) for run_command in run_commands] == [expected], (
+                "'%s' is not checking only the files of the branch" % " ".join(argv)
+            )
+        assert "Using the stable ref 17.0 for '--since'" in caplog.text, "The stable ref of '--since' was not logged"
+        assert "commit message validation" not in result.output, "The messages of the commit check were printed"
+        result, run_commands = self.invoke_scope(monkeypatch, ["--since", "unknown-ref"])
+        assert result.exit_code, "An unknown ref should fail instead of checking nothing"
+        assert not run_commands, "The hooks were run for an unknown ref"
+
+    def test_scope_changed_modules(self, monkeypatch):
+        """'--changed-modules' checks all the files of the installable modules changed"""
+        self.git_commit_all()
+        self.write_file("module_example1/models/models.py")
+        self.write_file("module_uninstallable/models/non_install.py")
+        self.write_file("README.md")
+        module_files = [Path(fname).as_posix() for fname in pre_commit_vauxoo.get_files("module_example1")]
+        expected = sorted(module_files + ["README.md"])
+        for argv in (["--changed-modules"], ["--changed-modules", "--diff"]):
+            result, run_commands = self.invoke_scope(monkeypatch, argv + ["-t", "mandatory"])
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            assert [self.scope_files(run_command) for run_command in run_commands] == [expected], (
+                "'%s' is not checking the whole modules changed" % " ".join(argv)
+            )
+
+    def test_scope_dependents_depth(self, monkeypatch):
+        """'--dependents-depth' checks the modules depending on the modules changed too"""
+        for module, depends in (("dep_a", "base"), ("dep_b", "dep_a"), ("dep_c", "dep_b")):
+            os.mkdir(os.path.join(self.tmp_dir, module))
+            self.write_file("%s/__init__.py" % module)
+            self.write_file("%s/__manifest__.py" % module, "{'name': '%s', 'depends': ['%s']}\n" % (module, depends))
+        self.git_commit_all()
+        self.write_file("dep_a/__init__.py")
+
+        def scope_modules(argv):
+            result, run_commands = self.invoke_scope(monkeypatch, argv + ["-t", "mandatory"])
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            assert len(run_commands) == 1, "The hooks were not run"
+            return sorted({fname.split("/")[0] for fname in self.scope_files(run_commands[0])})
+
+        assert scope_modules(["--dependents-depth", "1"]) == ["dep_a", "dep_b"], "Wrong direct dependents"
+        assert scope_modules(["--dependents-depth", "2"]) == ["dep_a", "dep_b", "dep_c"], "Wrong dependents"
+        assert (Path(self.tmp_dir) / CFG_SUBFOLDER / ".cache" / "modules-index.json").is_file(), (
+            "The dependencies of the manifests were not cached"
+        )
+        # The cache is updated when a manifest changes
+        Path(self.tmp_dir, "dep_c", "__manifest__.py").write_text(
+            "{'name': 'dep_c', 'depends': ['base'], 'summary': 'no dependency'}\n", encoding="utf-8"
+        )
+        self.git_commit_all()
+        self.write_file("dep_a/__init__.py")
+        assert scope_modules(["--dependents-depth", "2"]) == ["dep_a", "dep_b"], (
+            "The changed manifest was not parsed again"
+        )
+
+    def test_modules_index(self, monkeypatch):
+        """The modules index supports nested addons roots and parses only the manifests changed"""
+        os.makedirs(os.path.join(self.tmp_dir, "addons", "nested_module"))
+        self.write_file("addons/nested_module/__init__.py")
+        self.write_file(
+            "addons/nested_module/__manifest__.py",
+            "{'name': 'Nested', 'version': '17.0.1.0.0', 'depends': ['module_example1'], 'installable': False}\n",
+        )
+        self.git_commit_all()
+        cache_dir = os.path.join(self.tmp_dir, CFG_SUBFOLDER, ".cache")
+        parsed = []
+        read_manifest = pre_commit_vauxoo_odoo_modules.read_manifest
+        monkeypatch.setattr(
+            pre_commit_vauxoo_odoo_modules, "read_manifest", lambda path: parsed.append(path) or read_manifest(path)
+        )
+
+        modules_index = pre_commit_vauxoo_odoo_modules.get_modules_index(self.tmp_dir, cache_dir)
+        nested_module = modules_index["addons/nested_module"]
+        assert nested_module["name"] == "nested_module", "Wrong name of the nested module"
+        assert nested_module["version"] == "17.0.1.0.0", "Wrong version of the nested module"
+        assert nested_module["depends"] == ["module_example1"], "Wrong depends of the nested module"
+        assert nested_module["files"] == 2, "Wrong number of files of the nested module"
+        assert not nested_module["installable"], "The nested module should be uninstallable"
+        assert {"addons/nested_module/", "module_uninstallable/"} <= pre_commit_vauxoo.get_uninstallable_modules(
+            self.tmp_dir, modules_index
+        ), "The uninstallable modules were not detected"
+        assert len(parsed) == len(modules_index), "All the manifests should be parsed the first time"
+        assert not validate_commit_message_header("[FIX] nested_module: fix bug", repo_root=self.tmp_dir), (
+            "The modules of nested addons roots should be valid targets"
+        )
+
+        parsed.clear()
+        Path(self.tmp_dir, "addons", "nested_module", "__manifest__.py").write_text(
+            "{'name': 'Nested', 'version': '17.0.1.0.1', 'depends': ['module_example1']}\n", encoding="utf-8"
+        )
+        modules_index = pre_commit_vauxoo_odoo_modules.get_modules_index(self.tmp_dir, cache_dir)
+        assert [Path(path).parent.name for path in parsed] == ["nested_module"], "Only the manifest changed is parsed"
+        assert modules_index["addons/nested_module"]["version"] == "17.0.1.0.1", "The index was not updated"
+        assert modules_index["addons/nested_module"]["installable"], "The index was not updated"
+        assert pre_commit_vauxoo_odoo_modules.get_dependents(modules_index, {"module_example1"}, 1) == {
+            "addons/nested_module"
+        }, "The nested module depending on module_example1 was not found"
+
+        with monkeypatch.context() as monkeypatch_read:
+            # The same process (e.g. the daemon of "--serve") reuses the index saved without reading it again
+            monkeypatch_read.setattr(Path, "read_text", None)
+            assert pre_commit_vauxoo_odoo_modules.get_modules_index(self.tmp_dir, cache_dir) == modules_index, (
+                "The index kept in memory was not reused"
+            )
+
+    def test_modules_index_many_manifests(self, monkeypatch):
+        """The manifests of a repository with many modules are parsed in the same thread since that ast is not
+        thread-safe in some python versions"""
+        data = ", ".join("'file_%s.xml'" % file_number for file_number in range(50))
+        for module_number in range(50):
+            module_dir = Path(self.tmp_dir, "many_addons", "many_module_%s" % module_number)
+            module_dir.mkdir(parents=True)
+            (module_dir / "__manifest__.py").write_text(
+                "{'name': 'Many', 'depends': ['module_example1'], 'data': [%s], 'external_dependencies': "
+                "{'python': [{'nested': [%s]}]}}\n" % (data, module_number),
+                encoding="utf-8",
+            )
+        self.git_commit_all()
+        threads = set()
+        read_manifest = pre_commit_vauxoo_odoo_modules.read_manifest
+        monkeypatch.setattr(
+            pre_commit_vauxoo_odoo_modules,
+            "read_manifest",
+            lambda path: threads.add(threading.get_ident()) or read_manifest(path),
+        )
+        modules_index = pre_commit_vauxoo_odoo_modules.get_modules_index(self.tmp_dir)
+        assert threads == {threading.get_ident()}, "The manifests should be parsed in the same thread"
+        assert all(
+            modules_index["many_addons/many_module_%s" % module_number]["depends"] == ["module_example1"]
+            for module_number in range(50)
+        ), "All the manifests should be parsed"
+
+    def test_cfg_files_fingerprint(self, monkeypatch):
+        """The configuration files are rendered again only if their inputs or the files rendered changed"""
+        renders = []
+        render_templates = pre_commit_vauxoo_renderer.render_templates
+        monkeypatch.setattr(
+            pre_commit_vauxoo_renderer,
+            "render_templates",
+            lambda *args, **kwargs: renders.append(1) or render_templates(*args, **kwargs),
+        )
+        cfg_subfolder = Path(self.tmp_dir) / CFG_SUBFOLDER
+
+        def only_cp_cfg(*argv):
+            result = self.runner.invoke(main, ["--only-cp-cfg", "--odoo-version", "17.0", *argv])
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            return len(renders)
+
+        assert only_cp_cfg() == 1, "The configuration files were not rendered"
+        pylintrc = (cfg_subfolder / ".pylintrc").read_text(encoding="utf-8")
+        assert only_cp_cfg() == 1, "The configuration files were rendered again without changes"
+        assert (cfg_subfolder / ".pylintrc").read_text(encoding="utf-8") == pylintrc, "Wrong configuration file"
+        assert only_cp_cfg("--pylint-disable-checks", "missing-return") == 2, "The new data was not rendered"
+        assert only_cp_cfg("--pylint-disable-checks", "missing-return") == 2, "Rendered again with the same data"
+        (Path(self.tmp_dir) / ".isort.cfg").unlink()
+        # The same inputs were already rendered so the files are copied from the per-user cache
+        assert only_cp_cfg("--pylint-disable-checks", "missing-return") == 2, "Rendered again with the same data"
+        assert (Path(self.tmp_dir) / ".isort.cfg").is_file(), "The file removed was not created again"
+        shutil.rmtree(self.user_cache_dir)
+        (Path(self.tmp_dir) / ".isort.cfg").unlink()
+        assert only_cp_cfg("--pylint-disable-checks", "missing-return") == 3, "The file removed was not rendered"
+        assert (Path(self.tmp_dir) / ".isort.cfg").is_file(), "The file removed was not rendered again"
+
+    def test_renderer_same_as_copier(self, monkeypatch):
+        """The built-in renderer creates the same files (byte by byte) as copier"""
+        renders_data = []
+        render_templates = pre_commit_vauxoo_renderer.render_templates
+        monkeypatch.setattr(
+            pre_commit_vauxoo_renderer,
+            "render_templates",
+            lambda src_path, dst_path, data, **kwargs: (
+                renders_data.append(data) or render_templates(src_path, dst_path, data, **kwargs)
+            ),
+        )
+        self.write_file("module_example1/__manifest__.py")
+        argv = ["--only-cp-cfg", "--odoo-version", "17.0", "-x", "module_example1", "--pylint-disable-checks", "W0101"]
+        result = self.runner.invoke(main, argv)
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert len(renders_data) == 1, "The built-in renderer was not used"
+        renderer_dir = Path(self.tmp_dir, "renderer")
+        copier_dir = Path(self.tmp_dir, "copier")
+        render_templates(str(TEMPLATE_PATH), str(renderer_dir), renders_data[0])
+        copier.run_copy(
+            src_path=str(TEMPLATE_PATH),
+            dst_path=str(copier_dir),
+            data=renders_data[0],
+            unsafe=True,
+            defaults=True,
+            overwrite=True,
+            quiet=True,
+        )
+        copier_files = sorted(fname.name for fname in copier_dir.iterdir())
+        assert sorted(fname.name for fname in renderer_dir.iterdir()) == copier_files, "Different files rendered"
+        for fname in copier_files:
+            assert (renderer_dir / fname).read_bytes() == (copier_dir / fname).read_bytes(), (
+                "The file %s is different to the one rendered by copier" % fname
+            )
+
+    def test_startup_import_time(self, caplog):
+        """Importing the CLI does not import the heavy modules and it is under the startup budget"""
+        code = (
+            "import logging, sys, time; start = time.process_time(); import pre_commit_vauxoo.cli; "
+            "print(time.process_time() - start); print(','.join(sorted(sys.modules))); "
+            "print(len(logging.getLogger('pre-commit-vauxoo').handlers))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+        )
+        import_seconds, modules, handlers = result.stdout.strip().splitlines()
+        assert handlers == "0", "Importing the CLI configured the logging of the process"
+        lazy_imported = set(LAZY_IMPORTED_MODULES) & set(modules.split(","))
+        assert not lazy_imported, "Modules imported at startup: %s" % ", ".join(sorted(lazy_imported))
+        # "import time: self [us] | cumulative | module" lines of "-X importtime" to show the slowest imports
+        import_time_re = re.compile(r"^import time:\s*(\d+) \|\s*(\d+) \|(.*)$", re.M)
+        imports_time = sorted(
+            (int(cumulative), module.strip()) for _self, cumulative, module in import_time_re.findall(result.stderr)
+        )
+        assert float(import_seconds) <= IMPORT_TIME_BUDGET_SECONDS, (
+            "Importing the CLI took %.3fs (budget %.3fs). Slowest imports: %s"
+            % (float(import_seconds), IMPORT_TIME_BUDGET_SECONDS, imports_time[-10:])
+        )
+
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result = self.runner.invoke(main, ["--version"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert re.search(r"Imported in \d+\.\d{3}s", caplog.text), "The import time was not shown"
+
+    def test_cfg_files_rewritten_only_changed(self, caplog, monkeypatch):
+        """Only the configuration files with a different content are written so the others keep their mtime"""
+        cfg_subfolder = Path(self.tmp_dir) / CFG_SUBFOLDER
+        result = self.runner.invoke(main, ["--only-cp-cfg"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert not (cfg_subfolder / ".editorconfig").exists(), "The .editorconfig should be only in the root"
+        cfg_paths = [cfg_path for cfg_path in cfg_subfolder.iterdir() if cfg_path.is_file()]
+        cfg_paths += [Path(self.tmp_dir, ".editorconfig"), Path(self.tmp_dir, ".isort.cfg")]
+        for cfg_path in cfg_paths:
+            os.utime(cfg_path, ns=(0, 0))
+
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result = self.runner.invoke(main, ["--only-cp-cfg", "--pylint-disable-checks", "W0101"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        rewritten = sorted(cfg_path.name for cfg_path in cfg_paths if cfg_path.stat().st_mtime_ns)
+        assert ".pre-commit-config.yaml" in rewritten, "The configuration file changed was not written"
+        assert ".editorconfig" not in rewritten and ".isort.cfg" not in rewritten, "Files written without changes"
+        assert "%d rewritten since their content changed" % len(rewritten) in caplog.text, (
+            "Wrong number of files rewritten reported"
+        )
+        assert not [cfg_path for cfg_path in cfg_subfolder.iterdir() if ".editorconfig" in cfg_path.name], (
+            "Temporary files were not removed"
+        )
+
+        # copier (rendering into a staging folder) does not write the files without changes either
+        monkeypatch.setattr(pre_commit_vauxoo_renderer, "can_render", lambda src_path: False)
+        (cfg_subfolder / ".cache" / "cfg-fingerprint.json").unlink()
+        shutil.rmtree(self.user_cache_dir)
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger="pre-commit-vauxoo"):
+            result = self.runner.invoke(main, ["--only-cp-cfg", "--pylint-disable-checks", "W0101"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert " 0 rewritten since their content changed" in caplog.text, "copier rewrote files without changes"
+
+    def test_cfg_files_shared_cache(self, monkeypatch):
+        """The configuration files rendered by a repository are reused by the repositories with the same inputs"""
+        renders = []
+        render_templates = pre_commit_vauxoo_renderer.render_templates
+        monkeypatch.setattr(
+            pre_commit_vauxoo_renderer,
+            "render_templates",
+            lambda *args, **kwargs: renders.append(1) or render_templates(*args, **kwargs),
+        )
+        result = self.runner.invoke(main, ["--only-cp-cfg"])
+        assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+        assert len(renders) == 1, "The configuration files were not rendered"
+        cfg_subfolder = Path(self.tmp_dir) / CFG_SUBFOLDER
+        cfg_files = {
+            cfg_path.name: cfg_path.read_bytes() for cfg_path in cfg_subfolder.iterdir() if cfg_path.is_file()
+        }
+
+        other_repo = os.path.realpath(tempfile.mkdtemp(suffix="_pre_commit_vauxoo_other"))
+        try:
+            os.chdir(other_repo)
+            self.create_dummy_repo(self.src_path, other_repo)
+            result = self.runner.invoke(main, ["--only-cp-cfg"])
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            assert len(renders) == 1, "The configuration files of the other repository were rendered again"
+            other_cfg_subfolder = Path(other_repo) / CFG_SUBFOLDER
+            assert {
+                cfg_path.name: cfg_path.read_bytes()
+                for cfg_path in other_cfg_subfolder.iterdir()
+                if cfg_path.is_file()
+            } == cfg_files, "Different configuration files copied from the per-user cache"
+            assert Path(other_repo, ".editorconfig").is_file(), "The root configuration files were not copied"
+
+            # The values of the repository (e.g. the paths excluded) are part of the inputs
+            result = self.runner.invoke(main, ["--only-cp-cfg", "--exclude-lint", "module_example1"])
+            assert not result.exit_code, "Exited with error %s - %s" % (result, result.output)
+            assert len(renders) == 2, "The configuration files with different inputs were not rendered"
+        finally:
+            os.chdir(self.tmp_dir)
+            shutil.rmtree(other_repo, ignore_errors=True)